@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Cost of journaling a batch scan in a Checkpoint, per target, and of resuming from it.
+
+    python benchmarks/bench_checkpoint.py --targets 100000 --threads 32
+
+Each target records the stages a default scan settles (resolve, reverse
+DNS, liveness, GeoIP, ports, fingerprint, 4 DNS types, HTTP) from worker
+threads, then its full result, as scan_many does.
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scanner.checkpoint import Checkpoint
+
+
+def stages(i):
+    ip = f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}'
+    ports = {port: {'status': 'open' if (i + port) % 3 == 0 else 'closed', 'service': None}
+             for port in (21, 22, 80, 443, 8080, 8443)}
+    return {
+        'resolve': ip,
+        'reverse_dns': f'host{i}.example.test',
+        'liveness': True,
+        'geoip': {'country': 'France', 'city': 'Paris', 'latitude': 48.85, 'longitude': 2.35},
+        'ports': ports,
+        'fingerprint': {443: {'service': 'https', 'banner': None}},
+        'dns:A': [ip], 'dns:MX': [], 'dns:NS': ['ns1.example.test.'], 'dns:TXT': ['v=spf1 -all'],
+        'server': {'server': 'nginx', 'status_code': 200, 'headers': {'content-type': 'text/html'}},
+    }
+
+
+def result(i, values):
+    return {'url': f'https://host{i}.example.test', 'timestamp': '2024-01-01T00:00:00',
+            'ip_info': {'ip_address': values['resolve'], 'location': values['geoip']},
+            'dns_records': {k[4:]: v for k, v in values.items() if k.startswith('dns:')},
+            'server_info': values['server'], 'open_ports': values['ports']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--targets', type=int, default=100000)
+    parser.add_argument('--threads', type=int, default=32)
+    args = parser.parse_args()
+
+    payloads = [stages(i) for i in range(args.targets)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'job.jsonl')
+        checkpoint = Checkpoint(path)
+
+        def scan(i):
+            values = payloads[i]
+            for name, value in values.items():
+                checkpoint.stage_done(f'host{i}.example.test', name, value)
+            return i
+
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(args.threads) as pool:
+            for i in pool.map(scan, range(args.targets), chunksize=64):
+                checkpoint.target_done(f'host{i}.example.test', result(i, payloads[i]))
+        checkpoint.close()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        print(f"journal  {args.targets:>8} targets  {elapsed:8.3f} s  "
+              f"{elapsed / args.targets * 1e6:8.1f} us/target  "
+              f"{args.targets / elapsed * 60:12,.0f} targets/min  {size / 1e6:8.1f} MB")
+
+        start = time.perf_counter()
+        resumed = Checkpoint(path)
+        done = sum(resumed.is_done(f'host{i}.example.test') for i in range(args.targets))
+        elapsed = time.perf_counter() - start
+        print(f"resume   {done:>8} targets  {elapsed:8.3f} s  {elapsed / args.targets * 1e6:8.1f} us/target")
+
+        start = time.perf_counter()
+        replayed = sum(1 for _ in resumed.results())
+        elapsed = time.perf_counter() - start
+        resumed.close()
+        print(f"replay   {replayed:>8} results  {elapsed:8.3f} s  {elapsed / args.targets * 1e6:8.1f} us/target")
+
+
+if __name__ == '__main__':
+    main()
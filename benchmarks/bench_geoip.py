@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""GeoIP cost per address: one geoip2 city() call per IP vs. the network-cached locator.
+
+    python benchmarks/bench_geoip.py --addresses 1000000
+
+The database is a generated City MMDB of /20 networks over 10.0.0.0/8, and
+the addresses are a contiguous sweep as produced by `--sweep`. The geoip2
+reader is only timed on the first --legacy addresses.
+"""
+import argparse
+import os
+import random
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geoip2.database
+
+from benchmarks.fixtures import mmdb_database
+from scanner.utils.geoip import GeoIPLocator
+
+CITIES = [('France', 'Paris', 48.85, 2.35), ('Germany', 'Berlin', 52.52, 13.40),
+          ('Japan', 'Tokyo', 35.68, 139.69), ('Brazil', 'São Paulo', -23.55, -46.63)]
+
+
+def make_networks(prefix=20):
+    networks = []
+    for i in range(1 << (prefix - 8)):
+        country, city, latitude, longitude = CITIES[i % len(CITIES)]
+        record = {'country': {'names': {'en': country}}, 'city': {'names': {'en': city}},
+                  'location': {'latitude': latitude, 'longitude': longitude}}
+        base = (10 << 24) | (i << (32 - prefix))
+        networks.append((f'{socket.inet_ntoa(base.to_bytes(4, "big"))}/{prefix}', record))
+    return networks
+
+
+def sweep(count):
+    base = 10 << 24
+    return [socket.inet_ntoa((base + i).to_bytes(4, 'big')) for i in range(count)]
+
+
+def legacy(path, addresses):
+    """What GeoIPLocator.locate_ip did: default reader mode, one city() per address"""
+    reader = geoip2.database.Reader(path)
+    located = 0
+    for ip in addresses:
+        response = reader.city(ip)
+        located += response.city.name is not None
+    reader.close()
+    return located
+
+
+def report(label, count, elapsed, extra=''):
+    print(f"{label:<16} {count:>8} addresses  {elapsed:8.3f} s  "
+          f"{elapsed / count * 1e6:8.2f} us/address  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--addresses', type=int, default=1000000)
+    parser.add_argument('--legacy', type=int, default=100000, help="addresses timed with geoip2 city()")
+    args = parser.parse_args()
+
+    addresses = sweep(args.addresses)
+    shuffled = addresses[:]
+    random.Random(1).shuffle(shuffled)
+    with mmdb_database(make_networks()) as path:
+        sample = addresses[:args.legacy]
+        start = time.perf_counter()
+        legacy(path, sample)
+        report('geoip2 city()', len(sample), time.perf_counter() - start)
+
+        locator = GeoIPLocator(path)
+        start = time.perf_counter()
+        for ip in addresses:
+            locator.locate_ip(ip)
+        report('locator sweep', len(addresses), time.perf_counter() - start,
+               f"{locator.stats['misses']} db lookups")
+
+        locator = GeoIPLocator(path)
+        start = time.perf_counter()
+        for ip in shuffled:
+            locator.locate_ip(ip)
+        report('locator random', len(shuffled), time.perf_counter() - start,
+               f"{locator.stats['misses']} db lookups")
+
+        locator = GeoIPLocator(path)
+        start = time.perf_counter()
+        locator.locate_many(shuffled)
+        report('locate_many', len(shuffled), time.perf_counter() - start,
+               f"{locator.stats['misses']} db lookups")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Bare requests.head vs. the pooled HttpClient against a local HTTP server.
+
+    python benchmarks/bench_http.py --requests 500 --redirects 3
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import http_server
+from scanner.network.http_client import HttpClient
+
+
+def run(label, head, url, count, workers, stats):
+    before = dict(stats)
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        codes = list(executor.map(lambda _: head(url).status_code, range(count)))
+    elapsed = time.perf_counter() - start
+    opened = stats['connections'] - before['connections']
+    handled = stats['requests'] - before['requests']
+    print(f"{label:<8} {count:>6} scans  {handled:>6} requests  {opened:>6} connections opened  "
+          f"{handled - opened:>6} reused  {elapsed:7.3f} s  {count / elapsed:7.0f} scans/s"
+          f"  ok={codes.count(200)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--redirects', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    with http_server() as (base_url, stats):
+        url = f'{base_url}/redirect/{args.redirects}'
+        run('bare', lambda u: requests.head(u, allow_redirects=True, timeout=5),
+            url, args.requests, args.workers, stats)
+        client = HttpClient(per_host_connections=args.workers)
+        try:
+            run('pooled', lambda u: client.head(u), url, args.requests, args.workers, stats)
+            print(f"client view: {client.snapshot()}")
+        finally:
+            client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Paint time per frame of the Matrix background, before and after the glyph atlas.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_matrix.py --size 1000x800 --frames 300
+
+Each frame advances the animation by one 80 ms tick and renders what the
+widget would repaint: the whole widget for the previous implementation,
+only the dirty columns for the current one.
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QPoint, Qt
+from PyQt5.QtGui import QColor, QFont, QImage, QPainter, QRegion
+from PyQt5.QtWidgets import QApplication, QWidget
+
+from scanner.matrix_background import MatrixBackground
+
+
+class LegacyMatrixBackground(QWidget):
+    """The paintEvent the glyph atlas replaced"""
+
+    def __init__(self, width, height):
+        super().__init__()
+        self.resize(width, height)
+        self.chars = "01アイウエオ"
+        self.font_size = 14
+        self.columns = math.ceil(width / self.font_size)
+        self.positions = [random.randint(-20, 0) for _ in range(self.columns)]
+        self.speeds = [random.randint(1, 4) for _ in range(self.columns)]
+        self.colors = [QColor(0, 255, 0), QColor(0, 200, 100), QColor(150, 255, 0)]
+
+    def advance(self, dt):
+        for i in range(self.columns):
+            if self.positions[i] * self.font_size > self.height() + 20 or random.random() < 0.03:
+                self.positions[i] = 0
+                self.speeds[i] = random.randint(1, 4)
+            else:
+                self.positions[i] += self.speeds[i]
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setFont(QFont("Courier New", self.font_size, QFont.Bold))
+        for i in range(self.columns):
+            x = i * self.font_size
+            trail_length = random.randint(5, 15)
+            for j in range(max(0, self.positions[i] - trail_length), self.positions[i]):
+                y = j * self.font_size
+                if 0 <= y < self.height():
+                    char = random.choice(self.chars)
+                    alpha = 255 * (1 - (self.positions[i] - j) / trail_length)
+                    color = QColor(self.colors[min(j % 3, len(self.colors) - 1)])
+                    color.setAlpha(int(alpha))
+                    painter.setPen(color)
+                    painter.drawText(x, y, char)
+        for _ in range(5):
+            painter.setPen(QColor(0, 255, 0, random.randint(50, 150)))
+            painter.drawText(random.randint(0, self.width()), random.randint(0, self.height()),
+                             random.choice(self.chars))
+        painter.end()
+
+
+def run(label, widget, frames, dirty_only):
+    image = QImage(widget.size(), QImage.Format_ARGB32_Premultiplied)
+    full = QRegion(widget.rect())
+    area = widget.width() * widget.height()
+    times, coverage = [], []
+    for _ in range(20):  # let the columns fill the screen
+        widget.advance(0.08)
+    for _ in range(frames):
+        widget.advance(0.08)
+        region = widget.last_dirty if dirty_only else full
+        image.fill(Qt.transparent)
+        start = time.perf_counter()
+        widget.render(image, QPoint(), region)
+        times.append(time.perf_counter() - start)
+        coverage.append(sum(r.width() * r.height() for r in region.rects()) / area)
+    times.sort()
+    p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+    print(f"{label:<8} {frames:>5} frames  mean {statistics.mean(times) * 1000:7.2f} ms  "
+          f"p50 {times[len(times) // 2] * 1000:7.2f} ms  p99 {p99 * 1000:7.2f} ms  "
+          f"repainted {statistics.mean(coverage) * 100:5.1f}% of the widget")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='1000x800', help="widget size WxH")
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.lower().split('x'))
+
+    app = QApplication(sys.argv)
+    random.seed(1)
+    run('legacy', LegacyMatrixBackground(width, height), args.frames, dirty_only=False)
+    widget = MatrixBackground()
+    widget.resize(width, height)
+    run('atlas', widget, args.frames, dirty_only=True)
+    del app
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Compare the asyncio port engine with the previous per-port thread pool.
+
+    python benchmarks/bench_port_scan.py --open 20 --closed 2000 --filtered 100
+
+Filtered ports are listeners with a full accept queue, so they cost a full
+connect timeout each, which is where the thread pool falls behind. The
+asyncio-rtt line rescans with the per-host timeout learned on the first pass.
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import tcp_listeners, closed_ports, blackholed_ports
+from scanner.network.port_scanner import AsyncPortScanner, check_port
+
+
+def threadpool_scan(ip, ports, max_threads, timeout):
+    """The scan_ports implementation the async engine replaced"""
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
+        future_to_port = {executor.submit(check_port, ip, port, timeout): port for port in ports}
+        for future in concurrent.futures.as_completed(future_to_port):
+            results[future_to_port[future]] = future.result()
+    return results
+
+
+def run(label, func):
+    start = time.perf_counter()
+    results = func()
+    elapsed = time.perf_counter() - start
+    opened = sum(1 for r in results.values() if r['status'] == 'open')
+    filtered = sum(1 for r in results.values() if r['status'] == 'filtered')
+    print(f"{label:<12} {len(results):>6} ports  {opened:>4} open  {filtered:>4} filtered  "
+          f"{elapsed:8.3f} s  {len(results) / elapsed:10.0f} ports/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--open', type=int, default=20, help="listening ports")
+    parser.add_argument('--closed', type=int, default=2000, help="refused ports")
+    parser.add_argument('--filtered', type=int, default=100, help="blackholed ports")
+    parser.add_argument('--timeout', type=float, default=1.0, help="connect timeout")
+    parser.add_argument('--threads', type=int, default=15, help="thread pool size (main.py uses 15)")
+    parser.add_argument('--concurrency', type=int, default=1000, help="async in-flight connects")
+    args = parser.parse_args()
+
+    ip = '127.0.0.1'
+    with tcp_listeners(args.open, ip) as open_ports, \
+            blackholed_ports(args.filtered, ip) as filtered_ports:
+        ports = sorted(set(open_ports) | set(filtered_ports) | set(closed_ports(args.closed, ip)))
+        threaded = run('threadpool', lambda: threadpool_scan(ip, ports, args.threads, args.timeout))
+
+        engine = AsyncPortScanner(concurrency=args.concurrency, timeout=args.timeout)
+        try:
+            engine.scan_sync(ip, ports[:10])  # warm up the loop thread
+            async_results = run('asyncio', lambda: engine.scan_sync(ip, ports))
+            # second sweep of the same host uses the RTT measured by the first one
+            run('asyncio-rtt', lambda: engine.scan_sync(ip, ports))
+        finally:
+            engine.close()
+
+    mismatched = [p for p in ports if threaded[p]['status'] != async_results[p]['status']]
+    if mismatched:
+        print(f"WARNING: {len(mismatched)} ports differ between engines: {mismatched[:10]}")
+
+
+if __name__ == '__main__':
+    main()
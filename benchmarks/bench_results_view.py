@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Results view cost with many targets: QTreeWidget items vs. the lazy model.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_results_view.py --rows 100000
+
+Rows arrive in batches as they do from ScanWorker during a batch scan. The
+longest single GUI-thread stall is what decides whether the window stays
+responsive; sort, filter and a sorted insert are timed once the table is full.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (QApplication, QHeaderView, QTableView, QTreeView, QTreeWidget,
+                             QTreeWidgetItem)
+
+from scanner.results_model import ScanResultsModel, ScanResultsFilter
+
+
+def make_result(i):
+    ports = {port: {'status': 'open' if (i + port) % 3 == 0 else 'closed', 'service': None}
+             for port in (21, 22, 80, 443, 8080, 8443)}
+    return {
+        'url': f'https://host{i}.example.test',
+        'timestamp': f'2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}',
+        'ip_info': {'ip_address': f'10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}',
+                    'reverse_dns': None, 'is_up': True},
+        'dns_records': {'A': [f'10.0.0.{i & 255}'], 'MX': [], 'NS': ['ns1.example.test.']},
+        'server_info': {'server': ('nginx', 'Apache', 'cloudflare')[i % 3], 'status_code': 200},
+        'open_ports': ports,
+    }
+
+
+def tree_widget(app, batches):
+    """One QTreeWidgetItem per field, as display_results used to build"""
+    tree = QTreeWidget()
+    tree.setHeaderLabels(["Property", "Value"])
+    tree.show()
+    worst = 0.0
+    for batch in batches:
+        start = time.perf_counter()
+        for results in batch:
+            root = QTreeWidgetItem(tree)
+            root.setText(0, results['url'])
+            for section in ('ip_info', 'dns_records', 'server_info', 'open_ports'):
+                item = QTreeWidgetItem(root)
+                item.setText(0, section)
+                for key, value in results[section].items():
+                    child = QTreeWidgetItem(item)
+                    child.setText(0, str(key))
+                    child.setText(1, str(value))
+        app.processEvents()
+        worst = max(worst, time.perf_counter() - start)
+    return tree, worst
+
+
+def model_view(app, batches):
+    """Target table and detail tree over the same lazy model, as in gui.py"""
+    model = ScanResultsModel()
+    proxy = ScanResultsFilter()
+    proxy.setSourceModel(model)
+    table = QTableView()
+    table.setModel(proxy)
+    table.verticalHeader().hide()
+    table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+    table.setSortingEnabled(True)
+    table.show()
+    details = QTreeView()  # no model until a target is shown
+    details.setUniformRowHeights(True)
+    worst = 0.0
+    for batch in batches:
+        start = time.perf_counter()
+        model.add_results(batch)
+        app.processEvents()
+        worst = max(worst, time.perf_counter() - start)
+    return (model, proxy, table, details), worst
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed * 1000:10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=500, help="rows per ScanWorker batch")
+    parser.add_argument('--skip-widget', action='store_true', help="only run the model/view")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    results = [make_result(i) for i in range(args.rows)]
+    batches = [results[i:i + args.batch] for i in range(0, len(results), args.batch)]
+
+    runs = [('model/view', model_view)]
+    if not args.skip_widget:
+        runs.insert(0, ('QTreeWidget', tree_widget))
+    for label, func in runs:
+        start = time.perf_counter()
+        keep, worst = func(app, batches)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<12} {args.rows:>7} rows  {elapsed:8.3f} s total  "
+              f"{worst * 1000:8.1f} ms worst batch")
+        if label == 'model/view':
+            model, proxy, table, details = keep
+
+            def show_first():
+                root = proxy.mapToSource(proxy.index(0, 0))
+                details.setModel(model)
+                details.setRootIndex(root)
+                model.fetchMore(root)
+                for row in range(model.rowCount(root)):
+                    details.expand(model.index(row, 0, root))
+                app.processEvents()
+
+            timed("sort by open ports", lambda: (table.sortByColumn(2, Qt.DescendingOrder),
+                                                 app.processEvents()))
+            timed("sort by IP", lambda: (table.sortByColumn(1, Qt.AscendingOrder), app.processEvents()))
+            timed("filter 'nginx'", lambda: (proxy.set_filter_text('nginx'), app.processEvents()))
+            timed("clear filter", lambda: (proxy.set_filter_text(''), app.processEvents()))
+            timed("show first target details", show_first)
+            sorted_batches = [make_result(i) for i in range(len(batches[0]))]
+            timed("insert batch while sorted", lambda: (model.add_results(sorted_batches),
+                                                        app.processEvents()))
+        del keep
+        app.processEvents()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Startup cost of the headless entry points, checked against an import-time budget.
+
+    python benchmarks/bench_startup.py --budget-ms 120
+
+Each measurement is a fresh interpreter. The import time of scanner.cli comes
+from `python -X importtime` (median of --runs); the wall time of
+`python -m scanner --help` and `python main.py --help` includes interpreter
+start. Exits with status 1 when the import exceeds the budget or when a
+heavy dependency (Qt, requests, dnspython, MaxMind readers) is loaded before
+any stage needs it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded by the stage that needs them, never by importing the headless path
+HEAVY = ('PyQt5', 'requests', 'urllib3', 'dns', 'maxminddb', 'geoip2')
+
+
+def python(*args):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def import_time_us(module):
+    """Cumulative import time of `module` in microseconds, from -X importtime"""
+    stderr = python('-X', 'importtime', '-c', f'import {module}').stderr
+    for line in stderr.splitlines():
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    raise RuntimeError(f"{module} not found in -X importtime output")
+
+
+def loaded_heavy(code):
+    probe = f"import sys, json; {code}; print(json.dumps(sorted(sys.modules)))"
+    modules = json.loads(python('-c', probe).stdout.splitlines()[-1])
+    return sorted({name.split('.')[0] for name in modules if name.split('.')[0] in HEAVY})
+
+
+def wall_time(*args, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        python(*args)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=120.0, help="import budget of scanner.cli")
+    args = parser.parse_args()
+
+    failures = []
+    for module in ('scanner.cli', 'scanner.core'):
+        median = statistics.median(import_time_us(module) for _ in range(args.runs)) / 1000
+        print(f"import {module:<14} {median:8.1f} ms")
+        if module == 'scanner.cli' and median > args.budget_ms:
+            failures.append(f"import scanner.cli takes {median:.1f} ms, budget {args.budget_ms:.0f} ms")
+
+    for label, code in (('import scanner.cli', 'import scanner.cli'),
+                        ('NetworkScanner()', 'from scanner.core import NetworkScanner; '
+                                             'NetworkScanner(geoip=False).close()'),
+                        ('import main', 'import main')):
+        heavy = loaded_heavy(code)
+        print(f"{label:<21} loads {', '.join(heavy) or 'no heavy dependency'}")
+        if heavy:
+            failures.append(f"{label} loads {', '.join(heavy)}")
+
+    baseline = wall_time('-c', 'pass', runs=args.runs)
+    for label, command in (('python -m scanner --help', ('-m', 'scanner', '--help')),
+                           ('python main.py --help', ('main.py', '--help'))):
+        elapsed = wall_time(*command, runs=args.runs)
+        print(f"{label:<26} {elapsed * 1000:8.1f} ms wall  ({(elapsed - baseline) * 1000:6.1f} ms over a bare interpreter)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Reproducible scan benchmark suite on loopback stand-ins, saved as JSON for regression checks.
+
+    python benchmarks/bench_suite.py -o before.json
+    python benchmarks/bench_suite.py -o after.json --compare before.json
+
+Every scenario runs in a fresh process, so its peak RSS is its own, against
+local TCP listeners, closed and blackholed ports, a stub DNS server and an
+HTTP server answering each target with a redirect chain. Throughput is
+operations per second; p50/p99 are per-operation latencies. --compare
+exits with status 1 when a scenario lost more than --threshold throughput,
+or grew its p99 or peak RSS by more than that.
+"""
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIOS = ('scan_ports', 'get_dns_records', 'get_server_info', 'single_target', 'batch')
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _scanner(network, params):
+    from requests.adapters import HTTPAdapter
+    from scanner.core import NetworkScanner
+    from scanner.network.resolver_cache import ResolutionCache
+
+    class LoopbackAdapter(HTTPAdapter):
+        """Sends https://<target>/ to the local server's redirect chain"""
+
+        def send(self, request, **kwargs):
+            request.url = f"{network['http']}/redirect/{params['redirects']}"
+            return super().send(request, **kwargs)
+
+    scanner = NetworkScanner(max_threads=params['workers'], port_timeout=params['port_timeout'],
+                             resolution_cache=ResolutionCache(resolver=network['resolver']),
+                             dns_resolver=network['resolver'], geoip_db=network['geoip_db'])
+    scanner.http_client.mount('https://', LoopbackAdapter())
+    return scanner
+
+
+def run_scenario(name, params):
+    """Run one scenario in this (fresh) process, returns its measurements"""
+    import logging
+    from benchmarks.fixtures import loopback_network
+
+    logging.disable(logging.CRITICAL)
+    count = params['targets'] if name == 'batch' else params['repeat']
+    names = [f'host{i}.bench.test' for i in range(count)]
+    with loopback_network(names, params['open'], params['closed'], params['filtered'],
+                          params['dns_delay']) as network:
+        scanner = _scanner(network, params)
+        ports = network['ports']
+        operations = {
+            'scan_ports': lambda i: scanner.port_scanner.scan_sync('127.0.0.1', ports),
+            'get_dns_records': lambda i: scanner.get_dns_records(f'https://{names[i]}'),
+            'get_server_info': lambda i: scanner.get_server_info(f'https://{names[i]}'),
+            'single_target': lambda i: scanner.scan_website(names[i], ports),
+        }
+        latencies = []
+        try:
+            start = time.perf_counter()
+            if name == 'batch':
+                for result in scanner.scan_many(names, ports):
+                    latencies.append(result['timings']['total'])
+            else:
+                operation = operations[name]
+                for i in range(count):
+                    started = time.perf_counter()
+                    operation(i)
+                    latencies.append(time.perf_counter() - started)
+            elapsed = time.perf_counter() - start
+        finally:
+            scanner.close()
+    return {
+        'operations': len(latencies),
+        'seconds': round(elapsed, 4),
+        'throughput': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss /
+                             (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1),
+    }
+
+
+def run_isolated(name, params):
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_scenario, name, params).result()
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit or None, 'python': platform.python_version(),
+            'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(current, baseline, threshold):
+    """Print the change of every scenario against `baseline`, returns the regressions"""
+    regressions = []
+    print(f"\n{'scenario':<16} {'throughput':>12} {'p99':>10} {'peak RSS':>10}   vs {baseline['env']['commit']}")
+    for name, now in current['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        changes = {
+            'throughput': now['throughput'] / before['throughput'] - 1 if before['throughput'] else 0.0,
+            'p99': now['p99_ms'] / before['p99_ms'] - 1 if before['p99_ms'] else 0.0,
+            'rss': now['peak_rss_mb'] / before['peak_rss_mb'] - 1 if before['peak_rss_mb'] else 0.0,
+        }
+        worse = [metric for metric, change in changes.items()
+                 if (change < -threshold if metric == 'throughput' else change > threshold)]
+        if worse:
+            regressions.append((name, worse))
+        print(f"{name:<16} {changes['throughput']:>+11.1%} {changes['p99']:>+9.1%} {changes['rss']:>+9.1%}"
+              f"   {'REGRESSION: ' + ', '.join(worse) if worse else 'ok'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', metavar='BASELINE', help="JSON file of a previous run")
+    parser.add_argument('--threshold', type=float, default=0.10, help="tolerated relative change")
+    parser.add_argument('--only', action='append', choices=SCENARIOS, help="run only these scenarios")
+    parser.add_argument('--repeat', type=int, default=50, help="operations of the single-target scenarios")
+    parser.add_argument('--targets', type=int, default=500, help="targets of the batch scenario")
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--open', type=int, default=4, help="accepting listeners per target")
+    parser.add_argument('--closed', type=int, default=16, help="closed ports per target")
+    parser.add_argument('--filtered', type=int, default=2, help="blackholed ports per target")
+    parser.add_argument('--redirects', type=int, default=2)
+    parser.add_argument('--port-timeout', type=float, default=0.25)
+    parser.add_argument('--dns-delay', type=float, default=0.002, help="stub DNS latency per query (s)")
+    args = parser.parse_args()
+
+    params = {key: getattr(args, key) for key in ('repeat', 'targets', 'workers', 'open', 'closed',
+                                                  'filtered', 'redirects', 'port_timeout', 'dns_delay')}
+    report = {'env': environment(), 'params': params, 'scenarios': {}}
+    print(f"{'scenario':<16} {'ops':>6} {'seconds':>9} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+    for name in args.only or SCENARIOS:
+        result = report['scenarios'][name] = run_isolated(name, params)
+        print(f"{name:<16} {result['operations']:>6} {result['seconds']:>9.3f} {result['throughput']:>9.1f} "
+              f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['peak_rss_mb']:>8.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        if baseline.get('params') != params:
+            print("warning: the baseline ran with different parameters", file=sys.stderr)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""Local network stand-ins used by the benchmarks (loopback only)"""
+import ipaddress
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import List
+
+
+@contextmanager
+def tcp_listeners(count: int = 10, host: str = '127.0.0.1'):
+    """Open `count` accepting TCP listeners, yields their port numbers"""
+    sockets = []
+    stop = threading.Event()
+
+    def accept_loop(sock):
+        sock.settimeout(0.2)
+        while not stop.is_set():
+            try:
+                conn, _ = sock.accept()
+                conn.close()
+            except OSError:
+                continue
+
+    threads = []
+    try:
+        for _ in range(count):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((host, 0))
+            sock.listen(1024)
+            sockets.append(sock)
+            thread = threading.Thread(target=accept_loop, args=(sock,), daemon=True)
+            thread.start()
+            threads.append(thread)
+        yield [s.getsockname()[1] for s in sockets]
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        for sock in sockets:
+            sock.close()
+
+
+def closed_ports(count: int, host: str = '127.0.0.1') -> List[int]:
+    """Return `count` ports that nothing listens on (connects get RST)"""
+    ports = []
+    for _ in range(count):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind((host, 0))
+            ports.append(s.getsockname()[1])
+    return ports
+
+
+@contextmanager
+def blackholed_ports(count: int = 10, host: str = '127.0.0.1'):
+    """Listeners whose accept queue is full, so new SYNs are silently dropped.
+
+    Connects to these ports time out like a firewalled port would.
+    """
+    listeners, fillers = [], []
+    try:
+        for _ in range(count):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind((host, 0))
+            sock.listen(0)
+            listeners.append(sock)
+            port = sock.getsockname()[1]
+            while True:
+                filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                filler.settimeout(0.2)
+                fillers.append(filler)
+                try:
+                    filler.connect((host, port))
+                except OSError:
+                    break
+        yield [s.getsockname()[1] for s in listeners]
+    finally:
+        for sock in fillers + listeners:
+            sock.close()
+
+
+@contextmanager
+def stub_dns_server(zone: dict = None, host: str = '127.0.0.1', delay: float = 0.0):
+    """UDP DNS server answering from `zone`, yields its port.
+
+    `zone` maps (name, rdtype) to a list of rdata strings, e.g.
+    {('example.test', 'MX'): ['10 mail.example.test.']}. Names absent from the
+    zone get NXDOMAIN, known names without that type get an empty answer.
+    `delay` simulates resolver latency per query.
+    """
+    import time
+    import dns.message
+    import dns.rcode
+    import dns.rrset
+
+    zone = {(name.rstrip('.').lower() + '.', rdtype.upper()): values
+            for (name, rdtype), values in (zone or {}).items()}
+    names = {name for name, _ in zone}
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, 0))
+    sock.settimeout(0.2)
+    stop = threading.Event()
+
+    def answer(data, addr):
+        if delay:
+            time.sleep(delay)
+        query = dns.message.from_wire(data)
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        name = question.name.to_text().lower()
+        rdtype = dns.rdatatype.to_text(question.rdtype)
+        if name not in names:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        elif (name, rdtype) in zone:
+            response.answer.append(dns.rrset.from_text_list(
+                question.name, 300, 'IN', rdtype, zone[(name, rdtype)]))
+        sock.sendto(response.to_wire(), addr)
+
+    def serve():
+        while not stop.is_set():
+            try:
+                data, addr = sock.recvfrom(4096)
+            except OSError:
+                continue
+            threading.Thread(target=answer, args=(data, addr), daemon=True).start()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    try:
+        yield sock.getsockname()[1]
+    finally:
+        stop.set()
+        thread.join()
+        sock.close()
+
+
+def stub_resolver(port: int, host: str = '127.0.0.1'):
+    """dnspython Resolver pointed at a stub_dns_server"""
+    import dns.resolver
+
+    resolver = dns.resolver.Resolver(configure=False)
+    resolver.nameservers = [host]
+    resolver.port = port
+    resolver.timeout = 2.0
+    resolver.lifetime = 4.0
+    return resolver
+
+
+@contextmanager
+def http_server(host: str = '127.0.0.1'):
+    """Keep-alive HTTP/1.1 server, yields (base_url, stats).
+
+    HEAD/GET /redirect/<n> answers 302 down to /redirect/0, which returns 200
+    with a few security headers. stats['connections'] counts accepted TCP
+    connections and stats['requests'] handled requests.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    stats = {'connections': 0, 'requests': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            with lock:
+                stats['connections'] += 1
+
+        def do_HEAD(self):
+            with lock:
+                stats['requests'] += 1
+            parts = self.path.strip('/').split('/')
+            if len(parts) == 2 and parts[0] == 'redirect' and parts[1].isdigit() and int(parts[1]) > 0:
+                self.send_response(302)
+                self.send_header('Location', f'/redirect/{int(parts[1]) - 1}')
+            else:
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Strict-Transport-Security', 'max-age=31536000')
+                self.send_header('X-Frame-Options', 'DENY')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        do_GET = do_HEAD
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://{host}:{server.server_address[1]}', stats
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def _mmdb_control(type_code: int, size: int) -> bytes:
+    if size < 29:
+        size_bits, extra = size, b''
+    elif size < 285:
+        size_bits, extra = 29, bytes([size - 29])
+    elif size < 65821:
+        size_bits, extra = 30, (size - 285).to_bytes(2, 'big')
+    else:
+        size_bits, extra = 31, (size - 65821).to_bytes(3, 'big')
+    if type_code <= 7:
+        return bytes([type_code << 5 | size_bits]) + extra
+    return bytes([size_bits, type_code - 7]) + extra
+
+
+def _mmdb_uint(type_code: int, value: int) -> bytes:
+    data = value.to_bytes((value.bit_length() + 7) // 8, 'big')
+    return _mmdb_control(type_code, len(data)) + data
+
+
+def _mmdb_encode(value) -> bytes:
+    """MaxMind DB data section encoding of maps, strings, doubles, ints and lists"""
+    if isinstance(value, dict):
+        return _mmdb_control(7, len(value)) + b''.join(
+            _mmdb_encode(str(k)) + _mmdb_encode(v) for k, v in value.items())
+    if isinstance(value, str):
+        data = value.encode('utf-8')
+        return _mmdb_control(2, len(data)) + data
+    if isinstance(value, float):
+        return _mmdb_control(3, 8) + struct.pack('>d', value)
+    if isinstance(value, int):
+        return _mmdb_uint(6, value)
+    if isinstance(value, (list, tuple)):
+        return _mmdb_control(11, len(value)) + b''.join(_mmdb_encode(v) for v in value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in an MMDB")
+
+
+@contextmanager
+def mmdb_database(networks):
+    """Write an IPv4 MaxMind DB of (cidr, record) pairs, yields its path"""
+    data, offsets, nodes = bytearray(), {}, [[None, None]]
+    for cidr, record in networks:
+        key = repr(record)
+        if key not in offsets:
+            offsets[key] = len(data)
+            data += _mmdb_encode(record)
+        network = ipaddress.ip_network(cidr)
+        value, prefix = int(network.network_address), network.prefixlen
+        node = 0
+        for depth in range(prefix):
+            bit = value >> (31 - depth) & 1
+            if depth == prefix - 1:
+                nodes[node][bit] = ('data', offsets[key])
+                break
+            child = nodes[node][bit]
+            if child is None or child[0] == 'data':
+                nodes.append([None, None])
+                child = nodes[node][bit] = ('node', len(nodes) - 1)
+            node = child[1]
+
+    count = len(nodes)
+
+    def record_value(entry):
+        if entry is None:
+            return count
+        kind, value = entry
+        return value if kind == 'node' else count + 16 + value
+
+    tree = b''.join(struct.pack('>II', record_value(left), record_value(right)) for left, right in nodes)
+    metadata = (_mmdb_control(7, 9) +
+                _mmdb_encode('node_count') + _mmdb_uint(6, count) +
+                _mmdb_encode('record_size') + _mmdb_uint(5, 32) +
+                _mmdb_encode('ip_version') + _mmdb_uint(5, 4) +
+                _mmdb_encode('database_type') + _mmdb_encode('GeoLite2-City') +
+                _mmdb_encode('languages') + _mmdb_encode(['en']) +
+                _mmdb_encode('binary_format_major_version') + _mmdb_uint(5, 2) +
+                _mmdb_encode('binary_format_minor_version') + _mmdb_uint(5, 0) +
+                _mmdb_encode('build_epoch') + _mmdb_uint(9, int(time.time())) +
+                _mmdb_encode('description') + _mmdb_encode({'en': 'benchmark fixture'}))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'fixture-city.mmdb')
+        with open(path, 'wb') as handle:
+            handle.write(tree + bytes(16) + bytes(data) + b'\xab\xcd\xefMaxMind.com' + metadata)
+        yield path
+
+
+def bench_zone(names: List[str], address: str = '127.0.0.1') -> dict:
+    """stub_dns_server zone answering the scanner's default record types for `names`"""
+    zone = {}
+    for name in names:
+        zone[(name, 'A')] = [address]
+        zone[(name, 'MX')] = [f'10 mail.{name}.']
+        zone[(name, 'NS')] = ['ns1.bench.test.']
+        zone[(name, 'TXT')] = ['"v=spf1 -all"']
+    return zone
+
+
+@contextmanager
+def loopback_network(names: List[str], open_ports: int = 4, closed: int = 16, filtered: int = 2,
+                     dns_delay: float = 0.0):
+    """Everything a full scan of `names` touches, on loopback, yields a dict.
+
+    The names resolve to 127.0.0.1 through a stub DNS server ('resolver'),
+    where 'ports' mixes accepting listeners, closed ports and blackholed
+    ports, and 'http' is the base URL of http_server. 'geoip_db' covers
+    127.0.0.0/8.
+    """
+    zone = bench_zone(names)
+    location = {'country': {'names': {'en': 'Loopback'}}, 'city': {'names': {'en': 'Localhost'}},
+                'location': {'latitude': 0.0, 'longitude': 0.0}}
+    with tcp_listeners(open_ports) as listening, blackholed_ports(filtered) as blackholed, \
+            stub_dns_server(zone, delay=dns_delay) as dns_port, http_server() as (base_url, stats), \
+            mmdb_database([('127.0.0.0/8', location)]) as geoip_db:
+        yield {
+            'resolver': stub_resolver(dns_port),
+            'ports': sorted(listening + closed_ports(closed) + blackholed),
+            'http': base_url,
+            'http_stats': stats,
+            'geoip_db': geoip_db,
+        }
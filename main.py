@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 import sys
-from scanner.core import NetworkScanner
-from scanner.gui import NetworkScannerUI
-from PyQt5.QtWidgets import QApplication
 
 def main():
+    # Avec des arguments : mode headless (voir `python -m scanner --help`), sans jamais importer Qt
+    if len(sys.argv) > 1:
+        from scanner.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from PyQt5.QtWidgets import QApplication
+    from scanner.core import NetworkScanner
+    from scanner.gui import NetworkScannerUI
+
     scanner = NetworkScanner(max_threads=15)
-    
+
     app = QApplication(sys.argv)
     window = NetworkScannerUI(scanner)
     window.show()
@@ -0,0 +1,138 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Stages whose value is keyed by port number: JSON turns the keys into strings
+_PORT_KEYED = ('ports', 'fingerprint')
+# Head of a record as written by Checkpoint._append: target, then its kind
+_HEAD = re.compile(rb'\{"t":("(?:[^"\\]|\\.)*"),"([rs])"')
+
+
+def _decode(stage: str, value: Any) -> Any:
+    if stage in _PORT_KEYED and isinstance(value, dict):
+        return {int(port): info for port, info in value.items()}
+    return value
+
+
+class Checkpoint:
+    """Append-only JSON lines journal of a batch scan, to resume it after a crash.
+
+    Two kinds of records are appended:
+
+        {"t": target, "s": stage, "v": value}   a stage of `target` succeeded
+        {"t": target, "r": result}              `target` is finished
+
+    On open the journal is read back: finished targets are skipped, and
+    the stages that succeeded for unfinished targets are not run again.
+    Failed or cancelled stages are not recorded, so they are retried.
+    Records are buffered and written every `flush_interval` seconds, like
+    ResultStore batches; a crash loses at most that much stage work, a
+    torn last line is dropped.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._done: Set[str] = set()
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._loaded_size = self._load()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._last_flush = time.monotonic()
+
+    def _load(self) -> int:
+        try:
+            with open(self.path, 'rb') as handle:
+                data = handle.read()
+        except FileNotFoundError:
+            return 0
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            logger.warning(f"Dropping a torn record at the end of {self.path}")
+            with open(self.path, 'r+b') as handle:
+                handle.truncate(end)
+        # Only the head of each record is decoded until the target turns out unfinished
+        partial: Dict[str, list] = {}
+        for line in data[:end].splitlines():
+            if not line:
+                continue
+            head = _HEAD.match(line)
+            if head is None:
+                record = json.loads(line)
+                target, kind = record['t'], 'r' if 'r' in record else 's'
+            else:
+                quoted, kind = head.group(1), head.group(2).decode()
+                # Without escapes the JSON string is the ASCII text itself
+                target = json.loads(quoted) if b'\\' in quoted else quoted[1:-1].decode()
+            if kind == 'r':
+                self._done.add(target)
+                partial.pop(target, None)
+            elif target not in self._done:
+                partial.setdefault(target, []).append(line)
+        for target, lines in partial.items():
+            stages = self._stages[target] = {}
+            for line in lines:
+                record = json.loads(line)
+                stages[record['s']] = _decode(record['s'], record['v'])
+        if self._done or self._stages:
+            logger.info(f"Checkpoint {self.path}: {len(self._done)} targets done, "
+                        f"{len(self._stages)} partially scanned")
+        return end
+
+    def is_done(self, target: str) -> bool:
+        return target in self._done
+
+    def restored(self, target: str) -> Dict[str, Any]:
+        """Stage values already known for `target`, handed over once"""
+        return self._stages.pop(target, {})
+
+    def results(self) -> Iterator[Dict]:
+        """Results of the targets finished before this checkpoint was opened"""
+        if not self._loaded_size:
+            return
+        with open(self.path, 'rb') as handle:
+            remaining = self._loaded_size
+            for line in handle:
+                remaining -= len(line)
+                if remaining < 0:
+                    break
+                if b'"r":' in line:
+                    record = json.loads(line)
+                    if 'r' in record:
+                        yield record['r']
+
+    def _append(self, record: Dict):
+        line = json.dumps(record, default=str, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def stage_done(self, target: str, stage: str, value: Any = None, error: Optional[str] = None):
+        if error is None:
+            self._append({'t': target, 's': stage, 'v': value})
+
+    def target_done(self, target: str, result: Dict):
+        self._done.add(target)
+        self._append({'t': target, 'r': result})
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        self._file.flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
@@ -0,0 +1,152 @@
+"""Headless command line front-end: scan many targets, one JSON line or CSV row per result"""
+import argparse
+import itertools
+import sys
+from typing import Iterator, List
+
+from .checkpoint import Checkpoint
+from .core import NetworkScanner
+from .network.port_scanner import parse_ports
+from .shard import SHARD_SIZE, run_workers, scan_sharded
+from .utils.export import WRITERS, COMPRESSORS, write_results
+from .utils.metrics import write_periodically
+from .utils.store import ResultStore
+
+
+def read_targets(sources: List[str], input_path: str = None) -> Iterator[str]:
+    """Yield targets from the command line, then from a file or stdin ('-')"""
+    yield from sources
+    if input_path is None:
+        return
+    if input_path == '-':
+        yield from sys.stdin
+        return
+    with open(input_path, encoding='utf-8') as handle:
+        yield from handle
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='scanner', description=__doc__)
+    parser.add_argument('targets', nargs='*', help="domains or URLs to scan (CIDRs/ranges with --sweep)")
+    parser.add_argument('-i', '--input', help="file with one target per line, '-' for stdin")
+    parser.add_argument('-o', '--output', default='-',
+                        help="output file, '.gz', '.bz2' or '.xz' compresses (default: stdout)")
+    parser.add_argument('-f', '--format', choices=sorted(WRITERS), default='jsonl')
+    parser.add_argument('--compress', choices=sorted(COMPRESSORS), help="force a compression")
+    parser.add_argument('--sweep', action='store_true',
+                        help="targets are CIDRs or address ranges: discover live hosts, then scan their ports")
+    parser.add_argument('--probe-ports', default='80,443,22,445,3389',
+                        help="ports used to detect live hosts with --sweep")
+    parser.add_argument('--store', help="also record results in this SQLite database")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only redo stages older than their TTL in --store, report changes")
+    parser.add_argument('--ttl', action='append', default=[], metavar='GROUP=SECONDS',
+                        help="override a stage TTL for --incremental (ip, dns, http, ports)")
+    parser.add_argument('-p', '--ports', help="ports to scan, e.g. '22,80,8000-8100' or 'all'")
+    parser.add_argument('-w', '--workers', type=int, default=32,
+                        help="worker threads shared by all targets and stages")
+    parser.add_argument('--port-concurrency', type=int, default=None,
+                        help="in-flight TCP connects across all targets")
+    parser.add_argument('--port-timeout', type=float, default=1.0, help="connect timeout in seconds")
+    parser.add_argument('--rate', type=float, default=None,
+                        help="TCP connects per second across all targets, split between --processes")
+    parser.add_argument('--rate-per-prefix', type=float, default=None,
+                        help="TCP connects per second to each /24 (/48 for IPv6)")
+    parser.add_argument('--rate-per-host', type=float, default=None, help="TCP connects per second to each host")
+    parser.add_argument('--no-backoff', action='store_true',
+                        help="keep connect rates steady on resets, dropped SYNs and timeout spikes")
+    parser.add_argument('--no-fingerprint', action='store_true', help="skip banner grabbing on open ports")
+    parser.add_argument('--geoip-db', help="MaxMind City database (default: ./GeoLite2-City.mmdb if present)")
+    parser.add_argument('--no-geoip', action='store_true', help="skip GeoIP enrichment")
+    parser.add_argument('--checkpoint', metavar='FILE',
+                        help="journal of finished stages and targets: re-running with it resumes the scan")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="write scanner metrics there: JSON snapshot for '.json', Prometheus text otherwise")
+    parser.add_argument('--metrics-interval', type=float, default=10.0,
+                        help="seconds between two --metrics writes")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="worker processes, each with its own scanner and --workers threads")
+    parser.add_argument('--queue', metavar='DIR',
+                        help="shard queue directory: resumes the job if it exists, may be shared with --join")
+    parser.add_argument('--join', metavar='DIR',
+                        help="only lend --processes workers to the shard queue DIR, write no output")
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help="targets per shard")
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    sharded = args.processes > 1 or args.queue
+    if (sharded or args.join) and (args.sweep or args.incremental):
+        parser.error("--processes, --queue and --join do not support --sweep or --incremental")
+    if args.checkpoint and (sharded or args.join or args.sweep):
+        parser.error("--checkpoint is for single-process target lists (shard queues resume on their own)")
+    if args.metrics and (sharded or args.join):
+        parser.error("--metrics is per scanner process, it does not support --processes, --queue or --join")
+    if not args.targets and args.input is None and not args.join:
+        args.input = '-'
+    if args.sweep and not parse_ports(args.probe_ports):
+        parser.error("--probe-ports needs at least one port")
+    if args.incremental and not args.store:
+        parser.error("--incremental needs --store")
+    try:
+        ttls = {group: float(seconds) for group, seconds in (t.split('=', 1) for t in args.ttl)}
+    except ValueError:
+        parser.error("--ttl expects GROUP=SECONDS")
+
+    ports = parse_ports(args.ports) if args.ports else None
+    options = {'max_threads': args.workers, 'port_timeout': args.port_timeout,
+               'fingerprint': not args.no_fingerprint,
+               'geoip': not args.no_geoip, 'geoip_db': args.geoip_db}
+    if args.port_concurrency:
+        options['port_concurrency'] = args.port_concurrency
+    # The worker processes of a node split its global and prefix budgets; a host is in one shard
+    for option, share in (('rate', args.processes), ('rate_per_prefix', args.processes), ('rate_per_host', 1)):
+        if getattr(args, option):
+            options[option] = getattr(args, option) / max(1, share)
+    if args.no_backoff:
+        options['backoff'] = False
+    if args.join:
+        try:
+            run_workers(args.join, args.processes, options, ports, wait=60.0)
+        except KeyboardInterrupt:
+            return 130
+        return 0
+    scanner = NetworkScanner(**options)
+    store = ResultStore(args.store) if args.store else None
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    stop_metrics = (write_periodically(scanner.metrics, args.metrics, args.metrics_interval)
+                    if args.metrics else None)
+
+    try:
+        targets = read_targets(args.targets, args.input)
+        if sharded:
+            results = scan_sharded(targets, args.queue, args.processes, options, ports, args.shard_size)
+        elif args.sweep:
+            specs = (t.strip() for t in targets if t.strip() and not t.startswith('#'))
+            results = scanner.scan_network(specs, ports, parse_ports(args.probe_ports))
+        else:
+            previous = store.latest if args.incremental else None
+            results = scanner.scan_many(targets, ports, previous, ttls, checkpoint=checkpoint)
+        if checkpoint is not None:
+            # Targets finished by the interrupted run; the store skips those it already has
+            results = itertools.chain(checkpoint.results(), results)
+        if store is not None:
+            results = store.record(results)
+        write_results(results, args.output, args.format, args.compress)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        scanner.close()
+        if stop_metrics is not None:
+            stop_metrics()
+        if checkpoint is not None:
+            checkpoint.close()
+        if store is not None:
+            store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
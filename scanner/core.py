@@ -1,51 +1,397 @@
-import socket
-import requests
-import dns.resolver
 import concurrent.futures
-from typing import List, Dict
+import os
+import threading
+import time
+from typing import List, Dict, Optional, Iterable, Iterator, Callable
 import logging
 from datetime import datetime
+from .network.port_scanner import AsyncPortScanner, DEFAULT_CONCURRENCY, DEFAULT_PORTS, check_port
+from .network.resolver_cache import ResolutionCache, get_resolution_cache
+from .network import dns_scanner
+from .network.ip_tools import DISCOVERY_PORTS, discover_hosts
+from .network.fingerprint import Fingerprinter, open_ports_of
+from .utils.geoip import DEFAULT_DB_PATH, get_locator
+from .utils.metrics import Metrics
+from .pipeline import StageGraph
+from .checkpoint import Checkpoint
+from .incremental import IP_GROUPS, STAGE_GROUPS, stale_groups, diff_results
 
 class NetworkScanner:
-    def __init__(self, max_threads: int = 10):
+    def __init__(self, max_threads: int = 10, port_concurrency: int = DEFAULT_CONCURRENCY,
+                 port_timeout: float = 1.0, rate_per_host: Optional[float] = None,
+                 rate: Optional[float] = None, rate_per_prefix: Optional[float] = None,
+                 backoff: bool = True,
+                 resolution_cache: Optional[ResolutionCache] = None,
+                 dns_record_types: Iterable[str] = dns_scanner.DEFAULT_RECORD_TYPES,
+                 dns_resolver=None, http_timeout: float = 5.0, http_timeout_budget: float = 10.0,
+                 http_connections_per_host: int = 10, fingerprint: bool = True,
+                 geoip: bool = True, geoip_db: Optional[str] = None,
+                 metrics: Optional[Metrics] = None):
         self.logger = self._setup_logger()
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.resolution_cache = resolution_cache or get_resolution_cache()
+        self.dns_record_types = [t.upper() for t in dns_record_types]
+        self.dns_resolver = dns_resolver
         self.max_threads = max_threads
         self.user_agent = "CyberpunkIPScanner/1.0"
+        self.port_scanner = AsyncPortScanner(concurrency=port_concurrency,
+                                             timeout=port_timeout,
+                                             rate=rate,
+                                             rate_per_host=rate_per_host,
+                                             rate_per_prefix=rate_per_prefix,
+                                             backoff=backoff,
+                                             metrics=self.metrics)
+        self.fingerprinter = Fingerprinter(self.port_scanner) if fingerprint else None
+        self._http_options = {'per_host_connections': http_connections_per_host,
+                              'timeout': http_timeout, 'timeout_budget': http_timeout_budget}
+        self._http_client = None
+        if geoip_db is None and os.path.exists(DEFAULT_DB_PATH):
+            geoip_db = DEFAULT_DB_PATH
+        locator = get_locator(geoip_db) if geoip and geoip_db else None
+        self.geoip = locator if locator is not None and locator.enabled else None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._active_targets = 0
+        self._active_lock = threading.Lock()
+        self._register_gauges()
         
     def _setup_logger(self):
         logger = logging.getLogger('CyberScanner')
         logger.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        ch = logging.StreamHandler()
-        ch.setFormatter(formatter)
-        logger.addHandler(ch)
+        # Un seul handler pour toutes les instances, sinon chaque ligne est dupliquée
+        if not logger.handlers:
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            ch = logging.StreamHandler()
+            ch.setFormatter(formatter)
+            logger.addHandler(ch)
         return logger
 
-    def scan_website(self, url: str) -> Dict:
-        """Scan complet d'un site web"""
+    def _register_gauges(self):
+        """Jauges lues à chaque export : travail en cours et files d'attente"""
+        metrics, ports = self.metrics, self.port_scanner
+        metrics.gauge('inflight', lambda: self._active_targets, kind='targets')
+        metrics.gauge('inflight', lambda: ports.inflight, kind='connects')
+        metrics.gauge('queue_depth', lambda: ports.waiting, queue='connects')
+        metrics.gauge('queue_depth', self._executor_backlog, queue='stages')
+        for result in ('hits', 'misses', 'negative_hits'):
+            metrics.gauge('dns_cache_lookups', lambda r=result: self.resolution_cache.stats[r], result=result)
+
+    def _executor_backlog(self) -> int:
+        executor = self._executor
+        return executor._work_queue.qsize() if executor is not None else 0
+
+    def _target_done(self, graph: StageGraph):
+        """Durée et issue de chaque étape d'une cible terminée"""
+        with self._active_lock:
+            self._active_targets -= 1
+        metrics = self.metrics
+        for name, elapsed in graph.timings.items():
+            if name == 'total':
+                metrics.observe('target_seconds', elapsed)
+            elif name not in graph.restored:
+                metrics.observe('stage_seconds', elapsed, stage=name)
+                metrics.inc('stages_total', stage=name, outcome='ok' if name in graph.results else 'error')
+
+    @property
+    def http_client(self):
+        """Client HTTP créé (et requests importé) au premier usage de l'étape HTTP"""
+        with self._executor_lock:
+            if self._http_client is None:
+                from .network.http_client import HttpClient
+                self._http_client = HttpClient(user_agent=self.user_agent,
+                                               resolution_cache=self.resolution_cache,
+                                               metrics=self.metrics, **self._http_options)
+            return self._http_client
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        """Pool de workers partagé par toutes les cibles et toutes les étapes"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_threads, thread_name_prefix='scan-worker')
+            return self._executor
+
+    def close(self):
+        """Libère le pool de workers et la boucle du scanner de ports"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.port_scanner.close()
+        with self._executor_lock:
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+    def scan_website(self, url: str, ports: List[int] = None, on_stage: Callable = None,
+                     on_port: Callable[[int, Dict], None] = None,
+                     cancel: threading.Event = None) -> Dict:
+        """Scan complet d'un site web
+
+        `on_stage(name, value, error, done, total)` et `on_port(port, result)`
+        sont appelés au fil de l'eau depuis les threads du scanner ; `cancel`
+        interrompt les étapes et les ports en cours.
+        """
+        url, timestamp, graph = self._start_scan(url, ports, on_stage=on_stage,
+                                                 on_port=on_port, cancel=cancel)
+        return self._build_results(url, timestamp, graph.wait())
+
+    def rescan(self, url: str, previous: Optional[Dict], ports: List[int] = None,
+               ttls: Dict = None) -> Dict:
+        """Rescan incrémental : seules les étapes périmées de `previous` sont refaites
+
+        Le résultat contient `changes`, la liste des différences avec `previous`.
+        """
+        groups = stale_groups(previous, ttls)
+        url, timestamp, graph = self._start_scan(url, ports, groups)
+        graph.wait()
+        moved = self._moved_groups(graph, previous, groups)
+        if moved:
+            groups = set(groups) | moved
+            _, _, graph = self._start_scan(url, ports, groups, restored=dict(graph.results))
+            graph.wait()
+        return self._build_results(url, timestamp, graph, previous, groups)
+
+    @staticmethod
+    def _moved_groups(graph: StageGraph, previous: Optional[Dict], groups: Iterable[str]) -> set:
+        """Groupes liés à l'IP à refaire quand la cible a changé d'adresse
+
+        Les réponses gardées de `previous` (reverse DNS, ports...) décrivent
+        l'ancienne IP : elles ne valent plus rien pour la nouvelle.
+        """
+        if not previous or 'resolve' not in graph.results:
+            return set()
+        if (previous.get('ip_info') or {}).get('ip_address') == graph.results['resolve']:
+            return set()
+        return {group for group in IP_GROUPS if group not in groups}
+
+    def _start_scan(self, url: str, ports: List[int] = None, groups: Iterable[str] = STAGE_GROUPS,
+                    on_stage: Callable = None, on_port: Callable[[int, Dict], None] = None,
+                    cancel: threading.Event = None, restored: Dict = None):
+        """Lance les étapes d'un scan en parallèle sur le pool partagé
+
+        DNS et HTTP sont indépendants ; reverse DNS, disponibilité et ports
+        ne dépendent que de la résolution de l'IP. Seuls les groupes d'étapes
+        de `groups` sont exécutés, et celles de `restored` ne sont pas refaites.
+        """
         if not url.startswith(('http://', 'https://')):
             url = f'https://{url}'
-            
+        domain = self._domain(url)
+        if ports is None:
+            ports = DEFAULT_PORTS
+
+        graph = StageGraph(self._get_executor(), on_stage=on_stage, cancel=cancel, restored=restored)
+        graph.add('resolve', lambda: self.resolution_cache.resolve(domain))
+        if 'ip' in groups:
+            graph.add('reverse_dns', self.resolution_cache.reverse, 'resolve')
+            graph.add('liveness', self.check_host, 'resolve')
+            if self.geoip is not None:
+                graph.add('geoip', self.geoip.locate_ip, 'resolve')
+        if 'ports' in groups:
+            graph.add('ports', lambda ip: self.port_scanner.scan_sync(ip, ports, on_port, cancel),
+                      'resolve')
+            if self.fingerprinter is not None:
+                graph.add('fingerprint', self._fingerprint_stage, 'resolve', 'ports')
+        if 'dns' in groups:
+            for rdtype in self.dns_record_types:
+                graph.add(f'dns:{rdtype}', self._dns_stage(domain, rdtype))
+        if 'http' in groups:
+            graph.add('server', lambda: self.get_server_info(url))
+        with self._active_lock:
+            self._active_targets += 1
+        graph.future.add_done_callback(lambda future: self._target_done(graph))
+        graph.run()
+        return url, datetime.now().isoformat(), graph
+
+    def _build_results(self, url: str, timestamp: str, graph: StageGraph,
+                       previous: Optional[Dict] = None, groups: Iterable[str] = STAGE_GROUPS) -> Dict:
+        stage_results, errors = graph.results, graph.errors
+        previous = previous or {}
+        if 'resolve' in errors:
+            self.logger.error(f"IP scan error: {errors['resolve']}")
+            ip_info = {'error': errors['resolve']}
+        elif 'ip' in groups:
+            ip_info = {
+                'ip_address': stage_results['resolve'],
+                'reverse_dns': stage_results.get('reverse_dns'),
+                'is_up': stage_results.get('liveness', False)
+            }
+            if 'geoip' in graph.stages:
+                ip_info['location'] = stage_results.get('geoip')
+        else:
+            ip_info = dict(previous.get('ip_info') or {}, ip_address=stage_results['resolve'])
+
+        if 'dns' in groups:
+            dns_records, dns_errors = {}, {}
+            for rdtype in self.dns_record_types:
+                stage = f'dns:{rdtype}'
+                if stage in stage_results:
+                    dns_records[rdtype] = stage_results[stage]
+                else:
+                    dns_errors[rdtype] = errors.get(stage)
+            if dns_errors:
+                self.logger.error(f"DNS scan error: {dns_errors}")
+                dns_records['errors'] = dns_errors
+        else:
+            dns_records = previous.get('dns_records', {})
+
+        if 'http' in groups:
+            server_info = stage_results.get('server', {'error': errors.get('server')})
+        else:
+            server_info = previous.get('server_info', {})
+
+        if 'ports' in groups:
+            open_ports = stage_results.get('ports', {})
+            for port, fingerprint in stage_results.get('fingerprint', {}).items():
+                open_ports[port] = dict(open_ports[port], fingerprint=fingerprint)
+        else:
+            open_ports = previous.get('open_ports', {})
+
+        now = time.time()
+        previous_checks = previous.get('checked_at') or {}
+        checked_at = {group: now if group in groups else previous_checks.get(group)
+                      for group in STAGE_GROUPS}
+
         results = {
             'url': url,
-            'timestamp': datetime.now().isoformat(),
-            'ip_info': self.get_ip_info(url),
-            'dns_records': self.get_dns_records(url),
-            'server_info': self.get_server_info(url),
-            'open_ports': self.scan_ports(url)
+            'timestamp': timestamp,
+            'ip_info': ip_info,
+            'dns_records': dns_records,
+            'server_info': server_info,
+            'open_ports': open_ports,
+            'timings': dict(graph.timings),
+            'checked_at': checked_at
         }
-        
+        stage_errors = {name: error for name, error in errors.items()
+                        if name != 'resolve' and not name.startswith('dns:')
+                        and not error.startswith('skipped')}
+        if stage_errors:
+            results['errors'] = stage_errors
+        if previous:
+            results['changes'] = diff_results(previous, results)
         return results
 
+    def scan_many(self, targets: Iterable[str], ports: List[int] = None,
+                  previous: Callable[[str], Optional[Dict]] = None, ttls: Dict = None,
+                  cancel: threading.Event = None, checkpoint: Checkpoint = None) -> Iterator[Dict]:
+        """Scanne une liste de cibles et produit chaque résultat dès qu'il est prêt
+
+        Les cibles sont consommées au fil de l'eau (fichier, stdin) et au plus
+        2 * max_threads cibles sont en cours ; leurs étapes partagent le même pool.
+        Avec `previous` (cible -> dernier résultat, ex. ResultStore.latest) le
+        scan devient incrémental, voir `rescan`. Une fois `cancel` positionné,
+        plus aucune cible n'est lancée et les scans en cours s'arrêtent.
+        Avec `checkpoint`, chaque étape réussie et chaque cible terminée sont
+        journalisées : les cibles déjà terminées sont sautées et les étapes
+        déjà faites ne sont pas relancées.
+        """
+        max_pending = self.max_threads * 2
+        pending = {}
+        targets = iter(targets)
+        exhausted = False
+
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                if cancel is not None and cancel.is_set():
+                    exhausted = True
+                    break
+                target = next(targets, None)
+                if target is None:
+                    exhausted = True
+                    break
+                target = target.strip()
+                if not target or target.startswith('#'):
+                    continue
+                if checkpoint is not None and checkpoint.is_done(target):
+                    continue
+                try:
+                    last = previous(self._domain(target).lower()) if previous else None
+                    groups = stale_groups(last, ttls) if previous else STAGE_GROUPS
+                    restored, on_stage = None, None
+                    if checkpoint is not None:
+                        restored = checkpoint.restored(target)
+                        on_stage = self._checkpoint_stage(checkpoint, target, restored)
+                    url, timestamp, graph = self._start_scan(target, ports, groups, on_stage=on_stage,
+                                                             cancel=cancel, restored=restored)
+                except Exception as e:
+                    self.logger.error(f"Scan error for {target}: {e}")
+                    yield {'url': target, 'timestamp': datetime.now().isoformat(), 'error': str(e)}
+                    continue
+                pending[graph.future] = (target, url, timestamp, graph, last, groups)
+
+            if not pending:
+                break
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                target, url, timestamp, graph, last, groups = pending.pop(future)
+                moved = self._moved_groups(graph, last, groups)
+                if moved:
+                    # Nouvelle IP : les étapes faites sont reprises telles quelles, le reste est relancé
+                    groups = set(groups) | moved
+                    restored = dict(graph.results)
+                    on_stage = (self._checkpoint_stage(checkpoint, target, restored)
+                                if checkpoint is not None else None)
+                    _, _, graph = self._start_scan(target, ports, groups, on_stage=on_stage,
+                                                   cancel=cancel, restored=restored)
+                    pending[graph.future] = (target, url, timestamp, graph, last, groups)
+                    continue
+                result = self._build_results(url, timestamp, graph, last, groups)
+                if previous and not last:
+                    result['changes'] = diff_results(None, result)
+                if checkpoint is not None and not (cancel is not None and cancel.is_set()):
+                    checkpoint.target_done(target, result)
+                yield result
+
+    @staticmethod
+    def _checkpoint_stage(checkpoint: Checkpoint, target: str, restored: Dict) -> Callable:
+        """Callback on_stage qui journalise les étapes réussies d'une cible"""
+        def on_stage(name, value, error, done, total):
+            if name not in restored:
+                checkpoint.stage_done(target, name, value, error)
+        return on_stage
+
+    def scan_network(self, specs: Iterable[str], ports: List[int] = None,
+                     probe_ports: Iterable[int] = DISCOVERY_PORTS, timeout: float = None) -> Iterator[Dict]:
+        """Balaye des CIDR / plages d'adresses et scanne les ports de chaque hôte vivant
+
+        Les hôtes sont produits au fil de l'eau, avec leurs ports, dès que le
+        scan de ports de l'hôte est terminé, et géolocalisés si une base GeoIP
+        est disponible.
+        """
+        if ports is None:
+            ports = DEFAULT_PORTS
+        for host in discover_hosts(specs, probe_ports, timeout or self.port_scanner.timeout,
+                                   scanner=self.port_scanner, scan_ports=ports):
+            ip_info = {'ip_address': host['ip'], 'is_up': True, 'answered': host['answered']}
+            if self.geoip is not None:
+                ip_info['location'] = self.geoip.locate_ip(host['ip'])
+            yield {
+                'url': host['ip'],
+                'timestamp': datetime.now().isoformat(),
+                'ip_info': ip_info,
+                'open_ports': host['open_ports']
+            }
+
+    def _fingerprint_stage(self, ip: str, ports: Dict) -> Dict:
+        open_ports = open_ports_of(ports)
+        return self.fingerprinter.fingerprint_sync(ip, open_ports) if open_ports else {}
+
+    def _dns_stage(self, domain: str, rdtype: str):
+        return lambda: dns_scanner.query_records(domain, rdtype, self.dns_resolver)
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        return url.split('//')[-1].split('/')[0]
+
     def get_ip_info(self, url: str) -> Dict:
         """Récupère les informations IP de base"""
         try:
             domain = url.split('//')[-1].split('/')[0]
-            ip = socket.gethostbyname(domain)
+            ip = self.resolution_cache.resolve(domain)
             
             return {
                 'ip_address': ip,
-                'reverse_dns': socket.getfqdn(ip),
+                'reverse_dns': self.resolution_cache.reverse(ip),
                 'is_up': self.check_host(ip)
             }
         except Exception as e:
@@ -54,73 +400,25 @@ class NetworkScanner:
 
     def get_dns_records(self, url: str) -> Dict:
         """Récupère les enregistrements DNS"""
-        domain = url.split('//')[-1].split('/')[0]
-        records = {}
-        
-        try:
-            # A Records
-            answers = dns.resolver.resolve(domain, 'A')
-            records['A'] = [str(r) for r in answers]
-            
-            # MX Records
-            answers = dns.resolver.resolve(domain, 'MX')
-            records['MX'] = [str(r.exchange) for r in answers]
-            
-            # NS Records
-            answers = dns.resolver.resolve(domain, 'NS')
-            records['NS'] = [str(r) for r in answers]
-            
-            # TXT Records
-            answers = dns.resolver.resolve(domain, 'TXT')
-            records['TXT'] = [str(r) for r in answers]
-            
-        except Exception as e:
-            self.logger.error(f"DNS scan error: {e}")
-            
-        return records
+        return dns_scanner.get_dns_records(self._domain(url), self.dns_record_types, self.dns_resolver)
 
     def scan_ports(self, url: str, ports: List[int] = None) -> Dict:
         """Scan des ports ouverts"""
         if ports is None:
-            ports = [21, 22, 80, 443, 8080, 8443]
+            ports = DEFAULT_PORTS
             
         domain = url.split('//')[-1].split('/')[0]
-        ip = socket.gethostbyname(domain)
-        results = {}
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_threads) as executor:
-            future_to_port = {executor.submit(self.check_port, ip, port): port for port in ports}
-            for future in concurrent.futures.as_completed(future_to_port):
-                port = future_to_port[future]
-                try:
-                    results[port] = future.result()
-                except Exception as e:
-                    results[port] = {'status': 'error', 'error': str(e)}
-                    
-        return results
+        ip = self.resolution_cache.resolve(domain)
+        return self.port_scanner.scan_sync(ip, ports)
 
     def check_port(self, ip: str, port: int) -> Dict:
         """Vérifie un port individuel"""
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(1.0)
-                result = s.connect_ex((ip, port))
-                return {
-                    'status': 'open' if result == 0 else 'closed',
-                    'service': socket.getservbyport(port) if result == 0 else None
-                }
-        except Exception as e:
-            return {'status': 'error', 'error': str(e)}
+        return check_port(ip, port, self.port_scanner.timeout)
 
     def get_server_info(self, url: str) -> Dict:
         """Récupère les en-têtes HTTP du serveur"""
         try:
-            response = requests.head(
-                url, 
-                headers={'User-Agent': self.user_agent},
-                allow_redirects=True,
-                timeout=5
-            )
+            response = self.http_client.head(url, allow_redirects=True)
             
             return {
                 'server': response.headers.get('Server'),
@@ -138,9 +436,6 @@ class NetworkScanner:
             return {'error': str(e)}
 
     def check_host(self, ip: str) -> bool:
-        """Vérifie si l'hôte est en ligne"""
-        try:
-            socket.create_connection((ip, 80), timeout=2)
-            return True
-        except:
-            return False
+        """Vérifie si l'hôte est en ligne (handshake ou RST sur le port 80)"""
+        state = self.port_scanner.submit(self.port_scanner.connect(ip, 80)).result()
+        return state in ('open', 'refused')
@@ -1,14 +1,23 @@
+import re
+from datetime import datetime
 from PyQt5.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, 
-                            QLabel, QLineEdit, QPushButton, QTreeWidget, 
-                            QTreeWidgetItem, QWidget, QFrame)
-from PyQt5.QtCore import Qt
+                            QLabel, QLineEdit, QPushButton, QTreeView, QTableView,
+                            QWidget, QFrame, QProgressBar, QSplitter, QHeaderView,
+                            QAbstractItemView)
+from PyQt5.QtCore import Qt, QThread, QTimer, QModelIndex, QPersistentModelIndex
 from PyQt5.QtGui import QColor, QPalette, QFont
 from .matrix_background import MatrixBackground
+from .scan_worker import ScanWorker
+from .results_model import ScanResultsModel, ScanResultsFilter
 
 class NetworkScannerUI(QMainWindow):
     def __init__(self, scanner):
         super().__init__()
         self.scanner = scanner
+        self._scan_thread = None
+        self._scan_worker = None
+        self._live = None
+        self._live_index = QPersistentModelIndex()
         self.initUI()
         
     def initUI(self):
@@ -43,7 +52,7 @@ class NetworkScannerUI(QMainWindow):
                 background-color: rgba(10, 10, 20, 180);
                 border: 1px solid #00FFFF;
             }
-            QTreeWidget {
+            QTreeView, QTableView {
                 background: rgba(10, 10, 20, 180);
                 color: #C8C8FF;
                 border: 1px solid #00FFFF;
@@ -62,7 +71,7 @@ class NetworkScannerUI(QMainWindow):
         
         # Champ de recherche
         self.url_input = QLineEdit()
-        self.url_input.setPlaceholderText("Enter website URL (e.g., https://freedom.fr)")
+        self.url_input.setPlaceholderText("Enter website URL(s) (e.g., https://freedom.fr, example.org)")
         self.url_input.setStyleSheet("""
             background: rgba(20, 20, 40, 200);
             color: #00FFFF;
@@ -86,14 +95,76 @@ class NetworkScannerUI(QMainWindow):
                 background: rgba(60, 60, 100, 200);
             }
         """)
-        self.scan_button.clicked.connect(self.start_scan)
+        self.scan_button.clicked.connect(self.toggle_scan)
         self.content_layout.addWidget(self.scan_button)
         
-        # Arborescence des résultats
-        self.results_tree = QTreeWidget()
-        self.results_tree.setHeaderLabels(["Property", "Value"])
-        self.results_tree.setColumnWidth(0, 300)
-        self.content_layout.addWidget(self.results_tree)
+        # Progression du scan en cours
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setTextVisible(True)
+        self.progress_bar.setStyleSheet("""
+            QProgressBar {
+                background: rgba(20, 20, 40, 200);
+                color: #00FFFF;
+                border: 1px solid #FF00FF;
+                text-align: center;
+                font-family: 'Courier New';
+            }
+            QProgressBar::chunk {
+                background: #FF00FF;
+            }
+        """)
+        self.progress_bar.hide()
+        self.content_layout.addWidget(self.progress_bar)
+        
+        # Filtre des résultats
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter results (target, IP, ports, server)")
+        self.filter_input.setStyleSheet(self.url_input.styleSheet())
+        self.content_layout.addWidget(self.filter_input)
+        
+        # Résultats : une ligne par cible, détail paresseux de la cible courante
+        self.results_model = ScanResultsModel(self)
+        self.results_proxy = ScanResultsFilter(self)
+        self.results_proxy.setSourceModel(self.results_model)
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(
+            lambda: self.results_proxy.set_filter_text(self.filter_input.text()))
+        self.filter_input.textChanged.connect(self.filter_timer.start)
+        
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_proxy)
+        self.results_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.results_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.results_table.setWordWrap(False)
+        self.results_table.verticalHeader().hide()
+        self.results_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.results_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.results_table.horizontalHeader().setStretchLastSection(True)
+        self.results_table.setSortingEnabled(True)
+        self.results_table.setColumnWidth(0, 300)
+        self.results_table.setColumnWidth(1, 150)
+        self.results_table.selectionModel().currentRowChanged.connect(self.show_details)
+        
+        # Le détail n'a de modèle que lorsqu'une cible est affichée : enraciné
+        # sur le modèle entier, il referait sa mise en page à chaque lot
+        self.results_tree = QTreeView()
+        self.results_tree.setUniformRowHeights(True)
+        self.results_tree.setHeaderHidden(True)
+        self.results_model.modelAboutToBeReset.connect(lambda: self.results_tree.setModel(None))
+        self.results_model.rowsInserted.connect(self.expand_sections)
+        
+        self.results_splitter = QSplitter(Qt.Vertical)
+        self.results_splitter.addWidget(self.results_table)
+        self.results_splitter.addWidget(self.results_tree)
+        self.content_layout.addWidget(self.results_splitter)
+        
+        # Mises à jour du scan en cours regroupées pour ne pas redessiner à chaque port
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(100)
+        self.live_timer.timeout.connect(self.flush_live)
         
         # Ajouter le cadre au layout principal
         self.main_layout.addWidget(self.content_frame)
@@ -106,77 +177,146 @@ class NetworkScannerUI(QMainWindow):
         palette.setColor(QPalette.Text, QColor(200, 200, 255))
         self.setPalette(palette)
         
+    def toggle_scan(self):
+        if self._scan_worker is not None:
+            self.cancel_scan()
+        else:
+            self.start_scan()
+        
     def start_scan(self):
-        url = self.url_input.text().strip()
-        if not url:
+        targets = [t for t in re.split(r'[\s,;]+', self.url_input.text()) if t]
+        if not targets or self._scan_worker is not None:
+            return
+            
+        self.results_model.clear()
+        self._live = None
+        if len(targets) == 1:
+            # Ligne de la cible remplie au fil des étapes
+            self._live = {'url': targets[0], 'timestamp': datetime.now().isoformat(),
+                          'ip_info': {}, 'dns_records': {}, 'server_info': {}, 'open_ports': {}}
+            self._live_index = QPersistentModelIndex(self.results_model.add_result(self._live))
+            self.select_result(QModelIndex(self._live_index))
+        
+        # Le scan tourne dans un QThread, les résultats arrivent par signaux
+        self._scan_thread = QThread(self)
+        self._scan_worker = ScanWorker(self.scanner, targets)
+        self._scan_worker.moveToThread(self._scan_thread)
+        self._scan_thread.started.connect(self._scan_worker.run)
+        self._scan_worker.stage_done.connect(self.on_stage_done)
+        self._scan_worker.port_result.connect(self.on_port_result)
+        self._scan_worker.results_ready.connect(self.results_model.add_results)
+        self._scan_worker.progress.connect(self.on_progress)
+        self._scan_worker.finished.connect(self.on_scan_finished)
+        self._scan_worker.failed.connect(self.on_scan_failed)
+        self._scan_thread.start()
+        
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.scan_button.setText("Cancel Scan")
+        
+    def cancel_scan(self):
+        if self._scan_worker is not None:
+            self._scan_worker.cancel()
+            self.scan_button.setText("Cancelling...")
+            self.scan_button.setEnabled(False)
+        
+    def on_stage_done(self, name, value, error):
+        live = self._live
+        if live is None:
+            return
+        if name == 'resolve':
+            live['ip_info'].update({'ip_address': value} if error is None else {'error': error})
+        elif error is not None:
+            if name.startswith('dns:'):
+                live['dns_records'].setdefault('errors', {})[name[4:]] = error
+            else:
+                return
+        elif name == 'reverse_dns':
+            live['ip_info']['reverse_dns'] = value
+        elif name == 'liveness':
+            live['ip_info']['is_up'] = value
+        elif name.startswith('dns:'):
+            live['dns_records'][name[4:]] = value
+        elif name == 'server':
+            live['server_info'] = value
+        elif name == 'fingerprint':
+            for port, fingerprint in value.items():
+                live['open_ports'][port] = dict(live['open_ports'].get(port, {}), fingerprint=fingerprint)
+        else:
             return
+        self.live_timer.start()
+        
+    def on_port_result(self, port, info):
+        if self._live is not None:
+            self._live['open_ports'][port] = info
+            if not self.live_timer.isActive():
+                self.live_timer.start()
+        
+    def flush_live(self):
+        if self._live is not None and self._live_index.isValid():
+            self.results_model.set_result(QModelIndex(self._live_index), self._live)
+        
+    def on_progress(self, done, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        
+    def on_scan_finished(self, results):
+        self._stop_scan_thread()
+        if results is not None and self._live_index.isValid():
+            self.results_model.set_result(QModelIndex(self._live_index), results)
+        self._live = None
+        
+    def on_scan_failed(self, message):
+        self._stop_scan_thread()
+        self._live = None
+        self.select_result(self.results_model.add_result({'url': "Error", 'error': message}))
+        
+    def _stop_scan_thread(self):
+        self._scan_thread.quit()
+        self._scan_thread.wait()
+        self._scan_worker.deleteLater()
+        self._scan_thread.deleteLater()
+        self._scan_worker = None
+        self._scan_thread = None
+        self.live_timer.stop()
+        self.progress_bar.hide()
+        self.scan_button.setText("Start Network Scan")
+        self.scan_button.setEnabled(True)
+        
+    def closeEvent(self, event):
+        if self._scan_worker is not None:
+            self._scan_worker.cancel()
+            self._scan_thread.quit()
+            self._scan_thread.wait()
+        super().closeEvent(event)
             
-        self.results_tree.clear()
-        loading_item = QTreeWidgetItem(self.results_tree)
-        loading_item.setText(0, "Scanning...")
-        loading_item.setText(1, url)
-        
-        from threading import Thread
-        scan_thread = Thread(target=self.run_scan, args=(url,))
-        scan_thread.start()
-        
-    def run_scan(self, url):
-        try:
-            results = self.scanner.scan_website(url)
-            self.display_results(results)
-        except Exception as e:
-            error_item = QTreeWidgetItem(self.results_tree)
-            error_item.setText(0, "Error")
-            error_item.setText(1, str(e))
+    def select_result(self, source_index):
+        index = self.results_proxy.mapFromSource(source_index)
+        if index.isValid():
+            self.results_table.setCurrentIndex(index)
+        
+    def show_details(self, current, previous=None):
+        root = self.results_proxy.mapToSource(current.sibling(current.row(), 0))
+        if not root.isValid():
+            self.results_tree.setModel(None)
+            return
+        if self.results_tree.model() is None:
+            self.results_tree.setModel(self.results_model)
+            for column in range(2, self.results_model.columnCount()):
+                self.results_tree.hideColumn(column)
+            self.results_tree.setColumnWidth(0, 300)
+        self.results_tree.setRootIndex(root)
+        if self.results_model.canFetchMore(root):
+            self.results_model.fetchMore(root)
+        self.expand_sections(root, 0, self.results_model.rowCount(root) - 1)
+        
+    def expand_sections(self, parent, first, last):
+        # Déplie les sections de la cible affichée ; leurs enfants sont construits à la demande
+        if parent.isValid() and self.results_tree.model() is not None \
+                and parent == self.results_tree.rootIndex():
+            for row in range(first, last + 1):
+                self.results_tree.expand(self.results_model.index(row, 0, parent))
             
     def display_results(self, results):
-        self.results_tree.clear()
-        root = QTreeWidgetItem(self.results_tree)
-        root.setText(0, "Scan Results")
-        root.setText(1, results['url'])
-        
-        # IP Information
-        ip_item = QTreeWidgetItem(root)
-        ip_item.setText(0, "IP Information")
-        for key, value in results['ip_info'].items():
-            child = QTreeWidgetItem(ip_item)
-            child.setText(0, key)
-            child.setText(1, str(value))
-        
-        # DNS Records
-        dns_item = QTreeWidgetItem(root)
-        dns_item.setText(0, "DNS Records")
-        for rec_type, values in results['dns_records'].items():
-            child = QTreeWidgetItem(dns_item)
-            child.setText(0, rec_type)
-            child.setText(1, ", ".join(values) if isinstance(values, list) else str(values))
-        
-        # Server Info
-        server_item = QTreeWidgetItem(root)
-        server_item.setText(0, "Server Information")
-        for key, value in results['server_info'].items():
-            if isinstance(value, dict):
-                child = QTreeWidgetItem(server_item)
-                child.setText(0, key)
-                for subkey, subvalue in value.items():
-                    subchild = QTreeWidgetItem(child)
-                    subchild.setText(0, subkey)
-                    subchild.setText(1, str(subvalue))
-            else:
-                child = QTreeWidgetItem(server_item)
-                child.setText(0, key)
-                child.setText(1, str(value))
-        
-        # Open Ports
-        ports_item = QTreeWidgetItem(root)
-        ports_item.setText(0, "Open Ports")
-        for port, info in results['open_ports'].items():
-            child = QTreeWidgetItem(ports_item)
-            child.setText(0, f"Port {port}")
-            child.setText(1, info.get('status', 'unknown'))
-            if 'service' in info and info['service']:
-                service_child = QTreeWidgetItem(child)
-                service_child.setText(0, "Service")
-                service_child.setText(1, info['service'])
-        
-        self.results_tree.expandAll()
+        self.results_model.clear()
+        self.select_result(self.results_model.add_result(results))
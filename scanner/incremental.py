@@ -0,0 +1,90 @@
+import time
+from typing import Dict, List, Optional, Set
+
+# Groups of scan stages that are refreshed together, and how long (seconds)
+# a previous answer stays valid before an incremental rescan repeats it.
+STAGE_GROUPS = ('ip', 'dns', 'http', 'ports')
+# Groups whose answers describe the resolved address, not the name
+IP_GROUPS = ('ip', 'ports')
+DEFAULT_TTLS = {
+    'ip': 3600,
+    'dns': 86400,
+    'http': 6 * 3600,
+    'ports': 3600,
+}
+
+SECURITY_HEADERS = ('strict_transport_security', 'content_security_policy', 'x_frame_options')
+
+
+def stale_groups(previous: Optional[Dict], ttls: Dict = None, now: float = None) -> Set[str]:
+    """Stage groups of `previous` whose answer is older than its TTL"""
+    if not previous or previous.get('error'):
+        return set(STAGE_GROUPS)
+    ttls = {**DEFAULT_TTLS, **(ttls or {})}
+    now = time.time() if now is None else now
+    checked = previous.get('checked_at') or {}
+    stale = set()
+    for group in STAGE_GROUPS:
+        checked_at = checked.get(group)
+        if checked_at is None or now - checked_at >= ttls[group]:
+            stale.add(group)
+    return stale
+
+
+def _port_status(results: Dict) -> Dict:
+    ports = results.get('open_ports') or {}
+    return {int(port): info.get('status') for port, info in ports.items() if isinstance(info, dict)}
+
+
+def diff_results(old: Optional[Dict], new: Dict) -> List[Dict]:
+    """What changed between two results of the same target"""
+    if not old:
+        return [{'field': 'target', 'change': 'new'}]
+    changes = []
+
+    old_ip = (old.get('ip_info') or {}).get('ip_address')
+    new_ip = (new.get('ip_info') or {}).get('ip_address')
+    if old_ip != new_ip:
+        changes.append({'field': 'ip_address', 'change': 'changed', 'old': old_ip, 'new': new_ip})
+
+    old_dns, new_dns = old.get('dns_records') or {}, new.get('dns_records') or {}
+    for rdtype in sorted((set(old_dns) | set(new_dns)) - {'errors'}):
+        before, after = set(old_dns.get(rdtype) or []), set(new_dns.get(rdtype) or [])
+        if before != after:
+            changes.append({'field': f'dns_records.{rdtype}', 'change': 'changed',
+                            'added': sorted(after - before), 'removed': sorted(before - after)})
+
+    old_ports, new_ports = _port_status(old), _port_status(new)
+    for port in sorted(set(old_ports) | set(new_ports)):
+        before, after = old_ports.get(port), new_ports.get(port)
+        if before == after:
+            continue
+        if after == 'open':
+            change = 'opened'
+        elif before == 'open':
+            change = 'closed'
+        else:
+            change = 'changed'
+        changes.append({'field': 'open_ports', 'port': port, 'change': change,
+                        'old': before, 'new': after})
+
+    old_server, new_server = old.get('server_info') or {}, new.get('server_info') or {}
+    for key in ('server', 'status_code', 'final_url'):
+        if old_server.get(key) != new_server.get(key):
+            changes.append({'field': f'server_info.{key}', 'change': 'changed',
+                            'old': old_server.get(key), 'new': new_server.get(key)})
+    old_headers = old_server.get('security_headers') or {}
+    new_headers = new_server.get('security_headers') or {}
+    for header in SECURITY_HEADERS:
+        before, after = old_headers.get(header), new_headers.get(header)
+        if before == after:
+            continue
+        if after is None:
+            change = 'missing'
+        elif before is None:
+            change = 'added'
+        else:
+            change = 'changed'
+        changes.append({'field': f'security_headers.{header}', 'change': change,
+                        'old': before, 'new': after})
+    return changes
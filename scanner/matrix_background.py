@@ -1,80 +1,244 @@
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtGui import QPainter, QColor, QFont
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QPainter, QColor, QFont, QFontMetrics, QPixmap, QRegion
+from PyQt5.QtCore import Qt, QTimer, QEvent, QRect
 import random
 import math
+import time
 
 class MatrixBackground(QWidget):
-    def __init__(self, parent=None):
+    """Pluie de caractères Matrix derrière l'interface
+
+    Les glyphes sont pré-rendus une fois par caractère, couleur et niveau de
+    fondu ; chaque image ne redessine que les colonnes qui ont bougé. Le
+    timer s'arrête quand le widget est caché ou la fenêtre réduite, ralentit
+    quand la fenêtre n'est pas active, et la cadence baisse d'elle-même si le
+    dessin dépasse `paint_budget` de l'intervalle entre deux images.
+    """
+    BASE_FPS = 12.5      # vitesse de référence des colonnes (ancien timer de 80 ms)
+    FADE_LEVELS = 8
+
+    def __init__(self, parent=None, max_fps=12.5, min_fps=2.0, idle_fps=4.0, paint_budget=0.25):
         super().__init__(parent)
         self.setAttribute(Qt.WA_TransparentForMouseEvents)
         self.setAttribute(Qt.WA_TranslucentBackground)
-        
+
         # Configuration Matrix
         self.chars = "01アイウエオ"  # Mélange binaire et katakana
         self.font_size = 14
-        self.columns = math.ceil(self.width() / self.font_size)
-        self.positions = [random.randint(-20, 0) for _ in range(self.columns)]
-        self.speeds = [random.randint(1, 4) for _ in range(self.columns)]
         self.colors = [
             QColor(0, 255, 0),   # Vert néon
             QColor(0, 200, 100), # Turquoise
             QColor(150, 255, 0)  # Vert lime
         ]
-        
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.idle_fps = idle_fps
+        self.paint_budget = paint_budget
+        self.fps = max_fps
+        self.paint_time = 0.0
+        self.last_dirty = QRegion()
+        self._build_atlas()
+
+        self.columns = 0
+        self.rows = 0
+        self.positions = []
+        self.speeds = []
+        self.trails = []
+        self.glyphs = []
+        self.particles = []
+        self._last_tick = None
+
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_matrix)
-        self.timer.start(80)  # Plus fluide à 12-13 FPS
-        
-    def update_matrix(self):
-        for i in range(self.columns):
-            if (self.positions[i] * self.font_size > self.height() + 20 or 
-                random.random() < 0.03):
-                self.positions[i] = 0
-                self.speeds[i] = random.randint(1, 4)
-            else:
-                self.positions[i] += self.speeds[i]
-        self.update()
-        
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setFont(QFont("Courier New", self.font_size, QFont.Bold))
-        
-        for i in range(self.columns):
-            x = i * self.font_size
-            trail_length = random.randint(5, 15)
-            
-            for j in range(max(0, self.positions[i] - trail_length), self.positions[i]):
-                y = j * self.font_size
-                if 0 <= y < self.height():
-                    char = random.choice(self.chars)
-                    # Effet de fondu
-                    alpha = 255 * (1 - (self.positions[i] - j) / trail_length)
-                    color_idx = min(j % 3, len(self.colors)-1)
-                    color = QColor(self.colors[color_idx])
-                    color.setAlpha(int(alpha))
+
+        # Suit la taille du parent (sinon le widget reste à sa taille par défaut)
+        if parent is not None:
+            parent.installEventFilter(self)
+            self.setGeometry(parent.rect())
+        self._resize_columns()
+
+    def _build_atlas(self):
+        """Pixmaps [caractère][couleur][niveau de fondu], rendus une seule fois"""
+        font = QFont("Courier New", self.font_size, QFont.Bold)
+        metrics = QFontMetrics(font)
+        self.ascent = metrics.ascent()
+        self.glyph_height = metrics.height()
+        self.glyph_width = max(metrics.horizontalAdvance(c) for c in self.chars)
+        ratio = self.devicePixelRatioF()
+        self.atlas = []
+        for char in self.chars:
+            per_color = []
+            for base in self.colors:
+                levels = [None]
+                for level in range(1, self.FADE_LEVELS):
+                    pixmap = QPixmap(math.ceil(self.glyph_width * ratio), math.ceil(self.glyph_height * ratio))
+                    pixmap.setDevicePixelRatio(ratio)
+                    pixmap.fill(Qt.transparent)
+                    color = QColor(base)
+                    color.setAlpha(int(255 * level / (self.FADE_LEVELS - 1)))
+                    painter = QPainter(pixmap)
+                    painter.setFont(font)
                     painter.setPen(color)
-                    painter.drawText(x, y, char)
-                    
-        # Ajouter des particules aléatoires
-        for _ in range(5):
-            x = random.randint(0, self.width())
-            y = random.randint(0, self.height())
-            painter.setPen(QColor(0, 255, 0, random.randint(50, 150)))
-            painter.drawText(x, y, random.choice(self.chars))
-                    
-        painter.end()
-        
-    def resizeEvent(self, event):
+                    painter.drawText(0, self.ascent, char)
+                    painter.end()
+                    levels.append(pixmap)
+                per_color.append(levels)
+            self.atlas.append(per_color)
+
+    def _resize_columns(self):
         new_columns = math.ceil(self.width() / self.font_size)
+        self.rows = math.ceil(self.height() / self.font_size) + 2
         if new_columns > self.columns:
             # Ajouter de nouvelles colonnes
             diff = new_columns - self.columns
-            self.positions += [random.randint(-20, 0) for _ in range(diff)]
+            self.positions += [float(random.randint(-20, 0)) for _ in range(diff)]
             self.speeds += [random.randint(1, 4) for _ in range(diff)]
+            self.trails += [random.randint(5, 15) for _ in range(diff)]
+            self.glyphs += [[] for _ in range(diff)]
         elif new_columns < self.columns:
             # Supprimer des colonnes
-            self.positions = self.positions[:new_columns]
-            self.speeds = self.speeds[:new_columns]
-            
+            del self.positions[new_columns:], self.speeds[new_columns:]
+            del self.trails[new_columns:], self.glyphs[new_columns:]
         self.columns = new_columns
+        for i, glyphs in enumerate(self.glyphs):
+            if len(glyphs) < self.rows:
+                glyphs += [random.randrange(len(self.chars)) for _ in range(self.rows - len(glyphs))]
+
+    def _span_rect(self, column, first_row, last_row):
+        """Rectangle couvert par les lignes [first_row, last_row) d'une colonne"""
+        top = first_row * self.font_size - self.ascent
+        return QRect(column * self.font_size, top, self.glyph_width,
+                     (last_row - first_row) * self.font_size + self.glyph_height)
+
+    def update_matrix(self):
+        now = time.monotonic()
+        dt = 1 / self.fps if self._last_tick is None else min(now - self._last_tick, 0.5)
+        self._last_tick = now
+        if self.window().isMinimized():
+            self.timer.stop()
+            return
+        self.advance(dt)
+        if not self.last_dirty.isEmpty():
+            self.update(self.last_dirty)
+        self._adapt_fps()
+
+    def advance(self, dt):
+        """Fait avancer l'animation de `dt` secondes et calcule la zone à redessiner"""
+        steps = dt * self.BASE_FPS
+        reset_chance = 1 - (1 - 0.03) ** steps
+        height = self.height() + 20
+        dirty = QRegion()
+        for i in range(self.columns):
+            old = self.positions[i]
+            old_trail = self.trails[i]
+            if old * self.font_size > height or random.random() < reset_chance:
+                new = 0.0
+                self.speeds[i] = random.randint(1, 4)
+                self.trails[i] = random.randint(5, 15)
+            else:
+                new = old + self.speeds[i] * steps
+            self.positions[i] = new
+            old_row, new_row = int(old), int(new)
+            if old_row == new_row and old_row <= 0:
+                continue
+            # Quelques caractères changent dans la traînée
+            glyphs = self.glyphs[i]
+            if new_row > 0:
+                row = random.randrange(max(0, new_row - self.trails[i]), new_row)
+                if row < len(glyphs):
+                    glyphs[row] = random.randrange(len(self.chars))
+            old_first = max(0, old_row - old_trail)
+            new_first = max(0, new_row - self.trails[i])
+            if new_first <= old_row and old_first <= new_row:
+                dirty += self._span_rect(i, min(old_first, new_first), max(old_row, new_row) + 1)
+            else:
+                dirty += self._span_rect(i, old_first, old_row + 1)
+                dirty += self._span_rect(i, new_first, new_row + 1)
+
+        # Particules aléatoires : effacer les précédentes, dessiner les nouvelles
+        for x, y, _ in self.particles:
+            dirty += QRect(x, y - self.ascent, self.glyph_width, self.glyph_height)
+        self.particles = []
+        if self.width() > 0 and self.height() > 0:
+            for _ in range(5):
+                x = random.randint(0, self.width())
+                y = random.randint(0, self.height())
+                pixmap = self.atlas[random.randrange(len(self.chars))][0][random.randint(1, 4)]
+                self.particles.append((x, y, pixmap))
+                dirty += QRect(x, y - self.ascent, self.glyph_width, self.glyph_height)
+        self.last_dirty = dirty
+
+    def _adapt_fps(self):
+        target = self.max_fps if self.isActiveWindow() else min(self.idle_fps, self.max_fps)
+        budget = self.paint_budget / self.fps
+        if self.paint_time > budget:
+            fps = max(self.min_fps, self.fps * 0.8)
+        else:
+            fps = min(target, self.fps * 1.1) if self.paint_time < budget / 2 else self.fps
+        fps = min(fps, target)
+        if abs(fps - self.fps) > 0.01:
+            self.fps = fps
+            self.timer.setInterval(int(1000 / fps))
+
+    def paintEvent(self, event):
+        started = time.perf_counter()
+        painter = QPainter(self)
+        region = event.region()
+        size = self.font_size
+        ascent = self.ascent
+        atlas = self.atlas
+        color_count = len(self.colors)
+        top_row = max(0, (event.rect().top() + ascent) // size)
+        bottom_row = (event.rect().bottom() + self.glyph_height) // size + 1
+
+        for i in range(self.columns):
+            position = int(self.positions[i])
+            if position <= 0:
+                continue
+            trail = self.trails[i]
+            first = max(0, position - trail, top_row)
+            last = min(position, bottom_row, len(self.glyphs[i]))
+            if first >= last or not region.intersects(self._span_rect(i, first, last)):
+                continue
+            x = i * size
+            glyphs = self.glyphs[i]
+            for j in range(first, last):
+                # Effet de fondu
+                level = int((1 - (position - j) / trail) * (self.FADE_LEVELS - 1) + 0.5)
+                if level:
+                    painter.drawPixmap(x, j * size - ascent, atlas[glyphs[j]][j % color_count][level])
+
+        for x, y, pixmap in self.particles:
+            painter.drawPixmap(x, y - ascent, pixmap)
+        painter.end()
+
+        elapsed = time.perf_counter() - started
+        self.paint_time = elapsed if not self.paint_time else 0.8 * self.paint_time + 0.2 * elapsed
+
+    def eventFilter(self, watched, event):
+        if watched is self.parent() and event.type() == QEvent.Resize:
+            self.setGeometry(self.parent().rect())
+        elif watched is self.window() and event.type() in (QEvent.WindowStateChange,
+                                                             QEvent.ActivationChange):
+            self._sync_timer()
+        return False
+
+    def _sync_timer(self):
+        if self.isVisible() and not self.window().isMinimized():
+            if not self.timer.isActive():
+                self._last_tick = None
+                self.timer.start(int(1000 / self.fps))
+        else:
+            self.timer.stop()
+
+    def showEvent(self, event):
+        window = self.window()
+        if window is not self:
+            window.installEventFilter(self)
+        self._sync_timer()
+
+    def hideEvent(self, event):
+        self.timer.stop()
+
+    def resizeEvent(self, event):
+        self._resize_columns()
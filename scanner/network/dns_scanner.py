@@ -1,31 +1,100 @@
-import dns.resolver
-from typing import Dict
+import concurrent.futures
+import threading
+from typing import Dict, Iterable, Iterator, List, Tuple
 import logging
+from .resolver_cache import get_resolution_cache, get_resolver
 
 logger = logging.getLogger(__name__)
 
-def get_dns_records(domain: str) -> Dict:
-    """Get DNS records for a domain"""
-    records = {}
-    
+DEFAULT_RECORD_TYPES = ('A', 'MX', 'NS', 'TXT')
+SUPPORTED_RECORD_TYPES = ('A', 'AAAA', 'CNAME', 'MX', 'NS', 'TXT', 'SOA', 'CAA')
+DNS_WORKERS = 32
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> concurrent.futures.ThreadPoolExecutor:
+    """Process-wide bounded pool of DNS queries, shared by every target"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ThreadPoolExecutor(max_workers=DNS_WORKERS,
+                                                          thread_name_prefix='dns-query')
+        return _pool
+
+
+def query_records(domain: str, rdtype: str, resolver: 'dns.resolver.Resolver' = None) -> List[str]:
+    """Query one record type, an empty answer is an empty list"""
+    import dns.resolver
+    rdtype = rdtype.upper()
+    if rdtype == 'A' and resolver is None:
+        return get_resolution_cache().lookup(domain)
     try:
-        # A Records
-        answers = dns.resolver.resolve(domain, 'A')
-        records['A'] = [str(r) for r in answers]
-        
-        # MX Records
-        answers = dns.resolver.resolve(domain, 'MX')
-        records['MX'] = [str(r.exchange) for r in answers]
-        
-        # NS Records
-        answers = dns.resolver.resolve(domain, 'NS')
-        records['NS'] = [str(r) for r in answers]
-        
-        # TXT Records
-        answers = dns.resolver.resolve(domain, 'TXT')
-        records['TXT'] = [str(r) for r in answers]
-        
-    except Exception as e:
-        logger.error(f"DNS scan error: {e}")
-        
+        answers = (resolver or get_resolver()).resolve(domain, rdtype)
+    except dns.resolver.NoAnswer:
+        return []
+    if rdtype == 'MX':
+        return [str(r.exchange) for r in answers]
+    return [str(r) for r in answers]
+
+
+def _collect(domain: str, futures: Dict[str, concurrent.futures.Future]) -> Dict:
+    records, errors = {}, {}
+    for rdtype, future in futures.items():
+        try:
+            records[rdtype] = future.result()
+        except Exception as e:
+            errors[rdtype] = str(e)
+    if errors:
+        logger.error(f"DNS scan error for {domain}: {errors}")
+        records['errors'] = errors
     return records
+
+
+def get_dns_records(domain: str, record_types: Iterable[str] = DEFAULT_RECORD_TYPES,
+                    resolver: 'dns.resolver.Resolver' = None) -> Dict:
+    """Get DNS records for a domain, all record types queried concurrently
+
+    Queries go through one process-wide pool of DNS_WORKERS threads, so
+    targets scanned in parallel never run more than that many at once.
+    """
+    record_types = [t.upper() for t in record_types]
+    pool = _get_pool()
+    futures = {t: pool.submit(query_records, domain, t, resolver) for t in record_types}
+    return _collect(domain, futures)
+
+
+def get_dns_records_bulk(domains: Iterable[str], record_types: Iterable[str] = DEFAULT_RECORD_TYPES,
+                         resolver: 'dns.resolver.Resolver' = None,
+                         max_workers: int = 32) -> Iterator[Tuple[str, Dict]]:
+    """Yield (domain, records) for many domains as each one completes, once per
+    input line even when a domain is listed twice
+
+    Every (domain, record type) query goes through one bounded pool, so the
+    pipeline keeps `max_workers` queries in flight across domains.
+    """
+    record_types = [t.upper() for t in record_types]
+    max_pending = max(1, max_workers * 2 // max(1, len(record_types)))
+    domains = iter(domains)
+    pending = {}    # input position -> (domain, futures), a domain may be listed twice
+    position = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            while len(pending) < max_pending:
+                domain = next(domains, None)
+                if domain is None:
+                    break
+                domain = domain.strip()
+                if domain:
+                    pending[position] = (domain, {t: executor.submit(query_records, domain, t, resolver)
+                                                  for t in record_types})
+                    position += 1
+            if not pending:
+                return
+            waiting = [f for _, futures in pending.values() for f in futures.values()]
+            concurrent.futures.wait(waiting, return_when=concurrent.futures.FIRST_COMPLETED)
+            for key in [k for k, (_, futures) in pending.items()
+                        if all(f.done() for f in futures.values())]:
+                domain, futures = pending.pop(key)
+                yield domain, _collect(domain, futures)
@@ -0,0 +1,180 @@
+import os
+import re
+import socket
+import struct
+import asyncio
+from typing import Dict, Iterable, List, Optional
+import logging
+from .port_scanner import AsyncPortScanner
+
+logger = logging.getLogger(__name__)
+
+TLS_PORTS = {443, 465, 636, 853, 990, 993, 995, 5061, 8443, 9443}
+
+# (service, pattern, product group, version group), compiled once; first match wins
+SIGNATURES = [
+    ('ssh', rb'^SSH-([\d.]+)-([^\s\r\n]+)', 2, 1),
+    ('http', rb'^HTTP/(\d\.\d) \d{3}(?:.*?\r\n[Ss]erver: *([^\r\n]+))?', 2, 1),
+    ('tls', rb'^\x16\x03[\x00-\x04]..\x02...(\x03[\x00-\x04])', None, 1),
+    ('tls', rb'^\x15\x03[\x00-\x04]', None, None),
+    ('smtp', rb'^220[ -][^\r\n]*?E?SMTP ?([^\r\n]*)', 1, None),
+    ('ftp', rb'^220[ -][^\r\n]*?(FileZilla|vsFTPd|ProFTPD|Pure-FTPd|FTP)', 1, None),
+    ('pop3', rb'^\+OK[ \r\n]([^\r\n]*)', 1, None),
+    ('imap', rb'^\* OK[ \r\n]([^\r\n]*)', 1, None),
+    ('mysql', rb'^.\x00\x00\x00\x0a([\d.]+)[^\x00]*\x00', None, 1),
+    ('redis', rb'^-(?:ERR|NOAUTH|DENIED)', None, None),
+    ('vnc', rb'^RFB (\d{3}\.\d{3})', None, 1),
+]
+_COMPILED = [(service, re.compile(pattern, re.S), product, version)
+             for service, pattern, product, version in SIGNATURES]
+
+HTTP_PROBE = b'HEAD / HTTP/1.0\r\nUser-Agent: CyberpunkIPScanner/1.0\r\n\r\n'
+TLS_VERSIONS = {b'\x03\x00': 'SSLv3', b'\x03\x01': 'TLSv1.0', b'\x03\x02': 'TLSv1.1',
+                b'\x03\x03': 'TLSv1.2', b'\x03\x04': 'TLSv1.3'}
+
+
+def _client_hello() -> bytes:
+    """Minimal TLS 1.2 ClientHello with common ciphers, enough for a ServerHello"""
+    ciphers = [0xc02f, 0xc030, 0xc02b, 0xc02c, 0x009c, 0x009d, 0x002f, 0x0035, 0x00ff]
+    extensions = (
+        struct.pack('!HHH', 0x000a, 6, 4) + struct.pack('!HH', 0x0017, 0x0018) +   # supported groups
+        struct.pack('!HHB', 0x000b, 2, 1) + b'\x00' +                            # ec point formats
+        struct.pack('!HHH', 0x000d, 10, 8) +                                     # signature algorithms
+        struct.pack('!HHHH', 0x0401, 0x0501, 0x0403, 0x0804)
+    )
+    body = (b'\x03\x03' + os.urandom(32) + b'\x00' +
+            struct.pack('!H', len(ciphers) * 2) + struct.pack(f'!{len(ciphers)}H', *ciphers) +
+            b'\x01\x00' + struct.pack('!H', len(extensions)) + extensions)
+    handshake = b'\x01' + len(body).to_bytes(3, 'big') + body
+    return b'\x16\x03\x01' + struct.pack('!H', len(handshake)) + handshake
+
+
+TLS_PROBE = _client_hello()
+
+
+def match_banner(data) -> Optional[Dict]:
+    """Match a banner (bytes or memoryview) against the signature set"""
+    for service, pattern, product_group, version_group in _COMPILED:
+        match = pattern.match(data)
+        if match is None:
+            continue
+        result = {'service': service}
+        if product_group and match.group(product_group):
+            result['product'] = match.group(product_group).decode('latin-1').strip()
+        if version_group and match.group(version_group):
+            version = bytes(match.group(version_group))
+            result['version'] = TLS_VERSIONS.get(version, version.decode('latin-1'))
+        return result
+    return None
+
+
+class Fingerprinter:
+    """Banner grabbing and light probing of open ports on the scanner loop.
+
+    At most `concurrency` probes are in flight; each one reads into a
+    preallocated buffer of `read_bytes` taken from a shared pool, so memory
+    stays bounded whatever the number of ports. Servers that speak first
+    (SSH, SMTP, FTP...) get `passive_wait` seconds, then an HTTP request is
+    sent; known TLS ports get a ClientHello straight away.
+    """
+
+    def __init__(self, scanner: AsyncPortScanner, concurrency: int = 200, read_bytes: int = 1024,
+                 read_timeout: float = 2.0, passive_wait: float = 0.5):
+        self.scanner = scanner
+        self.concurrency = concurrency
+        self.read_bytes = read_bytes
+        self.read_timeout = read_timeout
+        self.passive_wait = passive_wait
+        self._pool: Optional[asyncio.Queue] = None
+
+    def _buffers(self) -> asyncio.Queue:
+        if self._pool is None:
+            self._pool = asyncio.Queue()
+            for _ in range(self.concurrency):
+                self._pool.put_nowait(bytearray(self.read_bytes))
+        return self._pool
+
+    async def _read(self, sock, view: memoryview, filled: int, timeout: float) -> int:
+        """Read into `view` until it is full, the peer closes or `timeout` runs out"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while filled < len(view):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                count = await asyncio.wait_for(loop.sock_recv_into(sock, view[filled:]), remaining)
+            except asyncio.TimeoutError:
+                break
+            if count == 0:
+                break
+            filled += count
+            if filled and match_banner(view[:filled]):
+                break
+        return filled
+
+    async def fingerprint(self, ip: str, port: int) -> Dict:
+        """Identify the service on an open port; plain-text probes fall back to TLS"""
+        pool = self._buffers()
+        buffer = await pool.get()
+        view = memoryview(buffer)
+        try:
+            tls = port in TLS_PORTS
+            result = await self._probe(ip, port, view, tls)
+            if result['service'] is None and not tls:
+                tls_result = await self._probe(ip, port, view, True)
+                if tls_result['service'] is not None:
+                    result = tls_result
+            return result
+        finally:
+            view.release()
+            pool.put_nowait(buffer)
+
+    async def _probe(self, ip: str, port: int, view: memoryview, tls: bool) -> Dict:
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET6 if ':' in ip else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), self.scanner.host_timeout(ip) * 2)
+            filled = 0
+            if tls:
+                await loop.sock_sendall(sock, TLS_PROBE)
+            else:
+                filled = await self._read(sock, view, 0, self.passive_wait)
+                if not filled:
+                    await loop.sock_sendall(sock, HTTP_PROBE)
+            filled = await self._read(sock, view, filled, self.read_timeout)
+            if not filled:
+                return {'service': None}
+            data = view[:filled]
+            result = match_banner(data) or {'service': None}
+            if result['service'] not in ('tls', None):
+                result['banner'] = bytes(data[:200]).split(b'\r\n', 1)[0].decode('latin-1')
+            return result
+        except (OSError, asyncio.TimeoutError) as e:
+            return {'service': None, 'error': str(e) or type(e).__name__}
+        finally:
+            sock.close()
+
+    async def fingerprint_ports(self, ip: str, ports: Iterable[int]) -> Dict:
+        ports = list(ports)
+        scheduler = self.scanner.scheduler
+
+        async def bounded(port):
+            await scheduler.acquire(ip)
+            try:
+                return await self.fingerprint(ip, port)
+            finally:
+                scheduler.release(ip)
+
+        results = await asyncio.gather(*(bounded(port) for port in ports))
+        return dict(zip(ports, results))
+
+    def fingerprint_sync(self, ip: str, ports: Iterable[int]) -> Dict:
+        """Blocking wrapper, safe to call from any thread"""
+        return self.scanner.submit(self.fingerprint_ports(ip, ports)).result()
+
+
+def open_ports_of(scan_results: Dict) -> List[int]:
+    return [port for port, info in scan_results.items()
+            if isinstance(info, dict) and info.get('status') == 'open']
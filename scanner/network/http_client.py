@@ -0,0 +1,133 @@
+import time
+import threading
+from typing import Dict, Optional
+from urllib.parse import urljoin
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from .resolver_cache import ResolutionCache, get_resolution_cache
+
+logger = logging.getLogger(__name__)
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class _CachedResolutionMixin:
+    """Connect to the address from the ResolutionCache, keep the hostname for SNI/Host"""
+    resolution_cache: ResolutionCache = None
+    stats: Dict = None
+
+    def _new_conn(self):
+        hostname = self._dns_host
+        try:
+            address = self.resolution_cache.resolve(hostname)
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to resolve {hostname!r}: {e}") from e
+        self._dns_host = address
+        try:
+            conn = super()._new_conn()
+        finally:
+            self._dns_host = hostname
+        with self.stats['lock']:
+            self.stats['connections_opened'] += 1
+        return conn
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools resolve through the shared cache and count new connections"""
+
+    def __init__(self, resolution_cache: ResolutionCache, stats: Dict, **kwargs):
+        attrs = {'resolution_cache': resolution_cache, 'stats': stats}
+        http_conn = type('CachedHTTPConnection', (_CachedResolutionMixin, HTTPConnection), attrs)
+        https_conn = type('CachedHTTPSConnection', (_CachedResolutionMixin, HTTPSConnection), attrs)
+        self._pool_classes = {
+            'http': type('CachedHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http_conn}),
+            'https': type('CachedHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https_conn}),
+        }
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+
+class HttpClient:
+    """Keep-alive HTTP client shared by every scan.
+
+    One requests.Session with a bounded connection pool per host
+    (`per_host_connections`), hostnames resolved through the ResolutionCache
+    and redirects followed by hand so the whole chain stays within
+    `timeout_budget` seconds. Extra transports (an HTTP/2 adapter for
+    instance) can be plugged in with `mount`. With `metrics` each request
+    is timed and counted by status class.
+    """
+
+    def __init__(self, user_agent: str = None, per_host_connections: int = 10,
+                 max_hosts: int = 256, timeout: float = 5.0, timeout_budget: float = 10.0,
+                 max_redirects: int = 10, resolution_cache: Optional[ResolutionCache] = None,
+                 metrics=None):
+        self.timeout = timeout
+        self.metrics = metrics
+        self.timeout_budget = timeout_budget
+        self.max_redirects = max_redirects
+        self.stats = {'lock': threading.Lock(), 'requests': 0, 'connections_opened': 0}
+        self.session = requests.Session()
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+        adapter = PooledAdapter(resolution_cache or get_resolution_cache(), self.stats,
+                                pool_connections=max_hosts, pool_maxsize=per_host_connections,
+                                pool_block=True, max_retries=0)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def mount(self, prefix: str, adapter: HTTPAdapter):
+        """Route URLs starting with `prefix` through another transport adapter"""
+        self.session.mount(prefix, adapter)
+
+    def head(self, url: str, headers: Dict = None, allow_redirects: bool = True) -> requests.Response:
+        """HEAD request; the redirect chain shares one timeout budget"""
+        deadline = time.monotonic() + self.timeout_budget
+        history = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout(f"Timeout budget of {self.timeout_budget}s exhausted for {url}")
+            started = time.perf_counter()
+            try:
+                response = self.session.head(url, headers=headers, allow_redirects=False,
+                                             timeout=min(self.timeout, remaining))
+            except requests.RequestException:
+                if self.metrics is not None:
+                    self.metrics.observe('http_request_seconds', time.perf_counter() - started)
+                    self.metrics.inc('http_requests_total', status='error')
+                raise
+            if self.metrics is not None:
+                self.metrics.observe('http_request_seconds', time.perf_counter() - started)
+                self.metrics.inc('http_requests_total', status=f'{response.status_code // 100}xx')
+            with self.stats['lock']:
+                self.stats['requests'] += 1
+            location = response.headers.get('Location')
+            if not allow_redirects or response.status_code not in REDIRECT_CODES or not location:
+                response.history = history
+                return response
+            if len(history) >= self.max_redirects:
+                raise requests.TooManyRedirects(f"Exceeded {self.max_redirects} redirects for {url}")
+            response.close()
+            history.append(response)
+            url = urljoin(response.url, location)
+
+    def snapshot(self) -> Dict:
+        """Requests sent and connections opened, the rest were reused from the pool"""
+        with self.stats['lock']:
+            requests_sent = self.stats['requests']
+            opened = self.stats['connections_opened']
+        return {'requests': requests_sent, 'connections_opened': opened,
+                'connections_reused': max(0, requests_sent - opened)}
+
+    def close(self):
+        self.session.close()
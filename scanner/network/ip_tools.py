@@ -1,16 +1,24 @@
 import socket
-from typing import Dict
+import asyncio
+import ipaddress
+import queue
+from typing import Dict, Iterable, Iterator, Tuple, Union
 import logging
+from .resolver_cache import get_resolution_cache
+from .port_scanner import AsyncPortScanner
 
 logger = logging.getLogger(__name__)
 
+DISCOVERY_PORTS = (80, 443, 22, 445, 3389)
+
 def get_ip_info(domain: str) -> Dict:
     """Get basic IP information for a domain"""
     try:
-        ip = socket.gethostbyname(domain)
+        cache = get_resolution_cache()
+        ip = cache.resolve(domain)
         return {
             'ip_address': ip,
-            'reverse_dns': socket.getfqdn(ip),
+            'reverse_dns': cache.reverse(ip),
             'is_up': check_host(ip)
         }
     except Exception as e:
@@ -20,7 +28,164 @@ def get_ip_info(domain: str) -> Dict:
 def check_host(ip: str) -> bool:
     """Check if host is online"""
     try:
-        socket.create_connection((ip, 80), timeout=2)
-        return True
-    except:
+        with socket.create_connection((ip, 80), timeout=2):
+            return True
+    except OSError:
         return False
+
+def parse_range(spec: str) -> Tuple[int, int, int]:
+    """Parse a CIDR, a range or a single address into (first, last, version)
+
+    Accepted forms: '10.0.0.0/16', '10.0.0.1-10.0.0.50', '10.0.0.1-50',
+    '192.168.1.7'. Network and broadcast addresses of IPv4 networks larger
+    than /31 are left out.
+    """
+    spec = spec.strip()
+    if '/' in spec:
+        network = ipaddress.ip_network(spec, strict=False)
+        first, last = int(network.network_address), int(network.broadcast_address)
+        if network.version == 4 and network.prefixlen < 31:
+            first, last = first + 1, last - 1
+        return first, last, network.version
+    if '-' in spec:
+        start, end = spec.split('-', 1)
+        start = ipaddress.ip_address(start.strip())
+        end = end.strip()
+        if end.isdigit() and start.version == 4:
+            end = ipaddress.ip_address(int(start) & ~0xFF | int(end))
+        else:
+            end = ipaddress.ip_address(end)
+        if end.version != start.version or int(end) < int(start):
+            raise ValueError(f"Invalid address range {spec!r}")
+        return int(start), int(end), start.version
+    address = ipaddress.ip_address(spec)
+    return int(address), int(address), address.version
+
+def count_addresses(specs: Union[str, Iterable[str]]) -> int:
+    if isinstance(specs, str):
+        specs = [specs]
+    return sum(last - first + 1 for first, last, _ in map(parse_range, specs))
+
+def iter_addresses(specs: Union[str, Iterable[str]], interleave: bool = False) -> Iterator[str]:
+    """Yield every address of the given CIDRs/ranges, one integer at a time
+
+    With `interleave`, IPv4 ranges spanning several /24s are walked one
+    address per /24 in turn (x.y.1.1, x.y.2.1, ... x.y.1.2, ...), so
+    consecutive probes hit different networks.
+    """
+    if isinstance(specs, str):
+        specs = [specs]
+    for spec in specs:
+        first, last, version = parse_range(spec)
+        if version == 4 and interleave and first >> 8 != last >> 8:
+            for offset in range(256):
+                for block in range(first >> 8, (last >> 8) + 1):
+                    value = block << 8 | offset
+                    if first <= value <= last:
+                        yield socket.inet_ntoa(value.to_bytes(4, 'big'))
+        elif version == 4:
+            for value in range(first, last + 1):
+                yield socket.inet_ntoa(value.to_bytes(4, 'big'))
+        else:
+            for value in range(first, last + 1):
+                yield str(ipaddress.IPv6Address(value))
+
+async def _probe_host(scanner: AsyncPortScanner, ip: str, ports: Iterable[int], timeout: float):
+    """A host is live as soon as one port answers, with a handshake or a RST"""
+    probes = [asyncio.ensure_future(scanner.connect(ip, port, timeout)) for port in ports]
+    try:
+        for done in asyncio.as_completed(probes):
+            state = await done
+            if state in ('open', 'refused'):
+                return ip, state
+        return None
+    finally:
+        for probe in probes:
+            probe.cancel()
+
+async def _sweep(scanner: AsyncPortScanner, addresses: Iterator[str], probe_ports, timeout: float,
+                 window: int, scan_ports, out: queue.SimpleQueue):
+    """Probe `addresses`, putting (host, release) pairs in `out` for the caller
+
+    A host holds one of `window` slots from its first probe until the caller
+    takes its result and calls `release`; dead hosts give theirs back at once.
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(window)
+    tasks, errors = set(), []
+
+    def release():
+        loop.call_soon_threadsafe(slots.release)
+
+    async def sweep_host(ip):
+        try:
+            found = await _probe_host(scanner, ip, probe_ports, timeout)
+            if found is None:
+                slots.release()
+                return
+            host = {'ip': ip, 'is_up': True, 'answered': found[1]}
+            if scan_ports:
+                host['open_ports'] = await scanner.scan(ip, scan_ports)
+        except BaseException:
+            slots.release()
+            raise
+        out.put((host, release))
+
+    def finished(task):
+        tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            errors.append(task.exception())
+
+    try:
+        for ip in addresses:
+            await slots.acquire()
+            if errors:
+                raise errors[0]
+            task = asyncio.ensure_future(sweep_host(ip))
+            tasks.add(task)
+            task.add_done_callback(finished)
+        if tasks:
+            await asyncio.wait(set(tasks))
+        if errors:
+            raise errors[0]
+    finally:
+        for task in list(tasks):
+            task.cancel()
+
+def discover_hosts(specs: Union[str, Iterable[str]], ports: Iterable[int] = DISCOVERY_PORTS,
+                   timeout: float = 1.0, scanner: AsyncPortScanner = None,
+                   window: int = None, scan_ports: Iterable[int] = None,
+                   interleave: bool = True) -> Iterator[Dict]:
+    """Sweep CIDRs/ranges for live hosts and yield each one as soon as it answers
+
+    Probes share the port scanner's global concurrency limit and rates. At
+    most `window` hosts are being probed at once, addresses are generated
+    lazily, interleaved across /24s unless `interleave` is False.
+    With `scan_ports`, each live host is handed to the port scanner right
+    away and yielded with its `open_ports`. Results not yet taken by the
+    caller count against `window`, so a slow caller pauses the sweep.
+    """
+    ports = tuple(ports)
+    if not ports:
+        raise ValueError("discover_hosts needs at least one probe port")
+    own_scanner = scanner is None
+    scanner = scanner or AsyncPortScanner(timeout=timeout)
+    scan_ports = list(scan_ports) if scan_ports else None
+    window = window or max(1, scanner.concurrency // len(ports))
+    out = queue.SimpleQueue()
+    future = scanner.submit(_sweep(scanner, iter_addresses(specs, interleave), ports, timeout, window,
+                                   scan_ports, out))
+    future.add_done_callback(lambda _: out.put(None))
+    try:
+        while True:
+            item = out.get()
+            if item is None:
+                break
+            host, release = item
+            release()
+            yield host
+        future.result()
+    finally:
+        future.cancel()
+        if own_scanner:
+            scanner.close()
@@ -0,0 +1,380 @@
+import asyncio
+import heapq
+import math
+import socket
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Slowest rate a backed-off host or prefix falls to, in connects per second
+MIN_RATE = 1.0
+# Seconds between two rate changes of a bucket, one reaction per congestion event
+HOLD = 1.0
+# Timeout fraction over the prefix baseline that counts as a spike, and the
+# fewest connects sent in one second for that second to be judged
+SPIKE = 0.3
+SPIKE_SAMPLES = 20
+
+
+class TokenBucket:
+    """Token bucket: `rate` tokens per second, up to `burst` at once.
+
+    `backoff` halves the rate, down to `floor`, at most once per `hold`
+    seconds, and `recover` raises it back by a tenth of its ceiling at
+    most `hold` seconds after the last change (additive increase,
+    multiplicative decrease). An unlimited bucket
+    (rate=None) takes the send rate measured at its first backoff as
+    ceiling, and is unlimited again once it has fully recovered.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None,
+                 floor: float = MIN_RATE, hold: float = HOLD):
+        self.ceiling = float(rate) if rate else None
+        self.configured = self.ceiling is not None
+        self.rate = self.ceiling or math.inf
+        self.floor = min(floor, self.rate)
+        self.hold = hold
+        self._burst = burst
+        self.burst = self._burst_for(self.rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.changed = self.backed_off = -math.inf
+        self._window = self.updated
+        self._sent = 0
+        self._sent_rate = 0.0
+        self._lock = None
+
+    def _burst_for(self, rate: float) -> float:
+        return float(self._burst) if self._burst is not None else max(1.0, rate)
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available, 0 if one is"""
+        if self.rate == math.inf:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        """Spend a token, `delay` must have returned 0"""
+        if now - self._window >= 1.0:
+            self._sent_rate = self._sent / (now - self._window)
+            self._window, self._sent = now, 0
+        self._sent += 1
+        if self.rate != math.inf:
+            self.tokens -= 1
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                delay = self.delay(now)
+                if not delay:
+                    self.take(now)
+                    return
+                await asyncio.sleep(delay)
+
+    def sent_rate(self, now: float) -> float:
+        """Tokens taken per second over the last second or so"""
+        return max(self._sent_rate, self._sent / max(1.0, now - self._window))
+
+    def backoff(self, now: float) -> bool:
+        if now - self.backed_off < self.hold:
+            return False
+        if self.rate == math.inf:
+            self.ceiling = max(MIN_RATE, self.sent_rate(now))
+            self.rate = self.ceiling
+            self.floor = min(self.floor, self.rate)
+            self.tokens, self.updated = 0.0, now
+        else:
+            self.delay(now)
+        self.rate = max(self.floor, self.rate / 2)
+        self.burst = self._burst_for(self.rate)
+        self.tokens = min(self.tokens, self.burst)
+        self.changed = self.backed_off = now
+        return True
+
+    def recover(self, now: float):
+        if self.ceiling is None or now - self.changed < self.hold:
+            return
+        if self.rate >= self.ceiling and self.configured:
+            return
+        self.delay(now)
+        self.rate = min(self.ceiling, self.rate + self.ceiling / 10)
+        if self.rate >= self.ceiling and not self.configured:
+            self.rate, self.ceiling = math.inf, None
+        self.burst = self._burst_for(self.rate)
+        self.changed = now
+
+
+def prefix_of(ip: str, v4: int = 24, v6: int = 48) -> Tuple[int, int]:
+    """(version, network number) of the /v4 or /v6 prefix holding `ip`"""
+    try:
+        if ':' in ip:
+            return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big') >> (128 - v6)
+        return 4, int.from_bytes(socket.inet_aton(ip), 'big') >> (32 - v4)
+    except OSError:
+        return 0, hash(ip)
+
+
+class _Prefix:
+    __slots__ = ('bucket', 'seconds', 'oldest', 'baseline')
+
+    def __init__(self, bucket: Optional[TokenBucket]):
+        self.bucket = bucket
+        # Second a connect was sent -> [outcomes, timeouts]
+        self.seconds: Dict[int, List[int]] = {}
+        self.oldest = None
+        self.baseline = None
+
+
+class _Host:
+    __slots__ = ('bucket', 'prefix', 'buckets')
+
+    def __init__(self, bucket: Optional[TokenBucket], prefix: _Prefix, shared: Optional[TokenBucket]):
+        self.bucket = bucket
+        self.prefix = prefix
+        # Checked in this order before a connect: the host's own limit first
+        self.buckets = [b for b in (bucket, prefix.bucket, shared) if b is not None]
+
+
+class PolitenessScheduler:
+    """Hands out connect slots fairly across hosts without tripping rate limits.
+
+    At most `concurrency` connects are in flight. Free slots go to the
+    hosts with waiting connects in turn, so one target with a thousand
+    ports does not starve the others, and only when the host, its /24
+    (or /48) prefix and the whole scanner all have a token: `rate`,
+    `rate_per_prefix` and `rate_per_host` are connects per second, None
+    for unlimited. Hosts waiting for tokens are parked until they refill.
+
+    With `backoff`, the host and prefix limits react to signs of
+    throttling: a connection reset, or a retry answered after a timeout
+    (the first SYN was dropped), halves both; a timeout spike halves the
+    prefix. Timeouts are counted by the second their connect was sent,
+    once `settle` seconds (the longest connect timeout) have passed, so
+    that the late, clustered timeouts of filtered ports do not look like
+    a spike; a second is a spike when its timeout fraction exceeds the
+    prefix baseline by SPIKE. Without signals the limits rise back step
+    by step. Unlimited hosts and prefixes are limited from the rate at
+    which they were being probed. `rate` is never changed, it is the
+    operator's ceiling.
+
+    Runs on the port scanner loop: no locks, every method is called
+    from that thread.
+    """
+
+    def __init__(self, concurrency: int, rate: Optional[float] = None,
+                 rate_per_host: Optional[float] = None, rate_per_prefix: Optional[float] = None,
+                 prefix_v4: int = 24, prefix_v6: int = 48, backoff: bool = True,
+                 settle: float = 5.0, max_hosts: int = 65536, metrics=None):
+        self.concurrency = concurrency
+        self.settle = settle
+        self.rate_per_host = rate_per_host
+        self.rate_per_prefix = rate_per_prefix
+        self.prefix_v4 = prefix_v4
+        self.prefix_v6 = prefix_v6
+        self.backoff = backoff
+        self.max_hosts = max_hosts
+        self.metrics = metrics
+        self.inflight = 0
+        self.waiting = 0
+        self._global = TokenBucket(rate) if rate else None
+        self._free = concurrency
+        self._hosts: 'OrderedDict[str, _Host]' = OrderedDict()
+        self._prefixes: 'OrderedDict[Tuple[int, int], _Prefix]' = OrderedDict()
+        # Hosts with waiting connects, served round-robin
+        self._ring: 'OrderedDict[str, Deque[asyncio.Future]]' = OrderedDict()
+        # Hosts out of tokens, with the time their tokens are back
+        self._sleeping: Dict[str, Deque[asyncio.Future]] = {}
+        self._parked: List[Tuple[float, int, str]] = []
+        self._sequence = 0
+        self._timer = None
+        self._timer_at = math.inf
+
+    def _host(self, ip: str) -> _Host:
+        host = self._hosts.get(ip)
+        if host is not None:
+            self._hosts.move_to_end(ip)
+            return host
+        key = prefix_of(ip, self.prefix_v4, self.prefix_v6)
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            limited = self.rate_per_prefix or self.backoff
+            prefix = self._prefixes[key] = _Prefix(TokenBucket(self.rate_per_prefix) if limited else None)
+            if len(self._prefixes) > self.max_hosts:
+                self._prefixes.popitem(last=False)
+        else:
+            self._prefixes.move_to_end(key)
+        limited = self.rate_per_host or self.backoff
+        host = self._hosts[ip] = _Host(TokenBucket(self.rate_per_host) if limited else None,
+                                       prefix, self._global)
+        if len(self._hosts) > self.max_hosts:
+            self._hosts.popitem(last=False)
+        return host
+
+    @staticmethod
+    def _delay(host: _Host, now: float) -> float:
+        delay = 0.0
+        for bucket in host.buckets:
+            delay = max(delay, bucket.delay(now))
+        return delay
+
+    def _grant(self, host: _Host, now: float):
+        for bucket in host.buckets:
+            bucket.take(now)
+        self._free -= 1
+        self.inflight += 1
+
+    async def acquire(self, ip: str):
+        """Wait for a connect slot to `ip`"""
+        host = self._host(ip)
+        now = time.monotonic()
+        if self._free > 0 and not self._ring and ip not in self._sleeping and not self._delay(host, now):
+            self._grant(host, now)
+            return
+        future = asyncio.get_running_loop().create_future()
+        queue = self._ring.get(ip)
+        if queue is None:
+            queue = self._sleeping.get(ip)
+        if queue is None:
+            queue = self._ring[ip] = deque()
+        queue.append(future)
+        self.waiting += 1
+        try:
+            self._dispatch()
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted while being cancelled: give the slot back
+                self.release(ip)
+            else:
+                self._forget(ip, future)
+            raise
+        finally:
+            self.waiting -= 1
+
+    def release(self, ip: str, state: Optional[str] = None, elapsed: float = 0.0):
+        """Give a slot back; `state` and `elapsed` of the connect feed the backoff"""
+        self._free += 1
+        self.inflight -= 1
+        if self.backoff and state is not None:
+            self._feedback(ip, state, elapsed)
+        if self._ring or self._sleeping:
+            self._dispatch()
+
+    def _forget(self, ip: str, future: asyncio.Future):
+        for waiting in (self._ring, self._sleeping):
+            queue = waiting.get(ip)
+            if queue is not None:
+                try:
+                    queue.remove(future)
+                except ValueError:
+                    pass
+                if not queue:
+                    del waiting[ip]
+                return
+
+    def _dispatch(self):
+        now = time.monotonic()
+        while self._parked and self._parked[0][0] <= now:
+            _, _, ip = heapq.heappop(self._parked)
+            queue = self._sleeping.pop(ip, None)
+            if queue:
+                self._ring[ip] = queue
+        wake = self._parked[0][0] if self._parked else math.inf
+        while self._free > 0 and self._ring:
+            if self._global is not None:
+                delay = self._global.delay(now)
+                if delay:
+                    wake = min(wake, now + delay)
+                    break
+            ip, queue = next(iter(self._ring.items()))
+            while queue and queue[0].done():
+                queue.popleft()
+            if not queue:
+                del self._ring[ip]
+                continue
+            host = self._host(ip)
+            delay = self._delay(host, now)
+            if delay:
+                del self._ring[ip]
+                self._sleeping[ip] = queue
+                self._sequence += 1
+                heapq.heappush(self._parked, (now + delay, self._sequence, ip))
+                wake = min(wake, now + delay)
+                continue
+            self._grant(host, now)
+            queue.popleft().set_result(None)
+            if queue:
+                self._ring.move_to_end(ip)
+            else:
+                del self._ring[ip]
+        if wake < self._timer_at and (self._ring or self._sleeping):
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer_at = wake
+            self._timer = asyncio.get_running_loop().call_later(max(0.0, wake - now), self._on_timer)
+
+    def _on_timer(self):
+        self._timer, self._timer_at = None, math.inf
+        self._dispatch()
+
+    def _feedback(self, ip: str, state: str, elapsed: float):
+        now = time.monotonic()
+        host = self._host(ip)
+        if state == 'reset':
+            self.congestion(ip, 'reset')
+            return
+        prefix = host.prefix
+        sent = int(now - elapsed)
+        counts = prefix.seconds.get(sent)
+        if counts is None:
+            counts = prefix.seconds[sent] = [0, 0]
+            if prefix.oldest is None or sent < prefix.oldest:
+                prefix.oldest = sent
+        counts[0] += 1
+        if state == 'timeout':
+            counts[1] += 1
+        settled = now - self.settle
+        while prefix.oldest is not None and prefix.oldest < settled:
+            counts = prefix.seconds.pop(prefix.oldest, None)
+            prefix.oldest = min(prefix.seconds) if prefix.seconds else None
+            if counts is None or counts[0] < SPIKE_SAMPLES:
+                continue
+            fraction = counts[1] / counts[0]
+            if prefix.baseline is None:
+                prefix.baseline = fraction
+                continue
+            if fraction - prefix.baseline > SPIKE:
+                self._backoff(prefix.bucket, now, 'prefix', 'timeouts')
+            prefix.baseline += (fraction - prefix.baseline) / 2
+        host.bucket.recover(now)
+        if prefix.bucket is not None:
+            prefix.bucket.recover(now)
+
+    def congestion(self, ip: str, reason: str = 'drop'):
+        """Evidence that connects to `ip` are being throttled: slow down its host and prefix"""
+        if not self.backoff:
+            return
+        now = time.monotonic()
+        host = self._host(ip)
+        self._backoff(host.bucket, now, 'host', reason)
+        self._backoff(host.prefix.bucket, now, 'prefix', reason)
+
+    def _backoff(self, bucket: Optional[TokenBucket], now: float, scope: str, reason: str):
+        if bucket is None or not bucket.backoff(now):
+            return
+        logger.debug(f"Backing off a {scope} to {bucket.rate:.1f} connects/s ({reason})")
+        if self.metrics is not None:
+            self.metrics.inc('backoffs_total', scope=scope, reason=reason)
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer, self._timer_at = None, math.inf
@@ -1,37 +1,349 @@
 import socket
+import errno
+import asyncio
 import concurrent.futures
-from typing import Dict, List
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Iterable
 import logging
+import warnings
+from .services import service_name
+from .politeness import PolitenessScheduler, TokenBucket
 
 logger = logging.getLogger(__name__)
 
-def scan_ports(ip: str, ports: List[int] = None, max_threads: int = 10) -> Dict:
-    """Scan open ports on an IP address"""
+DEFAULT_PORTS = [21, 22, 80, 443, 8080, 8443]
+DEFAULT_TIMEOUT = 1.0
+MIN_TIMEOUT = 0.1
+MAX_TIMEOUT = 4.0
+
+
+def _default_concurrency() -> int:
+    """Keep the number of in-flight connects below the open-file limit"""
+    try:
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ImportError, ValueError, OSError):
+        return 500
+    if soft == resource.RLIM_INFINITY:
+        return 5000
+    return max(16, min(5000, soft - 128))
+
+
+DEFAULT_CONCURRENCY = _default_concurrency()
+
+
+def parse_ports(spec) -> List[int]:
+    """Parse a port spec such as "22,80,8000-8100" or "all" into a sorted list"""
+    if spec is None:
+        return list(DEFAULT_PORTS)
+    if not isinstance(spec, str):
+        return sorted({int(p) for p in spec})
+    if spec.strip().lower() in ('all', '-'):
+        return list(range(1, 65536))
+
+    ports = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            start = int(start) if start else 1
+            end = int(end) if end else 65535
+            ports.update(range(start, end + 1))
+        else:
+            ports.add(int(part))
+    if any(p < 1 or p > 65535 for p in ports):
+        raise ValueError(f"Port out of range in {spec!r}")
+    return sorted(ports)
+
+
+def scan_ports(ip: str, ports: List[int] = None, concurrency: int = None,
+               timeout: float = DEFAULT_TIMEOUT, max_threads: int = None) -> Dict:
+    """Scan open ports on an IP address
+
+    `max_threads` is the deprecated name of `concurrency`.
+    """
+    if max_threads is not None:
+        warnings.warn("scan_ports(max_threads=...) is deprecated, use concurrency=...",
+                      DeprecationWarning, stacklevel=2)
+        if concurrency is None:
+            concurrency = max_threads
     if ports is None:
-        ports = [21, 22, 80, 443, 8080, 8443]
-        
-    results = {}
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
-        future_to_port = {executor.submit(check_port, ip, port): port for port in ports}
-        for future in concurrent.futures.as_completed(future_to_port):
-            port = future_to_port[future]
-            try:
-                results[port] = future.result()
-            except Exception as e:
-                results[port] = {'status': 'error', 'error': str(e)}
-                
-    return results
-
-def check_port(ip: str, port: int) -> Dict:
-    """Check individual port status"""
+        ports = DEFAULT_PORTS
+    if concurrency is None and timeout == DEFAULT_TIMEOUT:
+        return _get_default_scanner().scan_sync(ip, ports)
+
+    scanner = AsyncPortScanner(concurrency=concurrency or DEFAULT_CONCURRENCY, timeout=timeout)
+    try:
+        return scanner.scan_sync(ip, ports)
+    finally:
+        scanner.close()
+
+
+def check_port(ip: str, port: int, timeout: float = DEFAULT_TIMEOUT) -> Dict:
+    """Check individual port status: open, closed (RST) or filtered (no answer)"""
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(1.0)
+            s.settimeout(timeout)
             result = s.connect_ex((ip, port))
-            return {
-                'status': 'open' if result == 0 else 'closed',
-                'service': socket.getservbyport(port) if result == 0 else None
-            }
+            if result == 0:
+                return {'status': 'open', 'service': service_name(port)}
+            if result == errno.ECONNREFUSED:
+                return {'status': 'closed', 'service': None}
+            return {'status': 'filtered', 'service': None}
     except Exception as e:
         return {'status': 'error', 'error': str(e)}
+
+
+class RttEstimator:
+    """Smoothed round-trip time of one host, as TCP does it (RFC 6298)"""
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+
+    def add(self, rtt: float):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.samples += 1
+
+    def timeout(self, default: float, minimum: float, maximum: float) -> float:
+        if self.srtt is None:
+            return default
+        return max(minimum, min(maximum, self.srtt + 4 * self.rttvar))
+
+
+class AsyncPortScanner:
+    """Non-blocking TCP connect scanner.
+
+    All scans share one PolitenessScheduler: a global concurrency limit
+    handed out to targets in turn, optional connect rates for the whole
+    scanner, each /24 (/48) prefix and each host, and a backoff on signs
+    of throttling (see PolitenessScheduler). Coroutines run on a private
+    event loop thread so that the synchronous `scan_sync` can be called
+    from any thread (GUI, workers).
+
+    Connect timeouts adapt per host: `timeout` is used until the host has
+    answered once (handshake or RST), then srtt + 4 * rttvar bounded by
+    `min_timeout`/`max_timeout`. Ports that time out are retried `retries`
+    times with a doubled timeout before being reported as filtered; a
+    retry that gets an answer tells the scheduler a SYN was dropped.
+
+    `inflight` and `waiting` count connects in progress and connects queued
+    behind the concurrency limit; with `metrics` every attempt is also
+    recorded by outcome and in a per-port latency histogram.
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, timeout: float = DEFAULT_TIMEOUT,
+                 rate_per_host: Optional[float] = None, adaptive: bool = True,
+                 min_timeout: float = MIN_TIMEOUT, max_timeout: float = MAX_TIMEOUT,
+                 retries: int = 1, max_hosts: int = 65536, metrics=None,
+                 rate: Optional[float] = None, rate_per_prefix: Optional[float] = None,
+                 prefix_v4: int = 24, prefix_v6: int = 48, backoff: bool = True):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.rate = rate
+        self.rate_per_host = rate_per_host
+        self.rate_per_prefix = rate_per_prefix
+        self.prefix_v4 = prefix_v4
+        self.prefix_v6 = prefix_v6
+        self.backoff = backoff
+        self.adaptive = adaptive
+        self.min_timeout = min_timeout
+        self.max_timeout = max(max_timeout, timeout)
+        self.retries = retries
+        self.max_hosts = max_hosts
+        self.metrics = metrics
+        self._rtts = OrderedDict()
+        self._scheduler = None
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    async def connect(self, ip: str, port: int, timeout: float = None) -> str:
+        """TCP connect without blocking the event loop.
+
+        Returns 'open' (handshake done), 'refused' (RST) or 'timeout'; other
+        socket errors (unreachable...) come back as 'error'.
+        """
+        scheduler = self._get_scheduler()
+        await scheduler.acquire(ip)
+        state, elapsed = None, 0.0
+        try:
+            loop = asyncio.get_running_loop()
+            family = socket.AF_INET6 if ':' in ip else socket.AF_INET
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            started = loop.time()
+            try:
+                await asyncio.wait_for(loop.sock_connect(sock, (ip, port)),
+                                       timeout or self.host_timeout(ip))
+                state = 'open'
+            except ConnectionRefusedError:
+                state = 'refused'
+            except ConnectionResetError:
+                state = 'reset'
+            except asyncio.TimeoutError:
+                state = 'timeout'
+            except OSError:
+                state = 'error'
+            finally:
+                sock.close()
+            elapsed = loop.time() - started
+        finally:
+            scheduler.release(ip, state, elapsed)
+        if self.metrics is not None:
+            self.metrics.inc('connects_total', outcome=state)
+            self.metrics.observe('port_connect_seconds', elapsed, port=port)
+        if state in ('open', 'refused'):
+            self._rtt(ip).add(elapsed)
+        return state
+
+    def host_timeout(self, ip: str) -> float:
+        """Connect timeout for `ip` from its measured round-trip time"""
+        if not self.adaptive:
+            return self.timeout
+        estimator = self._rtts.get(ip)
+        if estimator is None:
+            return self.timeout
+        return estimator.timeout(self.timeout, self.min_timeout, self.max_timeout)
+
+    def _rtt(self, ip: str) -> RttEstimator:
+        estimator = self._rtts.get(ip)
+        if estimator is None:
+            estimator = self._rtts[ip] = RttEstimator()
+            if len(self._rtts) > self.max_hosts:
+                self._rtts.popitem(last=False)
+        else:
+            self._rtts.move_to_end(ip)
+        return estimator
+
+    async def check_port(self, ip: str, port: int) -> Dict:
+        """Check one port: open, closed (RST) or filtered (no answer after retries)"""
+        state = await self.connect(ip, port)
+        for attempt in range(1, self.retries + 1):
+            if state not in ('timeout', 'reset'):
+                break
+            state = await self.connect(ip, port, min(self.max_timeout, self.host_timeout(ip) * 2 ** attempt))
+            if state in ('open', 'refused'):
+                self._get_scheduler().congestion(ip)
+
+        if state == 'refused':
+            return {'status': 'closed', 'service': None}
+        if state in ('timeout', 'reset'):
+            return {'status': 'filtered', 'service': None}
+        if state == 'error':
+            return {'status': 'error', 'error': 'unreachable'}
+        return {'status': 'open', 'service': service_name(port)}
+
+    async def scan(self, ip: str, ports: Iterable[int],
+                   on_result: Callable[[int, Dict], None] = None) -> Dict:
+        """Scan `ports` on `ip` concurrently, returns {port: result}
+
+        At most `concurrency` worker tasks pull ports from a shared iterator,
+        so memory stays flat whatever the number of ports.
+        `on_result(port, result)` is called on the loop thread as each port completes.
+        """
+        ports = list(ports)
+        pending = iter(ports)
+        results = {}
+
+        async def worker():
+            for port in pending:
+                try:
+                    result = await self.check_port(ip, port)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    result = {'status': 'error', 'error': str(e)}
+                results[port] = result
+                if on_result is not None:
+                    on_result(port, result)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(ports)))))
+        return {port: results[port] for port in ports}
+
+    def scan_sync(self, ip: str, ports: Iterable[int], on_result: Callable[[int, Dict], None] = None,
+                  cancel: threading.Event = None) -> Dict:
+        """Blocking wrapper around `scan`, safe to call from any thread
+
+        Setting `cancel` aborts the in-flight connects and raises CancelledError.
+        """
+        future = self.submit(self.scan(ip, ports, on_result))
+        if cancel is None:
+            return future.result()
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except concurrent.futures.TimeoutError:
+                if cancel.is_set():
+                    future.cancel()
+                    raise concurrent.futures.CancelledError()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the scanner loop, returns a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    @property
+    def inflight(self) -> int:
+        return self._scheduler.inflight if self._scheduler is not None else 0
+
+    @property
+    def waiting(self) -> int:
+        return self._scheduler.waiting if self._scheduler is not None else 0
+
+    @property
+    def scheduler(self) -> PolitenessScheduler:
+        """Concurrency slots and rates shared by everything this scanner connects to"""
+        return self._get_scheduler()
+
+    def _get_scheduler(self) -> PolitenessScheduler:
+        if self._scheduler is None:
+            self._scheduler = PolitenessScheduler(
+                self.concurrency, rate=self.rate, rate_per_host=self.rate_per_host,
+                rate_per_prefix=self.rate_per_prefix, prefix_v4=self.prefix_v4,
+                prefix_v6=self.prefix_v6, backoff=self.backoff,
+                settle=self.max_timeout + 1, max_hosts=self.max_hosts,
+                metrics=self.metrics)
+        return self._scheduler
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever,
+                                                name='port-scanner-loop', daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def close(self):
+        with self._start_lock:
+            if self._loop is None:
+                return
+            if self._scheduler is not None:
+                self._loop.call_soon_threadsafe(self._scheduler.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+            self._scheduler = None
+            self._rtts.clear()
+
+
+_default_scanner = None
+_default_lock = threading.Lock()
+
+
+def _get_default_scanner() -> AsyncPortScanner:
+    global _default_scanner
+    with _default_lock:
+        if _default_scanner is None:
+            _default_scanner = AsyncPortScanner()
+        return _default_scanner
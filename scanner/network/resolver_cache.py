@@ -0,0 +1,162 @@
+import socket
+import ipaddress
+import threading
+import time
+import concurrent.futures
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+DNS_TIMEOUT = 2.0
+DNS_LIFETIME = 4.0
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver() -> 'dns.resolver.Resolver':
+    """Process-wide configured dnspython Resolver, reused by every query"""
+    global _resolver
+    import dns.resolver  # loaded by the first DNS query only, it costs ~70 ms of startup
+    with _resolver_lock:
+        if _resolver is None:
+            resolver = dns.resolver.Resolver()
+            resolver.timeout = DNS_TIMEOUT
+            resolver.lifetime = DNS_LIFETIME
+            _resolver = resolver
+        return _resolver
+
+
+class ResolutionCache:
+    """Shared hostname -> addresses cache honouring DNS record TTLs.
+
+    Forward lookups go through dnspython to learn the record TTL and fall back
+    to the system resolver (hosts file, mDNS...) with `default_ttl`. NXDOMAIN
+    is cached for `negative_ttl`. Entries are evicted least recently used
+    beyond `max_entries`, and concurrent lookups of the same name share a
+    single query.
+    """
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 300, min_ttl: float = 30,
+                 max_ttl: float = 3600, negative_ttl: float = 60,
+                 resolver: Optional['dns.resolver.Resolver'] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.resolver = resolver
+        self.stats = {'hits': 0, 'misses': 0, 'negative_hits': 0, 'evictions': 0}
+        self._entries = OrderedDict()
+        self._inflight: Dict[tuple, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str) -> str:
+        """Drop-in for socket.gethostbyname"""
+        return self.lookup(host)[0]
+
+    def lookup(self, host: str) -> List[str]:
+        """All IPv4 addresses of `host`, raises socket.gaierror if it does not exist"""
+        host = host.strip().rstrip('.').lower()
+        try:
+            return [str(ipaddress.ip_address(host))]
+        except ValueError:
+            pass
+        return self._cached(('A', host), lambda: self._query_a(host))
+
+    def reverse(self, ip: str) -> str:
+        """Drop-in for socket.getfqdn on an address"""
+        return self._cached(('PTR', ip), lambda: (socket.getfqdn(ip), self.default_ttl))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _cached(self, key: tuple, query):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value, error = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    if error is not None:
+                        self.stats['negative_hits'] += 1
+                        raise socket.gaierror(socket.EAI_NONAME, error)
+                    self.stats['hits'] += 1
+                    return value
+                del self._entries[key]
+            self.stats['misses'] += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = concurrent.futures.Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            value, ttl = query()
+        except socket.gaierror as e:
+            if e.errno in (socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)):
+                self._store(key, None, self.negative_ttl, e.strerror or str(e))
+            self._release(key, exception=e)
+            raise
+        except Exception as e:
+            self._release(key, exception=e)
+            raise
+        self._store(key, value, ttl)
+        self._release(key, value=value)
+        return value
+
+    def _store(self, key: tuple, value, ttl: float, error: str = None):
+        expires = time.monotonic() + max(self.min_ttl, min(self.max_ttl, ttl))
+        with self._lock:
+            self._entries[key] = (expires, value, error)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def _release(self, key: tuple, value=None, exception: Exception = None):
+        with self._lock:
+            future = self._inflight.pop(key)
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(value)
+
+    def _query_a(self, host: str):
+        import dns.resolver
+        if self.resolver is None:
+            self.resolver = get_resolver()
+        try:
+            answer = self.resolver.resolve(host, 'A')
+            return [r.address for r in answer], answer.rrset.ttl
+        except dns.resolver.NXDOMAIN:
+            nxdomain = True
+        except Exception as e:
+            logger.debug(f"DNS lookup of {host} failed, using system resolver: {e}")
+            nxdomain = False
+
+        try:
+            return [socket.gethostbyname(host)], self.default_ttl
+        except socket.gaierror:
+            if nxdomain:
+                raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+            raise
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_resolution_cache() -> ResolutionCache:
+    """Process-wide cache shared by every scanner and stage"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResolutionCache()
+        return _default_cache
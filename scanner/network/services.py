@@ -0,0 +1,87 @@
+import os
+import threading
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+SERVICES_PATHS = ('/etc/services', os.path.join(os.environ.get('SystemRoot', r'C:\Windows'),
+                                                 'System32', 'drivers', 'etc', 'services'))
+
+# Used when no services file exists, and for ports most files leave out
+BUILTIN_SERVICES = {
+    'tcp': {
+        21: 'ftp', 22: 'ssh', 23: 'telnet', 25: 'smtp', 53: 'domain', 80: 'http',
+        110: 'pop3', 143: 'imap2', 443: 'https', 445: 'microsoft-ds', 465: 'submissions',
+        587: 'submission', 993: 'imaps', 995: 'pop3s', 1433: 'ms-sql-s', 3306: 'mysql',
+        3389: 'ms-wbt-server', 5432: 'postgresql', 5900: 'vnc', 6379: 'redis',
+        8080: 'http-alt', 8443: 'https-alt', 9200: 'elasticsearch', 27017: 'mongodb',
+    },
+    'udp': {53: 'domain', 123: 'ntp', 161: 'snmp', 443: 'https'},
+}
+
+
+class ServiceTable:
+    """Port/protocol -> service name index loaded once from the services file.
+
+    Lookups are plain dict reads, unlike socket.getservbyport which goes
+    through libc and raises for unknown ports. `register` adds or overrides
+    mappings.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._tables: Optional[Dict[str, Dict[int, str]]] = None
+        self._custom: Dict[str, Dict[int, str]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, port: int, proto: str = 'tcp') -> Optional[str]:
+        tables = self._tables if self._tables is not None else self._load()
+        return tables.get(proto, {}).get(port)
+
+    def register(self, mapping: Dict[int, str], proto: str = 'tcp'):
+        with self._lock:
+            self._custom.setdefault(proto, {}).update(mapping)
+            if self._tables is not None:
+                self._tables.setdefault(proto, {}).update(mapping)
+
+    def _load(self) -> Dict[str, Dict[int, str]]:
+        with self._lock:
+            if self._tables is not None:
+                return self._tables
+            tables = {proto: dict(ports) for proto, ports in BUILTIN_SERVICES.items()}
+            path = self.path or next((p for p in SERVICES_PATHS if os.path.exists(p)), None)
+            if path:
+                try:
+                    parse_services(path, tables)
+                except OSError as e:
+                    logger.warning(f"Cannot read services file {path}: {e}")
+            for proto, ports in self._custom.items():
+                tables.setdefault(proto, {}).update(ports)
+            self._tables = tables
+            return tables
+
+
+def parse_services(path: str, tables: Dict[str, Dict[int, str]]):
+    """Add the 'name port/proto' entries of a services(5) file to `tables`"""
+    with open(path, encoding='utf-8', errors='replace') as handle:
+        for line in handle:
+            fields = line.split('#', 1)[0].split()
+            if len(fields) < 2 or '/' not in fields[1]:
+                continue
+            port, proto = fields[1].split('/', 1)
+            if port.isdigit():
+                tables.setdefault(proto.lower(), {})[int(port)] = fields[0]
+
+
+_table = ServiceTable()
+
+
+def service_name(port: int, proto: str = 'tcp') -> Optional[str]:
+    """Service name of a port, None when unknown"""
+    return _table.lookup(port, proto)
+
+
+def register_services(mapping: Dict[int, str], proto: str = 'tcp'):
+    """Add site-specific port names shared by every scanner"""
+    _table.register(mapping, proto)
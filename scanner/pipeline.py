@@ -0,0 +1,140 @@
+import concurrent.futures
+import threading
+import time
+from typing import Any, Callable, Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StageGraph:
+    """Small dependency graph of scan stages run on a shared executor.
+
+    A stage is submitted as soon as all of its dependencies are done, and
+    receives their return values as positional arguments. Completion is
+    driven by future callbacks, so no worker ever blocks waiting on another
+    stage and many graphs can share one bounded pool without deadlocking.
+
+    `on_stage(name, value, error, done, total)` is called from the worker
+    thread as each stage settles. Once `cancel` is set, stages that have not
+    started yet are settled with a 'cancelled' error. Stages found in
+    `restored` (name -> value, e.g. from a Checkpoint) settle with that value
+    instead of running.
+    """
+
+    def __init__(self, executor: concurrent.futures.Executor, on_stage: Callable = None,
+                 cancel: threading.Event = None, restored: Dict[str, Any] = None):
+        self.executor = executor
+        self.on_stage = on_stage
+        self.cancel = cancel
+        self.restored = restored or {}
+        self.stages = {}
+        self.results = {}
+        self.errors = {}
+        self.timings = {}
+        self._remaining = set()
+        self._lock = threading.Lock()
+        self._started = None
+        self._future = concurrent.futures.Future()
+
+    def add(self, name: str, func: Callable, *deps: str) -> 'StageGraph':
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage {name!r} depends on unknown stage {dep!r}")
+        self.stages[name] = (func, deps)
+        return self
+
+    def run(self) -> concurrent.futures.Future:
+        """Start every stage without dependencies, returns a future of the graph"""
+        self._started = time.perf_counter()
+        self._remaining = set(self.stages)
+        ready = self._take_ready()
+        if not ready and not self._remaining:
+            self._finish()
+        for name in ready:
+            self._submit(name)
+        return self._future
+
+    def _take_ready(self):
+        """Pop stages whose dependencies are all settled (must hold the lock or be single-threaded)"""
+        ready = []
+        for name in list(self._remaining):
+            _, deps = self.stages[name]
+            if all(dep in self.results or dep in self.errors for dep in deps):
+                self._remaining.discard(name)
+                ready.append(name)
+        return ready
+
+    def _submit(self, name: str):
+        func, deps = self.stages[name]
+        failed = [dep for dep in deps if dep in self.errors]
+        if name in self.restored and not failed:
+            self._settle(name, value=self.restored[name], elapsed=0.0)
+            return
+        if self.cancel is not None and self.cancel.is_set():
+            self._settle(name, error='cancelled', elapsed=0.0)
+            return
+        if failed:
+            self._settle(name, error=f"skipped: {', '.join(failed)} failed", elapsed=0.0)
+            return
+
+        args = [self.results[dep] for dep in deps]
+
+        def timed():
+            start = time.perf_counter()
+            if self.cancel is not None and self.cancel.is_set():
+                raise concurrent.futures.CancelledError()
+            try:
+                return func(*args), time.perf_counter() - start
+            except Exception as e:
+                e.elapsed = time.perf_counter() - start
+                raise
+
+        try:
+            future = self.executor.submit(timed)
+        except RuntimeError as e:
+            self._settle(name, error=str(e), elapsed=0.0)
+            return
+        future.add_done_callback(lambda f: self._on_done(name, f))
+
+    def _on_done(self, name: str, future: concurrent.futures.Future):
+        try:
+            value, elapsed = future.result()
+        except concurrent.futures.CancelledError:
+            self._settle(name, error='cancelled', elapsed=0.0)
+        except Exception as e:
+            self._settle(name, error=str(e), elapsed=getattr(e, 'elapsed', 0.0))
+        else:
+            self._settle(name, value=value, elapsed=elapsed)
+
+    def _settle(self, name: str, value=None, error: str = None, elapsed: float = 0.0):
+        with self._lock:
+            self.timings[name] = round(elapsed, 6)
+            if error is None:
+                self.results[name] = value
+            else:
+                self.errors[name] = error
+            ready = self._take_ready()
+            settled = len(self.results) + len(self.errors)
+            done = not self._remaining and settled == len(self.stages)
+        if self.on_stage is not None:
+            try:
+                self.on_stage(name, value, error, settled, len(self.stages))
+            except Exception as e:
+                logger.error(f"Stage callback failed for {name}: {e}")
+        for next_name in ready:
+            self._submit(next_name)
+        if done:
+            self._finish()
+
+    def _finish(self):
+        self.timings['total'] = round(time.perf_counter() - self._started, 6)
+        if not self._future.done():
+            self._future.set_result(self)
+
+    @property
+    def future(self) -> concurrent.futures.Future:
+        return self._future
+
+    def wait(self, timeout: float = None) -> 'StageGraph':
+        return self._future.result(timeout)
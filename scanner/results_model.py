@@ -0,0 +1,580 @@
+import ipaddress
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional
+from PyQt5.QtCore import QAbstractItemModel, QAbstractProxyModel, QModelIndex, Qt
+
+HEADERS = ["Target", "IP Address", "Open Ports", "Server", "Timestamp"]
+
+# Sections affichées sous chaque cible, dans cet ordre
+SECTIONS = [
+    ('ip_info', "IP Information"),
+    ('dns_records', "DNS Records"),
+    ('server_info', "Server Information"),
+    ('open_ports', "Open Ports"),
+    ('changes', "Changes"),
+    ('errors', "Errors"),
+    ('timings', "Timings"),
+]
+
+
+class _Node:
+    """Ligne du modèle ; les enfants ne sont construits qu'au premier dépliage"""
+    __slots__ = ('parent', 'row', 'kind', 'label', 'value', 'children', 'columns', 'sort_keys', 'text')
+
+    def __init__(self, parent, row, kind, label, value):
+        self.parent = parent
+        self.row = row
+        self.kind = kind
+        self.label = label
+        self.value = value
+        self.children = None
+        self.columns = None
+        self.sort_keys = None
+        self.text = None
+
+
+def _is_scalar(value) -> bool:
+    return not isinstance(value, (dict, list, tuple))
+
+
+def _child_items(node: _Node) -> List:
+    """(libellé, valeur, type) des enfants d'un nœud"""
+    value = node.value
+    if node.kind == 'target':
+        return [(title, value[key], 'ports' if key == 'open_ports' else None)
+                for key, title in SECTIONS if value.get(key)]
+    if node.kind == 'ports':
+        return [(f"Port {port}", info, 'port')
+                for port, info in sorted(value.items(), key=lambda item: int(item[0]))]
+    if isinstance(value, dict):
+        return [(str(key), item, None) for key, item in value.items()
+                if not (node.kind == 'port' and key == 'status')]
+    if isinstance(value, (list, tuple)) and not all(_is_scalar(item) for item in value):
+        return [(str(i), item, None) for i, item in enumerate(value)]
+    return []
+
+
+def _has_children(node: _Node) -> bool:
+    if node.children is not None:
+        return bool(node.children)
+    value = node.value
+    if node.kind in ('target', 'ports'):
+        return bool(value)
+    if isinstance(value, dict):
+        return any(key != 'status' for key in value) if node.kind == 'port' else bool(value)
+    if isinstance(value, (list, tuple)):
+        return not all(_is_scalar(item) for item in value)
+    return False
+
+
+def _display(node: _Node) -> str:
+    value = node.value
+    if node.kind == 'port':
+        return str(value.get('status', 'unknown')) if isinstance(value, dict) else str(value)
+    if node.kind == 'ports':
+        return f"{len(value)} scanned"
+    if isinstance(value, dict):
+        return ''
+    if isinstance(value, (list, tuple)):
+        if all(_is_scalar(item) for item in value):
+            return ", ".join(str(item) for item in value)
+        return f"{len(value)} items"
+    return '' if value is None else str(value)
+
+
+def _ip_key(ip: str):
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return (0, 0)
+    return (address.version, int(address))
+
+
+def _summarize(node: _Node):
+    """Colonnes, clés de tri et texte de filtre d'une cible, calculés une fois"""
+    result = node.value
+    ip_info = result.get('ip_info') or {}
+    ip = ip_info.get('ip_address') or ''
+    open_ports = sorted(int(port) for port, info in (result.get('open_ports') or {}).items()
+                        if isinstance(info, dict) and info.get('status') == 'open')
+    server = (result.get('server_info') or {}).get('server') or ''
+    error = result.get('error') or ip_info.get('error') or ''
+    node.label = result.get('url', '')
+    node.columns = (node.label, ip or error, ", ".join(map(str, open_ports)),
+                    server, result.get('timestamp', ''))
+    node.sort_keys = (node.label.lower(), _ip_key(ip), len(open_ports),
+                      server.lower(), node.columns[4])
+    node.text = "\t".join(node.columns).lower()
+
+
+class ScanResultsModel(QAbstractItemModel):
+    """Modèle arborescent des résultats de scan, une ligne par cible
+
+    Les lignes sont ajoutées par lots (`add_results`) et le détail d'une cible
+    n'est construit que lorsqu'il est affiché (canFetchMore / fetchMore), ce
+    qui garde l'insertion et la mémoire proportionnelles au nombre de cibles.
+    Le tri se fait ici avec list.sort sur des clés précalculées : trier 100k
+    lignes via QSortFilterProxyModel.lessThan coûterait des millions d'appels
+    Python. Une fois trié, un lot est inséré à sa place par recherche
+    dichotomique, sans retrier le modèle.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[_Node] = []
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+        # Pendant une insertion triée, node.row des cibles peut retarder d'au plus ce nombre de lignes
+        self._row_lag = 0
+
+    # --- API du scanner -------------------------------------------------
+
+    def add_results(self, results: Iterable[Dict]):
+        """Ajoute un lot de résultats en une seule insertion (à sa place si le modèle est trié)"""
+        results = list(results)
+        if not results:
+            return
+        first = len(self._rows)
+        nodes = []
+        for offset, result in enumerate(results):
+            node = _Node(None, first + offset, 'target', '', result)
+            _summarize(node)
+            nodes.append(node)
+        if self._sort_column >= 0 and self._rows:
+            self._insert_sorted(nodes)
+            return
+        self.beginInsertRows(QModelIndex(), first, first + len(nodes) - 1)
+        self._rows.extend(nodes)
+        self.endInsertRows()
+        if self._sort_column >= 0:
+            self.sort(self._sort_column, self._sort_order)
+
+    def _insert_sorted(self, nodes: List[_Node]):
+        """Insère un lot dans les lignes triées : le lot seul est trié, puis
+        chaque série de lignes de même position est insérée d'un bloc"""
+        column, descending = self._sort_column, self._sort_order == Qt.DescendingOrder
+        nodes.sort(key=lambda node: node.sort_keys[column], reverse=descending)
+        runs = []
+        for node in nodes:
+            position = self.sorted_position(self._rows, node)
+            if runs and runs[-1][0] == position:
+                runs[-1][1].append(node)
+            else:
+                runs.append((position, [node]))
+        # Du bas vers le haut : les positions des séries suivantes restent valables
+        self._row_lag = len(nodes)
+        try:
+            for position, run in reversed(runs):
+                self.beginInsertRows(QModelIndex(), position, position + len(run) - 1)
+                for offset, node in enumerate(run):
+                    node.row = position + offset
+                self._rows[position:position] = run
+                self.endInsertRows()
+        finally:
+            self._row_lag = 0
+            rows = self._rows
+            for row in range(runs[0][0], len(rows)):
+                rows[row].row = row
+
+    # --- Accès pour ScanResultsFilter -----------------------------------
+
+    def sorted_position(self, nodes: List[_Node], node: _Node) -> int:
+        """Place de `node` dans `nodes` triées comme le modèle, après les clés
+        égales (comme un tri stable) ; à la fin si le modèle n'est pas trié"""
+        column = self._sort_column
+        if column < 0:
+            return len(nodes)
+        key, descending = node.sort_keys[column], self._sort_order == Qt.DescendingOrder
+        low, high = 0, len(nodes)
+        while low < high:
+            middle = (low + high) // 2
+            other = nodes[middle].sort_keys[column]
+            if (other >= key) if descending else (other <= key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def target_node(self, row: int) -> _Node:
+        return self._rows[row]
+
+    def target_nodes(self, first: int = 0, last: int = None) -> List[_Node]:
+        """Cibles des lignes `first` à `last` incluses (toutes par défaut)"""
+        return self._rows[first:None if last is None else last + 1]
+
+    def target_row(self, node: _Node) -> int:
+        """Ligne d'une cible, juste même pendant une insertion triée"""
+        row = node.row
+        if self._row_lag and (row >= len(self._rows) or self._rows[row] is not node):
+            row = self._rows.index(node, row, row + self._row_lag + 1)
+        return row
+
+    def add_result(self, result: Dict) -> QModelIndex:
+        self.add_results([result])
+        return self.target_index(result)
+
+    def set_result(self, index: QModelIndex, result: Dict):
+        """Met à jour une cible ; les détails déjà affichés le restent"""
+        node = index.internalPointer()
+        node.value = result
+        _summarize(node)
+        row = self.target_row(node)
+        self._refresh_children(node, self.createIndex(row, 0, node))
+        self.dataChanged.emit(self.createIndex(row, 0, node),
+                              self.createIndex(row, len(HEADERS) - 1, node))
+
+    def target_index(self, result: Dict) -> QModelIndex:
+        for node in reversed(self._rows):
+            if node.value is result:
+                return self.createIndex(node.row, 0, node)
+        return QModelIndex()
+
+    def result(self, index: QModelIndex) -> Optional[Dict]:
+        node = index.internalPointer() if index.isValid() else None
+        while node is not None and node.parent is not None:
+            node = node.parent
+        return node.value if node is not None else None
+
+    def filter_text(self, row: int) -> str:
+        return self._rows[row].text
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self.endResetModel()
+
+    def _refresh_children(self, node: _Node, parent: QModelIndex):
+        """Propage une mise à jour aux enfants déjà construits
+
+        Les nouveaux enfants sont insérés à leur place ; si des enfants
+        disparaissent ou changent d'ordre, le niveau est reconstruit.
+        """
+        if node.children is None:
+            return
+        items = _child_items(node)
+        labels = [label for label, _, _ in items]
+        old = {child.label: child for child in node.children}
+        if [label for label in labels if label in old] != [child.label for child in node.children]:
+            if node.children:
+                self.beginRemoveRows(parent, 0, len(node.children) - 1)
+                node.children = []
+                self.endRemoveRows()
+            if items:
+                self.beginInsertRows(parent, 0, len(items) - 1)
+                self._build_children(node, items)
+                self.endInsertRows()
+            return
+
+        for row, (label, value, kind) in enumerate(items):
+            child = old.get(label)
+            if child is None:
+                self.beginInsertRows(parent, row, row)
+                node.children.insert(row, _Node(node, row, kind, label, value))
+                for later in node.children[row + 1:]:
+                    later.row += 1
+                self.endInsertRows()
+                continue
+            child.value = value
+            self._refresh_children(child, self.createIndex(row, 0, child))
+        if node.children:
+            last = len(node.children) - 1
+            self.dataChanged.emit(self.createIndex(0, 1, node.children[0]),
+                                  self.createIndex(last, 1, node.children[last]))
+
+    # --- QAbstractItemModel ---------------------------------------------
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not parent.isValid():
+            if 0 <= row < len(self._rows):
+                return self.createIndex(row, column, self._rows[row])
+            return QModelIndex()
+        children = parent.internalPointer().children
+        if children is None or not 0 <= row < len(children):
+            return QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None:
+            return QModelIndex()
+        return self.createIndex(self.target_row(parent) if parent.parent is None else parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self._rows)
+        if parent.column() > 0:
+            return 0
+        children = parent.internalPointer().children
+        return len(children) if children else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self._rows)
+        return parent.column() == 0 and _has_children(parent.internalPointer())
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return False
+        node = parent.internalPointer()
+        return node.children is None and _has_children(node)
+
+    def fetchMore(self, parent):
+        if not parent.isValid():
+            return
+        node = parent.internalPointer()
+        if node.children is not None:
+            return
+        items = _child_items(node)
+        if not items:
+            node.children = []
+            return
+        self.beginInsertRows(parent, 0, len(items) - 1)
+        self._build_children(node, items)
+        self.endInsertRows()
+
+    def _build_children(self, node: _Node, items: List):
+        node.children = [_Node(node, row, kind, label, value)
+                         for row, (label, value, kind) in enumerate(items)]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role != Qt.DisplayRole:
+            return None
+        node = index.internalPointer()
+        column = index.column()
+        if node.parent is None:
+            return node.columns[column]
+        if column == 0:
+            return node.label
+        if column == 1:
+            return _display(node)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[section]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column, self._sort_order = column, order
+        if column < 0 or not self._rows:
+            return
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        nodes = [index.internalPointer() for index in persistent]
+        keys = attrgetter('sort_keys')
+        self._rows.sort(key=lambda node: keys(node)[column], reverse=order == Qt.DescendingOrder)
+        for row, node in enumerate(self._rows):
+            node.row = row
+        self.changePersistentIndexList(persistent, [
+            self.createIndex(node.row, index.column(), node) for index, node in zip(persistent, nodes)])
+        self.layoutChanged.emit()
+
+
+class ScanResultsFilter(QAbstractProxyModel):
+    """Filtre des cibles (lignes de premier niveau) ; le tri est délégué au modèle source
+
+    Sans filtre, les lignes sont celles du modèle et ses insertions sont
+    relayées telles quelles. Avec un filtre, la correspondance est la liste
+    des cibles retenues, dans l'ordre du modèle : une insertion triée y place
+    les nouvelles cibles par dichotomie sur les clés de tri.
+    QSortFilterProxyModel reconstruit toute sa correspondance à chaque
+    rowsInserted, soit ~400 ms pour un lot trié de 500 cibles réparties en
+    autant de plages sur 100k lignes.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._needle = ''
+        # Cibles retenues, None sans filtre
+        self._nodes: Optional[List[_Node]] = None
+        self._saved_layout = None
+
+    def setSourceModel(self, model):
+        previous = self.sourceModel()
+        if previous is not None:
+            for signal, slot in self._connections(previous):
+                signal.disconnect(slot)
+        self.beginResetModel()
+        super().setSourceModel(model)
+        if model is not None:
+            for signal, slot in self._connections(model):
+                signal.connect(slot)
+        self._rebuild()
+        self.endResetModel()
+
+    def _connections(self, model):
+        return [(model.rowsAboutToBeInserted, self._rows_about_to_be_inserted),
+                (model.rowsInserted, self._rows_inserted),
+                (model.rowsAboutToBeRemoved, self._rows_about_to_be_removed),
+                (model.rowsRemoved, self._rows_removed),
+                (model.modelAboutToBeReset, self.beginResetModel),
+                (model.modelReset, self._model_reset),
+                (model.layoutAboutToBeChanged, self._layout_about_to_be_changed),
+                (model.layoutChanged, self._layout_changed),
+                (model.dataChanged, self._data_changed)]
+
+    def set_filter_text(self, text: str):
+        needle = text.strip().lower()
+        if needle != self._needle:
+            saved = self._begin_layout()
+            self._needle = needle
+            self._rebuild()
+            self._end_layout(saved)
+
+    def _accepts(self, node: _Node) -> bool:
+        return self._needle in node.text
+
+    def _rebuild(self):
+        model = self.sourceModel()
+        if not self._needle or model is None:
+            self._nodes = None
+        else:
+            needle = self._needle
+            self._nodes = [node for node in model.target_nodes() if needle in node.text]
+
+    def _filtered_position(self, node: _Node) -> int:
+        """Place d'une cible dans la liste filtrée d'après sa ligne dans le modèle"""
+        nodes, row = self._nodes, node.row
+        low, high = 0, len(nodes)
+        while low < high:
+            middle = (low + high) // 2
+            if nodes[middle].row < row:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _row(self, node: _Node) -> Optional[int]:
+        """Ligne d'une cible dans ce modèle, None si elle est filtrée"""
+        if self._nodes is None:
+            return self.sourceModel().target_row(node)
+        nodes = self._nodes
+        row = self._filtered_position(node)
+        if row < len(nodes) and nodes[row] is node:
+            return row
+        return None
+
+    # --- Signaux du modèle source ----------------------------------------
+
+    def _rows_about_to_be_inserted(self, parent, first, last):
+        if not parent.isValid() and self._nodes is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    def _rows_inserted(self, parent, first, last):
+        if parent.isValid():
+            return
+        if self._nodes is None:
+            self.endInsertRows()
+            return
+        source = self.sourceModel()
+        accepted = [node for node in source.target_nodes(first, last) if self._accepts(node)]
+        if accepted:
+            position = source.sorted_position(self._nodes, accepted[0])
+            self.beginInsertRows(QModelIndex(), position, position + len(accepted) - 1)
+            self._nodes[position:position] = accepted
+            self.endInsertRows()
+
+    def _rows_about_to_be_removed(self, parent, first, last):
+        if not parent.isValid():
+            self.beginResetModel()
+
+    def _rows_removed(self, parent, first, last):
+        if not parent.isValid():
+            self._rebuild()
+            self.endResetModel()
+
+    def _model_reset(self):
+        self._rebuild()
+        self.endResetModel()
+
+    def _begin_layout(self):
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        return persistent, [(index.internalPointer(), index.column()) for index in persistent]
+
+    def _end_layout(self, saved):
+        persistent, nodes = saved
+        rows = None if self._nodes is None else {id(node): row for row, node in enumerate(self._nodes)}
+        moved = []
+        for node, column in nodes:
+            row = node.row if rows is None else rows.get(id(node))
+            moved.append(QModelIndex() if row is None else self.createIndex(row, column, node))
+        self.changePersistentIndexList(persistent, moved)
+        self.layoutChanged.emit()
+
+    def _layout_about_to_be_changed(self, parents=(), hint=None):
+        self._saved_layout = self._begin_layout()
+
+    def _layout_changed(self, parents=(), hint=None):
+        self._rebuild()
+        saved, self._saved_layout = self._saved_layout, None
+        self._end_layout(saved)
+
+    def _data_changed(self, top_left, bottom_right, roles=()):
+        if top_left.parent().isValid():
+            return
+        node = top_left.internalPointer()
+        row = self._row(node)
+        if self._nodes is not None:
+            # Le texte filtré a pu changer avec le résultat
+            if row is None and self._accepts(node):
+                row = self._filtered_position(node)
+                self.beginInsertRows(QModelIndex(), row, row)
+                self._nodes.insert(row, node)
+                self.endInsertRows()
+                return
+            if row is not None and not self._accepts(node):
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._nodes[row]
+                self.endRemoveRows()
+                return
+        if row is not None:
+            self.dataChanged.emit(self.createIndex(row, top_left.column(), node),
+                                  self.createIndex(row, bottom_right.column(), node))
+
+    # --- QAbstractProxyModel ---------------------------------------------
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < self.rowCount() or not 0 <= column < self.columnCount():
+            return QModelIndex()
+        node = self.sourceModel().target_node(row) if self._nodes is None else self._nodes[row]
+        return self.createIndex(row, column, node)
+
+    def parent(self, index=None):
+        if index is None:
+            return super().parent()
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().rowCount() if self._nodes is None else len(self._nodes)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        return not parent.isValid() and self.rowCount() > 0
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        node = proxy_index.internalPointer()
+        return self.sourceModel().index(self.sourceModel().target_row(node), proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid() or source_index.parent().isValid():
+            return QModelIndex()
+        node = source_index.internalPointer()
+        row = self._row(node)
+        return QModelIndex() if row is None else self.createIndex(row, source_index.column(), node)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
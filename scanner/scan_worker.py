@@ -0,0 +1,88 @@
+import threading
+import time
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+from .network.port_scanner import DEFAULT_PORTS
+
+class ScanWorker(QObject):
+    """Exécute un scan hors du thread GUI et diffuse les résultats par signaux
+
+    Pour une seule cible, `stage_done` et `port_result` arrivent au fil de
+    l'eau et `progress` compte les étapes et les ports terminés. Pour
+    plusieurs cibles, les résultats sont regroupés en lots (`results_ready`)
+    pour que le GUI insère des centaines de lignes d'un coup, et `progress`
+    compte les cibles. `cancel` peut être appelé depuis le GUI.
+    """
+    stage_done = pyqtSignal(str, object, object)  # nom, valeur, erreur
+    port_result = pyqtSignal(int, object)
+    results_ready = pyqtSignal(list)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, scanner, targets, ports=None, batch_size=500, batch_interval=0.1):
+        super().__init__()
+        self.scanner = scanner
+        self.targets = [targets] if isinstance(targets, str) else list(targets)
+        self.ports = list(ports) if ports is not None else list(DEFAULT_PORTS)
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._stages_done = 0
+        self._stages_total = 0
+        self._ports_done = 0
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            if len(self.targets) == 1:
+                results = self.scanner.scan_website(self.targets[0], self.ports,
+                                                    on_stage=self._on_stage, on_port=self._on_port,
+                                                    cancel=self._cancel)
+            else:
+                results = self._run_batch()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(results)
+
+    def _run_batch(self):
+        batch, done = [], 0
+        flushed = time.monotonic()
+        for result in self.scanner.scan_many(self.targets, self.ports, cancel=self._cancel):
+            batch.append(result)
+            done += 1
+            if len(batch) >= self.batch_size or time.monotonic() - flushed >= self.batch_interval:
+                self.results_ready.emit(batch)
+                self.progress.emit(done, len(self.targets))
+                batch, flushed = [], time.monotonic()
+        if batch:
+            self.results_ready.emit(batch)
+        self.progress.emit(done, len(self.targets))
+        return None
+
+    # Appelés depuis les threads du scanner : les signaux sont mis en file vers le GUI
+    def _on_stage(self, name, value, error, done, total):
+        with self._lock:
+            self._stages_done, self._stages_total = done, total
+        self.stage_done.emit(name, value, error)
+        self._emit_progress()
+
+    def _on_port(self, port, result):
+        with self._lock:
+            self._ports_done += 1
+        self.port_result.emit(port, result)
+        self._emit_progress()
+
+    def _emit_progress(self):
+        with self._lock:
+            done = self._stages_done + self._ports_done
+            total = max(self._stages_total, 1) + len(self.ports)
+        self.progress.emit(done, total)
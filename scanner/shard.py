@@ -0,0 +1,381 @@
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+SHARD_SIZE = 100
+HEARTBEAT = 5.0
+STALE_AFTER = 60.0
+
+
+def worker_name(pid: int = None) -> str:
+    """Owner tag of the shards claimed by a process, '<host>-<pid>'"""
+    return f"{socket.gethostname()}-{os.getpid() if pid is None else pid}"
+
+
+def _url_of(target: str) -> str:
+    # Same normalisation as NetworkScanner._start_scan, to match results to targets
+    return target if target.startswith(('http://', 'https://')) else f'https://{target}'
+
+
+def _load_result(result: Dict) -> Dict:
+    """Port numbers back to int keys, JSON turned them into strings"""
+    ports = result.get('open_ports')
+    if isinstance(ports, dict):
+        result['open_ports'] = {int(port) if str(port).isdigit() else port: info
+                                for port, info in ports.items()}
+    return result
+
+
+def _alive(owner: str) -> bool:
+    """False only when `owner` is a process of this host that no longer exists"""
+    host, _, pid = owner.rpartition('-')
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ShardQueue:
+    """A target list cut into shard files in a directory, claimed by atomic rename.
+
+    Layout of the directory:
+
+        manifest.json           shard count and job settings (ports)
+        pending/shard-N.txt     one target per line, waiting for a worker
+        running/shard-N.txt@W   claimed by worker W, touched as a heartbeat
+        done/shard-N.txt        every target of the shard has a result
+        results/shard-N.jsonl   one {"target", "result"} line per finished target
+
+    The results file is the shard checkpoint: a shard whose worker died goes
+    back to pending/ and the next worker only scans the targets it lacks. Any
+    process that sees the directory, on this machine or through a shared
+    filesystem (NFS, SMB...), can work on the queue.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        for name in ('pending', 'running', 'done', 'results'):
+            os.makedirs(os.path.join(path, name), exist_ok=True)
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.path, *parts)
+
+    def _list(self, name: str) -> List[str]:
+        return sorted(entry for entry in os.listdir(self._path(name)) if not entry.startswith('.'))
+
+    def manifest(self) -> Dict:
+        try:
+            with open(self._path('manifest.json'), encoding='utf-8') as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return {}
+
+    def _write_atomic(self, path: str, text: str):
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+        os.replace(tmp, path)
+
+    def create(self, targets: Iterable[str], shard_size: int = SHARD_SIZE, **settings) -> int:
+        """Cut `targets` into shards of `shard_size` and publish them, returns the shard count"""
+        count = 0
+        chunk = []
+        for target in targets:
+            target = target.strip()
+            if not target or target.startswith('#'):
+                continue
+            chunk.append(target)
+            if len(chunk) >= shard_size:
+                self._write_atomic(self._path('pending', f'shard-{count:06d}.txt'), '\n'.join(chunk) + '\n')
+                count += 1
+                chunk = []
+        if chunk:
+            self._write_atomic(self._path('pending', f'shard-{count:06d}.txt'), '\n'.join(chunk) + '\n')
+            count += 1
+        self._write_atomic(self._path('manifest.json'),
+                           json.dumps({'shards': count, 'created': time.time(), **settings}))
+        return count
+
+    def claim(self, worker: str) -> Optional[str]:
+        """Take the first pending shard for `worker`, None when there is none left"""
+        for shard in self._list('pending'):
+            running = self._path('running', f'{shard}@{worker}')
+            try:
+                os.rename(self._path('pending', shard), running)
+            except FileNotFoundError:
+                continue  # claimed by another worker in the meantime
+            os.utime(running)
+            return shard
+        return None
+
+    def targets(self, shard: str, worker: str) -> List[str]:
+        with open(self._path('running', f'{shard}@{worker}'), encoding='utf-8') as handle:
+            return [line.strip() for line in handle if line.strip()]
+
+    def heartbeat(self, shard: str, worker: str):
+        try:
+            os.utime(self._path('running', f'{shard}@{worker}'))
+        except FileNotFoundError:
+            pass
+
+    def complete(self, shard: str, worker: str) -> bool:
+        try:
+            os.rename(self._path('running', f'{shard}@{worker}'), self._path('done', shard))
+        except FileNotFoundError:
+            logger.warning(f"Shard {shard} was requeued while {worker} was scanning it")
+            return False
+        return True
+
+    def results_path(self, shard: str) -> str:
+        return self._path('results', os.path.splitext(shard)[0] + '.jsonl')
+
+    def checkpoint(self, shard: str) -> Set[str]:
+        """Targets of `shard` that already have a result, dropping a torn last line"""
+        path = self.results_path(shard)
+        try:
+            with open(path, 'rb') as handle:
+                data = handle.read()
+        except FileNotFoundError:
+            return set()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            with open(path, 'r+b') as handle:
+                handle.truncate(end)
+        return {json.loads(line)['target'] for line in data[:end].splitlines() if line}
+
+    def requeue(self, owner: Optional[str] = None, stale_after: Optional[float] = None) -> List[str]:
+        """Put back in pending/ the shards of `owner`, or those without a heartbeat
+        for `stale_after` seconds, or those of processes of this host that died"""
+        requeued = []
+        now = time.time()
+        for entry in self._list('running'):
+            shard, _, worker = entry.rpartition('@')
+            path = self._path('running', entry)
+            try:
+                stale = stale_after is not None and now - os.path.getmtime(path) > stale_after
+            except FileNotFoundError:
+                continue
+            if worker == owner or stale or (owner is None and not _alive(worker)):
+                try:
+                    os.rename(path, self._path('pending', shard))
+                except FileNotFoundError:
+                    continue
+                requeued.append(shard)
+        if requeued:
+            logger.warning(f"Requeued {len(requeued)} shards: {', '.join(requeued)}")
+        return requeued
+
+    def pending(self) -> int:
+        return len(self._list('pending'))
+
+    def finished(self) -> bool:
+        manifest = self.manifest()
+        return bool(manifest) and len(self._list('done')) >= manifest['shards']
+
+    def read_results(self, offsets: Dict[str, int], seen: Set[Tuple[str, str]]) -> Iterator[Dict]:
+        """New complete lines of every results file since `offsets`, each target once"""
+        for name in self._list('results'):
+            path = self._path('results', name)
+            offset = offsets.get(name, 0)
+            if os.path.getsize(path) <= offset:
+                continue
+            with open(path, 'rb') as handle:
+                handle.seek(offset)
+                data = handle.read()
+            end = data.rfind(b'\n') + 1
+            offsets[name] = offset + end
+            for line in data[:end].splitlines():
+                if not line:
+                    continue
+                entry = json.loads(line)
+                key = (name, entry['target'])
+                if key not in seen:
+                    seen.add(key)
+                    yield _load_result(entry['result'])
+
+
+def run_worker(path: str, options: Dict = None, ports: List[int] = None,
+               heartbeat: float = HEARTBEAT, wait: float = 0.0) -> int:
+    """Scan shards of the queue at `path` until none is pending, returns the targets scanned
+
+    One NetworkScanner and one `scan_many` stream serve every shard the
+    worker claims, so the thread pool stays full across shard boundaries.
+    Each result is appended (and flushed) to its shard file before the next
+    one is written. `wait` seconds are spent waiting for the queue to be
+    created, for workers that join from another machine.
+    """
+    from .core import NetworkScanner
+
+    queue = ShardQueue(path)
+    deadline = time.monotonic() + wait
+    while not queue.manifest() and time.monotonic() < deadline:
+        time.sleep(0.5)
+    if ports is None:
+        ports = queue.manifest().get('ports')
+    worker = worker_name()
+    active: Dict[str, list] = {}     # shard -> [targets left, results file]
+    owners: Dict[str, list] = {}     # url -> [(shard, target), ...]
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(heartbeat):
+            for shard in list(active):
+                queue.heartbeat(shard, worker)
+
+    def targets():
+        while True:
+            shard = queue.claim(worker)
+            if shard is None:
+                return
+            done = queue.checkpoint(shard)
+            todo = [t for t in dict.fromkeys(queue.targets(shard, worker)) if t not in done]
+            logger.info(f"{worker} claimed {shard}: {len(todo)} targets to scan, {len(done)} already done")
+            if not todo:
+                queue.complete(shard, worker)
+                continue
+            active[shard] = [len(todo), open(queue.results_path(shard), 'a', encoding='utf-8')]
+            for target in todo:
+                owners.setdefault(_url_of(target), []).append((shard, target))
+                yield target
+
+    scanner = NetworkScanner(**(options or {}))
+    threading.Thread(target=beat, name='shard-heartbeat', daemon=True).start()
+    scanned = 0
+    try:
+        for result in scanner.scan_many(targets(), ports):
+            url = _url_of(result['url'])
+            shard, target = owners[url].pop(0)
+            if not owners[url]:
+                del owners[url]
+            state = active[shard]
+            state[1].write(json.dumps({'target': target, 'result': result}, default=str) + '\n')
+            state[1].flush()
+            scanned += 1
+            state[0] -= 1
+            if not state[0]:
+                state[1].close()
+                del active[shard]
+                queue.complete(shard, worker)
+    finally:
+        stop.set()
+        for _, handle in active.values():
+            handle.close()
+        scanner.close()
+    return scanned
+
+
+def _worker_main(path: str, options: Dict, ports: Optional[List[int]], heartbeat: float, wait: float):
+    try:
+        run_worker(path, options, ports, heartbeat, wait)
+    except KeyboardInterrupt:
+        pass  # the shard stays in running/ and is resumed from its checkpoint
+
+
+def run_workers(path: str, processes: int = None, options: Dict = None, ports: List[int] = None,
+                heartbeat: float = HEARTBEAT, wait: float = 0.0):
+    """Run `processes` workers on the queue at `path` and wait for them (worker-only node)"""
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_worker_main, args=(path, options, ports, heartbeat, wait),
+                               name=f'shard-worker-{i}')
+               for i in range(processes or os.cpu_count() or 1)]
+    for process in workers:
+        process.start()
+    try:
+        for process in workers:
+            process.join()
+    finally:
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+
+def scan_sharded(targets: Iterable[str], path: str = None, processes: int = None,
+                 options: Dict = None, ports: List[int] = None, shard_size: int = SHARD_SIZE,
+                 heartbeat: float = HEARTBEAT, stale_after: float = STALE_AFTER,
+                 poll: float = 0.2) -> Iterator[Dict]:
+    """Scan `targets` with `processes` worker processes and yield their results as they land
+
+    Each worker runs its own NetworkScanner(**options) and event loop, so
+    parsing and result building no longer share one GIL. The job lives in
+    the ShardQueue at `path` (a temporary directory when None, removed once
+    the job is done). Running it again with the same `path` resumes the job:
+    `targets` are ignored, the results already checkpointed are yielded
+    again and only the missing targets are scanned. Workers of other
+    machines join with `run_workers(path)` on a shared filesystem.
+
+    A local worker that dies has its shards requeued and is replaced; shards
+    of remote workers are requeued after `stale_after` seconds without a
+    heartbeat. Results go through JSON; port keys are turned back into ints
+    as in ResultStore, so they match those of NetworkScanner.scan_many.
+    """
+    temporary = path is None
+    if temporary:
+        path = tempfile.mkdtemp(prefix='scan-shards-')
+    queue = ShardQueue(path)
+    if queue.manifest():
+        logger.info(f"Resuming sharded scan in {path}")
+        queue.requeue()
+    else:
+        shards = queue.create(targets, shard_size, ports=ports)
+        logger.info(f"Sharded scan in {path}: {shards} shards of up to {shard_size} targets")
+
+    processes = processes or os.cpu_count() or 1
+    context = multiprocessing.get_context('spawn')
+    workers = {}
+    offsets: Dict[str, int] = {}
+    seen: Set[Tuple[str, str]] = set()
+    finished = False
+    crashes = 0
+    try:
+        while True:
+            before = len(seen)
+            yield from queue.read_results(offsets, seen)
+            if len(seen) > before:
+                crashes = 0
+            if finished:
+                break
+            for process in list(workers.values()):
+                if process.is_alive():
+                    continue
+                owner = worker_name(process.pid)
+                del workers[owner]
+                if process.exitcode:
+                    logger.warning(f"Worker {owner} exited with code {process.exitcode}")
+                    crashes += 1
+                queue.requeue(owner)
+            if crashes > 2 * processes:
+                raise RuntimeError(f"Shard workers keep crashing without progress, job kept in {path}")
+            queue.requeue(stale_after=stale_after)
+            # Read once more after the last shard is done, its final lines included
+            finished = queue.finished()
+            missing = min(processes - len(workers), queue.pending())
+            for _ in range(max(0, missing)):
+                process = context.Process(target=_worker_main,
+                                          args=(path, options, ports, heartbeat, 0.0),
+                                          name='shard-worker', daemon=True)
+                process.start()
+                workers[worker_name(process.pid)] = process
+            if not finished:
+                time.sleep(poll)
+    finally:
+        for process in workers.values():
+            if process.is_alive():
+                process.terminate()
+            process.join()
+    if temporary:
+        shutil.rmtree(path, ignore_errors=True)
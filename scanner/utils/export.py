@@ -1,38 +1,162 @@
 import json
 import csv
-from typing import Dict, List
-from datetime import datetime
+import io
+import gzip
+import bz2
+import lzma
+import sys
+from typing import Dict, Iterable, Iterator, List, Tuple, Any
+
+# Stable CSV schema for scan_website results, one row per target
+CSV_FIELDS = [
+    'url', 'timestamp', 'error',
+    'ip_info.ip_address', 'ip_info.reverse_dns', 'ip_info.is_up', 'ip_info.error',
+    'ip_info.location.country', 'ip_info.location.city',
+    'dns_records.A', 'dns_records.AAAA', 'dns_records.CNAME', 'dns_records.MX',
+    'dns_records.NS', 'dns_records.TXT', 'dns_records.SOA', 'dns_records.CAA',
+    'server_info.server', 'server_info.content_type', 'server_info.status_code',
+    'server_info.final_url', 'server_info.error',
+    'server_info.security_headers.strict_transport_security',
+    'server_info.security_headers.content_security_policy',
+    'server_info.security_headers.x_frame_options',
+    'open_ports', 'timings.total',
+]
+
+COMPRESSORS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+
 
 def export_results(results: Dict, format: str = "json") -> str:
     """Export scan results in specified format"""
     if format == "json":
         return json.dumps(results, indent=2)
     elif format == "csv":
-        output = []
-        flat_results = flatten_dict(results)
-        fieldnames = sorted(set().union(*[d.keys() for d in flat_results]))
-        
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(flat_results)
-        
-        return "\n".join(output)
+        output = io.StringIO()
+        writer = CsvResultWriter(output)
+        writer.write(results)
+        return output.getvalue()
     else:
         return str(results)
 
-def flatten_dict(data: Dict, parent_key: str = '', sep: str = '.') -> List[Dict]:
-    """Flatten nested dictionary structure"""
-    items = []
+
+def iter_flat(data: Dict, parent_key: str = '', sep: str = '.') -> Iterator[Tuple[str, Any]]:
+    """Yield (dotted key, leaf value) pairs of a nested dictionary"""
     for k, v in data.items():
-        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        new_key = f"{parent_key}{sep}{k}" if parent_key else str(k)
         if isinstance(v, dict):
-            items.extend(flatten_dict(v, new_key, sep=sep))
+            yield from iter_flat(v, new_key, sep=sep)
         elif isinstance(v, list):
             for i, item in enumerate(v):
                 if isinstance(item, dict):
-                    items.extend(flatten_dict(item, f"{new_key}[{i}]", sep=sep))
+                    yield from iter_flat(item, f"{new_key}[{i}]", sep=sep)
                 else:
-                    items.append({new_key: item})
+                    yield f"{new_key}[{i}]", item
         else:
-            items.append({new_key: v})
-    return items
+            yield new_key, v
+
+
+def flatten_dict(data: Dict, parent_key: str = '', sep: str = '.') -> Dict:
+    """Flatten nested dictionary structure"""
+    return dict(iter_flat(data, parent_key, sep))
+
+
+def csv_row(results: Dict, fieldnames: List[str] = CSV_FIELDS) -> Dict:
+    """Project one scan result onto the CSV schema; lists are joined with ';'"""
+    row = {}
+    for field in fieldnames:
+        if field == 'open_ports':
+            ports = results.get('open_ports') or {}
+            row[field] = ';'.join(
+                f"{port}/{info.get('service') or ''}".rstrip('/')
+                for port, info in ports.items()
+                if isinstance(info, dict) and info.get('status') == 'open')
+            continue
+        value = results
+        for part in field.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        if isinstance(value, (list, tuple)):
+            value = ';'.join(str(v) for v in value)
+        elif isinstance(value, dict):
+            value = json.dumps(value, default=str)
+        row[field] = value
+    return row
+
+
+def open_output(path: str, compress: str = None):
+    """Open a text stream for writing, '-' is stdout
+
+    Compression is taken from `compress` ('gzip', 'bz2', 'xz') or from the
+    file extension. Compressed stdout wraps `sys.stdout.buffer`; closing the
+    stream writes the trailer but leaves stdout open.
+    """
+    compress = _compression(path, compress)
+    if path == '-':
+        if not compress:
+            return sys.stdout
+        sys.stdout.flush()
+        return COMPRESSORS[compress](sys.stdout.buffer, 'wt', encoding='utf-8', newline='')
+    if compress:
+        return COMPRESSORS[compress](path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def _compression(path: str, compress: str = None):
+    if compress is None and path != '-':
+        for extension, name in _EXTENSIONS.items():
+            if path.endswith(extension):
+                return name
+    return compress
+
+
+class JsonLinesWriter:
+    """Write one JSON document per line, flushing as results arrive"""
+
+    def __init__(self, stream, flush: bool = True):
+        self.stream = stream
+        self.flush = flush
+        self.count = 0
+
+    def write(self, results: Dict):
+        self.stream.write(json.dumps(results, default=str) + '\n')
+        if self.flush:
+            self.stream.flush()
+        self.count += 1
+
+
+class CsvResultWriter:
+    """Write results as CSV rows with a fixed header"""
+
+    def __init__(self, stream, fieldnames: List[str] = CSV_FIELDS, flush: bool = True):
+        self.stream = stream
+        self.flush = flush
+        self.count = 0
+        self.fieldnames = list(fieldnames)
+        self.writer = csv.DictWriter(stream, fieldnames=self.fieldnames, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, results: Dict):
+        self.writer.writerow(csv_row(results, self.fieldnames))
+        if self.flush:
+            self.stream.flush()
+        self.count += 1
+
+
+WRITERS = {'jsonl': JsonLinesWriter, 'csv': CsvResultWriter}
+
+
+def write_results(results: Iterable[Dict], path: str = '-', format: str = 'jsonl',
+                  compress: str = None) -> int:
+    """Stream scan results to `path` one by one, returns how many were written"""
+    compress = _compression(path, compress)
+    stream = open_output(path, compress)
+    # Compressed streams are flushed on close, flushing each row would defeat compression
+    writer = WRITERS[format](stream, flush=not compress)
+    try:
+        for result in results:
+            writer.write(result)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+        if path == '-':
+            sys.stdout.flush()
+    return writer.count
@@ -1,30 +1,147 @@
-import geoip2.database
-from typing import Dict, Optional
+import socket
+import threading
+from typing import Dict, Iterable, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
-class GeoIPLocator:
-    def __init__(self, db_path: str = 'GeoLite2-City.mmdb'):
+DEFAULT_DB_PATH = 'GeoLite2-City.mmdb'
+
+_readers: Dict[str, Optional['maxminddb.Reader']] = {}
+_readers_lock = threading.Lock()
+
+
+def open_database(db_path: str = DEFAULT_DB_PATH) -> Optional['maxminddb.Reader']:
+    """Memory-mapped reader of an MMDB file, opened once per process and path"""
+    import maxminddb  # only scans with a GeoIP database pay for the import
+    with _readers_lock:
+        if db_path in _readers:
+            return _readers[db_path]
+        reader = None
         try:
-            self.reader = geoip2.database.Reader(db_path)
+            try:
+                reader = maxminddb.open_database(db_path, maxminddb.MODE_MMAP_EXT)
+            except ValueError:
+                # C extension not built: pure Python reader, still memory-mapped
+                reader = maxminddb.open_database(db_path, maxminddb.MODE_MMAP)
         except FileNotFoundError:
-            self.reader = None
             logger.warning("GeoIP database not found. Geo location disabled.")
+        except (OSError, maxminddb.InvalidDatabaseError) as e:
+            logger.warning(f"Cannot open GeoIP database {db_path}: {e}")
+        _readers[db_path] = reader
+        return reader
+
+
+def _location(record: Optional[Dict]) -> Optional[Dict]:
+    if not record:
+        return None
+    location = record.get('location') or {}
+    return {
+        'country': (record.get('country') or {}).get('names', {}).get('en'),
+        'city': (record.get('city') or {}).get('names', {}).get('en'),
+        'latitude': location.get('latitude'),
+        'longitude': location.get('longitude')
+    }
+
+
+class GeoIPLocator:
+    """IP geolocation from a MaxMind City database.
+
+    Every answer of the database covers a whole network (ip/prefix), so
+    results are cached per network rather than per address: the addresses
+    of a sweep mostly hit the network of the previous lookup, the others
+    one dict probe per prefix length already seen. The cache is emptied once
+    it holds more than `max_networks` networks. The cache and the counters
+    are shared by the scan threads and only touched under `_lock`; database
+    reads happen outside it.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_networks: int = 262144):
+        self.db_path = db_path
+        self.reader = open_database(db_path)
+        self.max_networks = max_networks
+        self.stats = {'hits': 0, 'misses': 0}
+        self._networks: Dict[tuple, Dict[int, Optional[Dict]]] = {}
+        self._prefixes = {4: [], 6: []}
+        self._size = 0
+        self._last = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.reader is not None
 
     def locate_ip(self, ip: str) -> Optional[Dict]:
         """Get geographic location for an IP address"""
         if not self.reader:
             return None
-            
         try:
-            response = self.reader.city(ip)
-            return {
-                'country': response.country.name,
-                'city': response.city.name,
-                'latitude': response.location.latitude,
-                'longitude': response.location.longitude
-            }
-        except Exception as e:
+            if ':' in ip:
+                version, bits, value = 6, 128, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+            else:
+                version, bits, value = 4, 32, int.from_bytes(socket.inet_aton(ip), 'big')
+        except OSError:
+            logger.error(f"GeoIP lookup error: invalid address {ip!r}")
+            return None
+
+        with self._lock:
+            last = self._last
+            if last is not None and last[0] == version and last[1] <= value <= last[2]:
+                self.stats['hits'] += 1
+                return last[3]
+            for prefix in self._prefixes[version]:
+                key = value >> (bits - prefix)
+                networks = self._networks[(version, prefix)]
+                if key in networks:
+                    location = networks[key]
+                    self._remember(version, bits, prefix, key, location)
+                    self.stats['hits'] += 1
+                    return location
+            self.stats['misses'] += 1
+
+        import maxminddb
+        try:
+            record, prefix = self.reader.get_with_prefix_len(ip)
+        except (ValueError, maxminddb.InvalidDatabaseError) as e:
             logger.error(f"GeoIP lookup error: {e}")
             return None
+        if prefix > bits:
+            prefix -= 96  # IPv4 address in an IPv6 tree
+        location = _location(record)
+        with self._lock:
+            if self._size >= self.max_networks:
+                self._networks.clear()
+                self._prefixes = {4: [], 6: []}
+                self._size = 0
+            networks = self._networks.get((version, prefix))
+            if networks is None:
+                networks = self._networks[(version, prefix)] = {}
+                # Longest prefixes first: the most specific network wins
+                self._prefixes[version] = sorted(self._prefixes[version] + [prefix], reverse=True)
+            networks[value >> (bits - prefix)] = location
+            self._size += 1
+            self._remember(version, bits, prefix, value >> (bits - prefix), location)
+        return location
+
+    def _remember(self, version: int, bits: int, prefix: int, key: int, location: Optional[Dict]):
+        first = key << (bits - prefix)
+        self._last = (version, first, first | ((1 << (bits - prefix)) - 1), location)
+
+    def locate_many(self, ips: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """Locate a batch of addresses, {ip: location}"""
+        locate = self.locate_ip
+        return {ip: locate(ip) for ip in ips}
+
+
+_default_locators: Dict[str, GeoIPLocator] = {}
+
+
+def get_locator(db_path: str = DEFAULT_DB_PATH) -> GeoIPLocator:
+    """Process-wide locator of a database, shared by every scanner"""
+    with _readers_lock:
+        locator = _default_locators.get(db_path)
+    if locator is None:
+        locator = GeoIPLocator(db_path)
+        with _readers_lock:
+            locator = _default_locators.setdefault(db_path, locator)
+    return locator
@@ -0,0 +1,235 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a loopback connect to a slow HTTP redirect chain
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DESCRIPTIONS = {
+    'stage_seconds': "Duration of each scan stage",
+    'stages_total': "Scan stages settled, by outcome",
+    'target_seconds': "Duration of a whole target scan",
+    'port_connect_seconds': "Duration of a TCP connect attempt, by port",
+    'connects_total': "TCP connect attempts, by outcome",
+    'backoffs_total': "Connect rate cuts of a host or prefix, by reason",
+    'http_request_seconds': "Duration of one HTTP request (a redirect chain counts each hop)",
+    'http_requests_total': "HTTP requests, by status class",
+    'dns_cache_lookups': "Resolution cache lookups, by result",
+    'inflight': "Work in progress, by kind",
+    'queue_depth': "Work waiting for a slot, by queue",
+}
+
+Labels = Tuple[Tuple[str, object], ...]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout"""
+    __slots__ = ('bounds', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float, counts: List[int] = None) -> float:
+        """Estimate of the q-quantile, linear inside the bucket it falls in"""
+        counts = self.counts if counts is None else counts
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                low = self.bounds[index - 1] if index else 0.0
+                return low + (self.bounds[index] - low) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, buckets = 0, {}
+        for bound, bucket in zip(self.bounds + (float('inf'),), counts):
+            cumulative += bucket
+            buckets['+Inf' if bound == float('inf') else repr(bound)] = cumulative
+        return {'count': count, 'sum': round(total, 6), 'buckets': buckets,
+                'p50': round(self.quantile(0.5, counts), 6),
+                'p90': round(self.quantile(0.9, counts), 6),
+                'p99': round(self.quantile(0.99, counts), 6)}
+
+
+class Metrics:
+    """In-process counters, latency histograms and callback gauges of a scanner.
+
+    Hot paths only pay a dict lookup and an uncontended lock per update;
+    gauges (in-flight work, queue depths) cost nothing until a snapshot
+    calls them. A metric keeps at most `max_series` label sets, further
+    ones are folded into label values 'other' (ports of a full range scan).
+    """
+
+    def __init__(self, prefix: str = 'scanner', max_series: int = 1024):
+        self.prefix = prefix
+        self.max_series = max_series
+        self.started = time.time()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], Callable[[], float]] = {}
+        self._series: Dict[str, int] = {}
+        self._aliases: Dict[Tuple[str, Labels], Tuple[str, Labels]] = {}
+        self._lookup: Dict[Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _canonical(self, name: str, labels: Dict) -> Tuple[str, Labels]:
+        """Series key of `labels`, folded into 'other' past `max_series` (lock held)"""
+        key = (name, tuple(labels.items()))
+        canonical = self._aliases.get(key)
+        if canonical is None:
+            count = self._series.get(name, 0)
+            if count >= self.max_series and labels:
+                canonical = (name, tuple((label, 'other') for label in labels))
+            else:
+                self._series[name] = count + 1
+                canonical = key
+            self._aliases[key] = canonical
+        return canonical
+
+    def observe(self, name: str, value: float, **labels):
+        histogram = self._lookup.get((name, tuple(labels.items())))
+        if histogram is None:
+            with self._lock:
+                key = self._canonical(name, labels)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram()
+                self._lookup[(name, tuple(labels.items()))] = histogram
+        histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        with self._lock:
+            key = self._aliases.get((name, tuple(labels.items()))) or self._canonical(name, labels)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def gauge(self, name: str, func: Callable[[], float], **labels):
+        """Register a gauge read from `func` at snapshot time"""
+        with self._lock:
+            self._gauges[(name, tuple(labels.items()))] = func
+
+    def _read_gauges(self) -> Dict[Tuple[str, Labels], float]:
+        with self._lock:
+            gauges = list(self._gauges.items())
+        values = {}
+        for key, func in gauges:
+            try:
+                values[key] = func()
+            except Exception as e:
+                logger.debug(f"Gauge {key[0]} failed: {e}")
+        return values
+
+    def snapshot(self) -> Dict:
+        """Every metric as plain data, histograms with estimated p50/p90/p99"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = list(self._histograms.items())
+        return {
+            'timestamp': time.time(),
+            'uptime': round(time.time() - self.started, 3),
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in sorted(counters.items(), key=_sort_key)],
+            'gauges': [{'name': name, 'labels': dict(labels), 'value': value}
+                       for (name, labels), value in sorted(self._read_gauges().items(), key=_sort_key)],
+            'histograms': [dict({'name': name, 'labels': dict(labels)}, **histogram.snapshot())
+                           for (name, labels), histogram in sorted(histograms, key=_sort_key)],
+        }
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format (node_exporter textfile collector)"""
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                full = f'{self.prefix}_{name}'
+                lines.append(f'# HELP {full} {DESCRIPTIONS.get(name, name)}')
+                lines.append(f'# TYPE {full} {kind}')
+            return f'{self.prefix}_{name}'
+
+        for kind, entries in (('counter', snapshot['counters']), ('gauge', snapshot['gauges'])):
+            for entry in entries:
+                full = header(entry['name'], kind)
+                lines.append(f"{full}{_format_labels(entry['labels'])} {entry['value']}")
+        for entry in snapshot['histograms']:
+            full = header(entry['name'], 'histogram')
+            for bound, count in entry['buckets'].items():
+                labels = _format_labels(dict(entry['labels'], le=bound))
+                lines.append(f"{full}_bucket{labels} {count}")
+            labels = _format_labels(entry['labels'])
+            lines.append(f"{full}_sum{labels} {entry['sum']}")
+            lines.append(f"{full}_count{labels} {entry['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """Atomically write a snapshot: JSON for '.json' paths, Prometheus text otherwise"""
+        if path.endswith('.json'):
+            text = json.dumps(self.snapshot(), indent=2)
+        else:
+            text = self.prometheus()
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.metrics-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+            handle.write(text)
+        os.replace(tmp, path)
+
+
+def _sort_key(item) -> Tuple:
+    (name, labels), _ = item
+    return name, tuple((label, str(value)) for label, value in labels)
+
+
+def _format_labels(labels: Dict) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{label}="{value}"' for label, value in zip(labels, escaped)) + '}'
+
+
+def write_periodically(metrics: Metrics, path: str, interval: float = 10.0) -> Callable[[], None]:
+    """Rewrite `path` every `interval` seconds in a daemon thread; the returned
+    function stops it and writes a last snapshot"""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                metrics.write(path)
+            except OSError as e:
+                logger.error(f"Cannot write metrics to {path}: {e}")
+
+    thread = threading.Thread(target=loop, name='metrics-writer', daemon=True)
+    thread.start()
+
+    def close():
+        stop.set()
+        thread.join()
+        metrics.write(path)
+    return close
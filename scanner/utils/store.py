@@ -0,0 +1,162 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    target TEXT NOT NULL,
+    url TEXT,
+    ip TEXT,
+    ts REAL NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ports (
+    scan_id INTEGER NOT NULL REFERENCES scans(id),
+    target TEXT NOT NULL,
+    ip TEXT,
+    port INTEGER NOT NULL,
+    status TEXT,
+    service TEXT,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scans_target_ts ON scans(target, ts);
+CREATE INDEX IF NOT EXISTS scans_ip_ts ON scans(ip, ts);
+CREATE INDEX IF NOT EXISTS scans_ts ON scans(ts);
+CREATE INDEX IF NOT EXISTS ports_port_status_ts ON ports(port, status, ts);
+CREATE INDEX IF NOT EXISTS ports_ip ON ports(ip);
+CREATE INDEX IF NOT EXISTS ports_scan ON ports(scan_id);
+"""
+
+
+def target_of(results: Dict) -> str:
+    """Host part of a result url, the key results are stored under"""
+    return results.get('url', '').split('//')[-1].split('/')[0].lower()
+
+
+def _epoch(timestamp: Optional[str]) -> float:
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def _load(text: str) -> Dict:
+    results = json.loads(text)
+    ports = results.get('open_ports')
+    if isinstance(ports, dict):
+        results['open_ports'] = {int(port) if str(port).isdigit() else port: info
+                                 for port, info in ports.items()}
+    return results
+
+
+class ResultStore:
+    """SQLite (WAL) store of scan results, indexed by target, IP, port/status and time.
+
+    `add` buffers results and writes them `batch_size` at a time in one
+    transaction, so it keeps up with a streaming batch scan. Call `flush` or
+    `close` to persist the tail of the buffer. A result already stored (same
+    target and timestamp) is skipped, so replaying a checkpoint is harmless.
+    """
+
+    def __init__(self, path: str = 'scans.db', batch_size: int = 500, flush_interval: float = 2.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def add(self, results: Dict):
+        # Rows are built right away so later changes to `results` do not leak in
+        target = target_of(results)
+        ip = (results.get('ip_info') or {}).get('ip_address')
+        ts = _epoch(results.get('timestamp'))
+        ports = [(int(port), info.get('status'), info.get('service'))
+                 for port, info in (results.get('open_ports') or {}).items()
+                 if isinstance(info, dict)]
+        row = (target, results.get('url'), ip, ts, json.dumps(results, default=str))
+        with self._lock:
+            self._buffer.append((row, ports))
+            if (len(self._buffer) >= self.batch_size or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def record(self, results: Iterable[Dict]) -> Iterator[Dict]:
+        """Store every result of a stream while passing it through"""
+        try:
+            for result in results:
+                self.add(result)
+                yield result
+        finally:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        with self.conn:
+            for row, ports in batch:
+                target, _, ip, ts, _ = row
+                cursor = self.conn.execute(
+                    'INSERT INTO scans (target, url, ip, ts, result) SELECT ?, ?, ?, ?, ? '
+                    'WHERE NOT EXISTS (SELECT 1 FROM scans WHERE target = ? AND ts = ?)',
+                    row + (target, ts))
+                if not cursor.rowcount:
+                    continue
+                self.conn.executemany(
+                    'INSERT INTO ports (scan_id, target, ip, port, status, service, ts) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(cursor.lastrowid, target, ip, port, status, service, ts)
+                     for port, status, service in ports])
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def hosts_with_port(self, port: int, status: str = 'open', since: float = None,
+                        until: float = None) -> List[Dict]:
+        """Targets seen with `port` in `status` between two epoch times"""
+        rows = self._query(
+            'SELECT target, ip, service, MAX(ts) FROM ports '
+            'WHERE port = ? AND status = ? AND ts >= ? AND ts <= ? '
+            'GROUP BY target, ip ORDER BY target',
+            (port, status, since or 0, until or float('inf')))
+        return [{'target': target, 'ip': ip, 'service': service, 'last_seen': ts}
+                for target, ip, service, ts in rows]
+
+    def latest(self, target: str) -> Optional[Dict]:
+        """Most recent stored result for a target"""
+        rows = self._query(
+            'SELECT result FROM scans WHERE target = ? ORDER BY ts DESC LIMIT 1',
+            (target.lower(),))
+        return _load(rows[0][0]) if rows else None
+
+    def history(self, target: str, since: float = None) -> List[Dict]:
+        rows = self._query(
+            'SELECT result FROM scans WHERE target = ? AND ts >= ? ORDER BY ts',
+            (target.lower(), since or 0))
+        return [_load(row[0]) for row in rows]
+
+    def by_ip(self, ip: str) -> List[Dict]:
+        rows = self._query('SELECT result FROM scans WHERE ip = ? ORDER BY ts', (ip,))
+        return [_load(row[0]) for row in rows]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,89 @@
+import concurrent.futures
+import threading
+
+import pytest
+
+from benchmarks.fixtures import stub_dns_server, stub_resolver
+from scanner.network.dns_scanner import DNS_WORKERS, get_dns_records, get_dns_records_bulk, query_records
+
+dns_resolver = pytest.importorskip('dns.resolver')
+
+ZONE = {
+    ('example.test', 'A'): ['192.0.2.1', '192.0.2.2'],
+    ('example.test', 'MX'): ['10 mail.example.test.'],
+    ('example.test', 'NS'): ['ns1.example.test.'],
+    ('example.test', 'TXT'): ['"v=spf1 -all"'],
+    ('other.test', 'A'): ['192.0.2.9'],
+}
+
+
+@pytest.fixture(scope='module')
+def resolver():
+    with stub_dns_server(ZONE) as port:
+        yield stub_resolver(port)
+
+
+def test_record_values(resolver):
+    assert sorted(query_records('example.test', 'A', resolver)) == ['192.0.2.1', '192.0.2.2']
+    assert query_records('example.test', 'mx', resolver) == ['mail.example.test.']
+    assert query_records('example.test', 'TXT', resolver) == ['"v=spf1 -all"']
+
+
+def test_no_answer_is_an_empty_list(resolver):
+    assert query_records('example.test', 'AAAA', resolver) == []
+    records = get_dns_records('other.test', ('A', 'MX'), resolver)
+    assert records == {'A': ['192.0.2.9'], 'MX': []}
+
+
+def test_nxdomain(resolver):
+    with pytest.raises(dns_resolver.NXDOMAIN):
+        query_records('missing.test', 'A', resolver)
+    records = get_dns_records('missing.test', ('A', 'MX'), resolver)
+    assert set(records) == {'errors'}
+    assert set(records['errors']) == {'A', 'MX'}
+
+
+def test_an_error_keeps_the_other_record_types(resolver):
+    records = get_dns_records('example.test', ('A', 'MX', 'BOGUS'), resolver)
+    assert sorted(records['A']) == ['192.0.2.1', '192.0.2.2']
+    assert records['MX'] == ['mail.example.test.']
+    assert set(records['errors']) == {'BOGUS'}
+
+
+def test_bulk_yields_every_domain(resolver):
+    results = dict(get_dns_records_bulk(['example.test', ' other.test ', '', 'missing.test'],
+                                        ('A', 'NS'), resolver, max_workers=2))
+    assert set(results) == {'example.test', 'other.test', 'missing.test'}
+    assert results['example.test']['NS'] == ['ns1.example.test.']
+    assert results['other.test'] == {'A': ['192.0.2.9'], 'NS': []}
+    assert set(results['missing.test']['errors']) == {'A', 'NS'}
+
+
+def test_bulk_keeps_duplicate_domains(resolver):
+    results = list(get_dns_records_bulk(['example.test', 'other.test', 'example.test'], ('A',), resolver))
+    assert sorted(domain for domain, _ in results) == ['example.test', 'example.test', 'other.test']
+    assert all(records['A'] for _, records in results)
+
+
+def test_targets_share_one_bounded_pool():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    class CountingResolver(dns_resolver.Resolver):
+        def resolve(self, *args, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            try:
+                return super().resolve(*args, **kwargs)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+    with stub_dns_server(ZONE, delay=0.05) as port:
+        counting = CountingResolver(configure=False)
+        counting.nameservers, counting.port = ['127.0.0.1'], port
+        with concurrent.futures.ThreadPoolExecutor(max_workers=20) as targets:
+            records = list(targets.map(lambda _: get_dns_records('example.test', resolver=counting),
+                                       range(20)))
+    assert all(r['MX'] == ['mail.example.test.'] for r in records)
+    assert peak[0] <= DNS_WORKERS
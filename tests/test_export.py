@@ -0,0 +1,24 @@
+import gzip
+import json
+import lzma
+import sys
+
+import pytest
+
+from scanner.utils.export import write_results
+
+RESULTS = [{'url': 'https://a.test', 'open_ports': {443: {'status': 'open'}}},
+           {'url': 'https://b.test', 'error': 'timeout'}]
+
+
+@pytest.mark.parametrize('compress,decompress', [('gzip', gzip.decompress), ('xz', lzma.decompress)])
+def test_compressed_stdout(capsysbinary, compress, decompress):
+    assert write_results(RESULTS, '-', 'jsonl', compress) == 2
+    assert not sys.stdout.closed
+    lines = decompress(capsysbinary.readouterr().out).decode().splitlines()
+    assert [json.loads(line)['url'] for line in lines] == ['https://a.test', 'https://b.test']
+
+
+def test_plain_stdout(capsysbinary):
+    write_results(RESULTS, '-', 'csv')
+    assert capsysbinary.readouterr().out.decode().splitlines()[1].startswith('https://a.test')
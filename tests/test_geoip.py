@@ -0,0 +1,56 @@
+import random
+import sys
+import threading
+
+import pytest
+
+from benchmarks.fixtures import mmdb_database
+from scanner.utils.geoip import GeoIPLocator
+
+pytest.importorskip('maxminddb')
+
+CITIES = ['Paris', 'Berlin', 'Tokyo']
+
+
+def city(name):
+    return {'city': {'names': {'en': name}}, 'country': {'names': {'en': 'Somewhere'}}}
+
+
+@pytest.fixture
+def switch_often():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_concurrent_lookups_survive_cache_overflow(switch_often):
+    # /24 networks inside 10.0.0.0/20, /20 networks elsewhere: two prefix lengths
+    networks = [(f'10.0.{i}.0/24', city(CITIES[i % 3])) for i in range(16)]
+    networks += [(f'10.{i}.0.0/20', city(CITIES[i % 3])) for i in range(1, 16)]
+    expected = {f'10.0.{i}': CITIES[i % 3] for i in range(16)}
+    expected.update({f'10.{i}.0': CITIES[i % 3] for i in range(1, 16)})
+    errors = []
+    per_thread = 3000
+
+    with mmdb_database(networks) as path:
+        locator = GeoIPLocator(path, max_networks=4)
+
+        def lookups(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(per_thread):
+                    prefix = rng.choice(list(expected))
+                    ip = f'{prefix}.{rng.randrange(1, 255)}'
+                    assert locator.locate_ip(ip)['city'] == expected[prefix]
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=lookups, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    assert locator.stats['hits'] + locator.stats['misses'] == 8 * per_thread
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from benchmarks.fixtures import stub_dns_server, stub_resolver, tcp_listeners
+from scanner.core import NetworkScanner
+from scanner.network.resolver_cache import ResolutionCache
+
+
+def previous_result(ip):
+    """Fresh result of moved.test: no group is due for a rescan"""
+    now = time.time()
+    return {
+        'url': 'https://moved.test',
+        'ip_info': {'ip_address': ip, 'reverse_dns': 'old.example', 'is_up': False},
+        'dns_records': {'A': [ip]},
+        'server_info': {'status_code': 200},
+        'open_ports': {22: {'status': 'open', 'service': 'ssh'}},
+        'checked_at': {'ip': now, 'dns': now, 'http': now, 'ports': now},
+    }
+
+
+@pytest.fixture
+def scanner():
+    with stub_dns_server({('moved.test', 'A'): ['127.0.0.1']}) as port:
+        scanner = NetworkScanner(max_threads=4, port_timeout=0.5, geoip=False, fingerprint=False,
+                                 resolution_cache=ResolutionCache(resolver=stub_resolver(port)))
+        try:
+            yield scanner
+        finally:
+            scanner.close()
+
+
+def test_rescan_redoes_ip_groups_when_address_changed(scanner):
+    with tcp_listeners(1) as ports:
+        result = scanner.rescan('moved.test', previous_result('10.9.9.9'), ports)
+
+    assert result['ip_info']['ip_address'] == '127.0.0.1'
+    assert result['ip_info']['reverse_dns'] != 'old.example'
+    assert set(result['open_ports']) == set(ports)
+    assert result['open_ports'][ports[0]]['status'] == 'open'
+    # Groups that do not depend on the address are still taken from `previous`
+    assert result['server_info'] == {'status_code': 200}
+    assert result['checked_at']['ip'] > result['checked_at']['http']
+
+
+def test_rescan_keeps_ip_groups_when_address_unchanged(scanner):
+    previous = previous_result('127.0.0.1')
+    result = scanner.rescan('moved.test', previous, [1])
+
+    assert result['ip_info']['reverse_dns'] == 'old.example'
+    assert result['open_ports'] == previous['open_ports']
+    assert result['changes'] == []
+
+
+def test_scan_many_redoes_ip_groups_when_address_changed(scanner):
+    with tcp_listeners(1) as ports:
+        results = list(scanner.scan_many(['moved.test'], ports,
+                                         previous=lambda domain: previous_result('10.9.9.9')))
+
+    assert len(results) == 1
+    assert results[0]['ip_info']['reverse_dns'] != 'old.example'
+    assert set(results[0]['open_ports']) == set(ports)
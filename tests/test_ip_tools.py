@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+from benchmarks.fixtures import closed_ports
+from scanner.network.ip_tools import discover_hosts
+from scanner.network.port_scanner import AsyncPortScanner
+
+
+class CountingScanner(AsyncPortScanner):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.probed = set()
+
+    async def connect(self, ip, port, timeout=None):
+        self.probed.add(ip)
+        return await super().connect(ip, port, timeout)
+
+
+def test_discover_hosts_needs_probe_ports():
+    with pytest.raises(ValueError):
+        next(discover_hosts('127.0.0.1', ports=()))
+
+
+def test_slow_consumer_pauses_the_sweep():
+    scanner = CountingScanner(concurrency=64, timeout=0.5, retries=0)
+    try:
+        hosts = []
+        # Every loopback address answers with a RST on a closed port
+        for host in discover_hosts('127.0.0.1-127.0.0.60', closed_ports(1), scanner=scanner, window=8):
+            hosts.append(host['ip'])
+            time.sleep(0.01)
+            assert len(scanner.probed) <= len(hosts) + 8
+    finally:
+        scanner.close()
+    assert sorted(hosts) == sorted(f'127.0.0.{i}' for i in range(1, 61))
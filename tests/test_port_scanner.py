@@ -0,0 +1,77 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from benchmarks.fixtures import closed_ports, tcp_listeners
+from scanner.network import port_scanner
+from scanner.network.fingerprint import Fingerprinter
+from scanner.network.port_scanner import AsyncPortScanner
+
+
+@pytest.fixture
+def scanner():
+    scanner = AsyncPortScanner(concurrency=8, timeout=0.5, retries=0)
+    yield scanner
+    scanner.close()
+
+
+def test_scan_runs_a_bounded_number_of_tasks(scanner):
+    peak = []
+
+    def on_result(port, result):
+        peak.append(len(asyncio.all_tasks()))
+
+    with tcp_listeners(2) as open_ports:
+        closed = [port for port in dict.fromkeys(closed_ports(200)) if port not in open_ports]
+        results = scanner.scan_sync('127.0.0.1', open_ports + closed, on_result=on_result)
+    assert list(results) == open_ports + closed
+    assert all(results[port]['status'] == 'open' for port in open_ports)
+    assert all(results[port]['status'] == 'closed' for port in closed)
+    # One worker and its wait_for connect task per slot, plus the scan itself
+    assert max(peak) <= 2 * scanner.concurrency + 1
+
+
+def test_scan_ports_accepts_deprecated_max_threads(monkeypatch):
+    created = []
+
+    class Recorder(AsyncPortScanner):
+        def __init__(self, **kwargs):
+            created.append(kwargs['concurrency'])
+            super().__init__(**kwargs)
+
+    monkeypatch.setattr(port_scanner, 'AsyncPortScanner', Recorder)
+    with tcp_listeners(1) as ports:
+        with pytest.warns(DeprecationWarning, match='concurrency'):
+            results = port_scanner.scan_ports('127.0.0.1', ports, max_threads=3)
+    assert created == [3]
+    assert results[ports[0]]['status'] == 'open'
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_fingerprint_probes_hold_a_scanner_slot():
+    scanner = AsyncPortScanner(concurrency=1, timeout=0.5, retries=0)
+    fingerprinter = Fingerprinter(scanner, passive_wait=0.2, read_timeout=0.2)
+    # Handshakes complete in the backlog, but the server never says a word
+    with socket.socket() as silent:
+        silent.bind(('127.0.0.1', 0))
+        silent.listen(8)
+        port = silent.getsockname()[1]
+        try:
+            probe = scanner.submit(fingerprinter.fingerprint_ports('127.0.0.1', [port]))
+            wait_until(lambda: scanner.inflight == 1)
+            connect = scanner.submit(scanner.connect('127.0.0.1', port))
+            wait_until(lambda: scanner.waiting == 1)
+            assert not connect.done()
+            assert probe.result(timeout=5)[port]['service'] is None
+            assert connect.result(timeout=5) == 'open'
+            assert scanner.inflight == 0
+        finally:
+            scanner.close()
@@ -0,0 +1,86 @@
+import os
+import random
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PyQt5.QtCore')
+from PyQt5.QtCore import QCoreApplication, QPersistentModelIndex, Qt
+
+from scanner.results_model import ScanResultsFilter, ScanResultsModel
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+def result(i):
+    return {'url': f'https://host{i}.test', 'timestamp': f'2024-01-01T00:00:{i % 60:02d}',
+            'ip_info': {'ip_address': f'10.0.{i % 7}.{i % 251}'},
+            'server_info': {'server': ('nginx', 'apache')[i % 2]},
+            'open_ports': {port: {'status': 'open'} for port in range(i % 5)}}
+
+
+def urls(model):
+    return [model.index(row, 0).data() for row in range(model.rowCount())]
+
+
+@pytest.mark.parametrize('column,order', [(1, Qt.AscendingOrder), (2, Qt.DescendingOrder),
+                                          (0, Qt.DescendingOrder)])
+def test_sorted_insert_matches_a_full_sort(column, order):
+    rng = random.Random(column)
+    items = [result(i) for i in range(600)]
+    rng.shuffle(items)
+    model = ScanResultsModel()
+    model.add_results(items[:200])
+    model.sort(column, order)
+    inserted = []
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+    for start in range(200, 600, 100):
+        model.add_results(items[start:start + 100])
+
+    expected = ScanResultsModel()
+    expected.add_results(items)
+    expected.sort(column, order)
+    keys = [node.sort_keys[column] for node in model.target_nodes()]
+    assert keys == [node.sort_keys[column] for node in expected.target_nodes()]
+    assert [node.row for node in model.target_nodes()] == list(range(600))
+    assert inserted  # row insertions, no layout change
+
+
+def test_filter_follows_sorted_inserts_and_keeps_selection():
+    model = ScanResultsModel()
+    proxy = ScanResultsFilter()
+    proxy.setSourceModel(model)
+    model.add_results([result(i) for i in range(300)])
+    proxy.sort(1, Qt.AscendingOrder)
+    proxy.set_filter_text('nginx')
+    selected = QPersistentModelIndex(proxy.index(10, 0))
+    url = selected.data()
+
+    model.add_results([result(i) for i in range(300, 600)])
+    accepted = [node.columns[0] for node in model.target_nodes() if 'nginx' in node.text]
+    assert urls(proxy) == accepted
+    assert selected.isValid() and selected.data() == url
+    for row in range(proxy.rowCount()):
+        source = proxy.mapToSource(proxy.index(row, 0))
+        assert proxy.mapFromSource(source).row() == row
+
+    proxy.set_filter_text('')
+    assert proxy.rowCount() == 600
+    assert selected.data() == url
+    proxy.sort(2, Qt.DescendingOrder)
+    assert selected.data() == url
+    assert urls(proxy) == urls(model)
+
+
+def test_filter_updates_a_changed_result():
+    model = ScanResultsModel()
+    proxy = ScanResultsFilter()
+    proxy.setSourceModel(model)
+    model.add_results([result(0), result(1)])
+    proxy.set_filter_text('apache')
+    assert urls(proxy) == ['https://host1.test']
+    index = model.index(0, 0)
+    model.set_result(index, dict(result(0), server_info={'server': 'apache'}))
+    assert urls(proxy) == ['https://host0.test', 'https://host1.test']
+    model.clear()
+    assert proxy.rowCount() == 0
@@ -0,0 +1,16 @@
+import json
+
+from scanner.shard import ShardQueue
+
+
+def test_results_come_back_with_int_port_keys(tmp_path):
+    queue = ShardQueue(str(tmp_path))
+    queue.create(['a.test', 'b.test'], shard_size=1)
+    result = {'url': 'https://a.test', 'open_ports': {443: {'status': 'open'}, 22: {'status': 'closed'}}}
+    with open(queue.results_path('shard-000000.txt'), 'w', encoding='utf-8') as handle:
+        handle.write(json.dumps({'target': 'a.test', 'result': result}) + '\n')
+        handle.write('{"target": "b.te')  # torn line of a worker still writing
+
+    offsets, seen = {}, set()
+    assert list(queue.read_results(offsets, seen)) == [result]
+    assert list(queue.read_results(offsets, seen)) == []
@@ -0,0 +1,44 @@
+from scanner.checkpoint import Checkpoint
+from scanner.utils.store import ResultStore
+
+
+def result(target, timestamp='2025-07-04T04:26:49.123456'):
+    return {'url': f'https://{target}', 'timestamp': timestamp,
+            'ip_info': {'ip_address': '127.0.0.1'},
+            'open_ports': {22: {'status': 'open', 'service': 'ssh'}}}
+
+
+def test_same_result_is_stored_once(tmp_path):
+    store = ResultStore(str(tmp_path / 'scans.db'))
+    store.add(result('a.test'))
+    store.flush()
+    store.add(result('a.test'))
+    store.add(result('a.test', '2025-07-05T00:00:00'))
+    store.close()
+
+    store = ResultStore(str(tmp_path / 'scans.db'))
+    assert len(store.history('a.test')) == 2
+    assert len(store.hosts_with_port(22)) == 1
+    assert store._query('SELECT COUNT(*) FROM ports')[0][0] == 2
+    store.close()
+
+
+def test_checkpoint_replay_fills_missing_rows(tmp_path):
+    # A crash after the journal was flushed but before the store wrote its batch
+    checkpoint = Checkpoint(str(tmp_path / 'job.jsonl'))
+    store = ResultStore(str(tmp_path / 'scans.db'))
+    for target in ('a.test', 'b.test'):
+        checkpoint.target_done(target, result(target))
+    store.add(result('a.test'))
+    store.flush()
+    checkpoint.close()
+    store.close()
+
+    checkpoint = Checkpoint(str(tmp_path / 'job.jsonl'))
+    store = ResultStore(str(tmp_path / 'scans.db'))
+    replayed = list(store.record(checkpoint.results()))
+    assert [r['url'] for r in replayed] == ['https://a.test', 'https://b.test']
+    assert store.latest('b.test')['open_ports'] == {22: {'status': 'open', 'service': 'ssh'}}
+    assert len(store.history('a.test')) == 1
+    checkpoint.close()
+    store.close()